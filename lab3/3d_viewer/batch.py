@@ -0,0 +1,254 @@
+"""
+批处理: 不需要图形界面, 用进程池对大量OBJ/OFF/PLY/STL文件做加载(居中缩放)、焊接和Laplacian光顺,
+结果保存为.npz数组或OBJ/OFF/PLY文件
+
+每处理完一个文件就向清单(JSON Lines)追加一条记录; 再次运行时跳过参数和源文件都未改变且已成功的文件,
+因此中断后可以继续. 单个文件出错(包括工作进程崩溃)只影响该文件
+
+    python batch.py models/ -o processed/ --iterations 10 --method taubin --format ply --workers 8
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+EXTENSIONS = ('.obj', '.off', '.ply', '.stl')
+MAX_ATTEMPTS = 2  # 工作进程崩溃时同一文件最多处理的次数
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Batch mesh preprocessing (normalize, weld, smooth)")
+    parser.add_argument('inputs', nargs='+', help="OBJ/OFF/PLY/STL files or directories (searched recursively)")
+    parser.add_argument('-o', '--output-dir', required=True,
+                        help="results are written here as NAME.EXT.FORMAT (e.g. a.obj.npz), "
+                             "mirroring the layout below each input directory")
+    parser.add_argument('--iterations', type=int, default=0, help="smoothing iterations (0: no smoothing)")
+    parser.add_argument('--lambda', dest='lambda_factor', type=float, default=0.5)
+    parser.add_argument('--method', choices=('explicit', 'implicit', 'taubin'), default='explicit')
+    parser.add_argument('--weights', choices=('uniform', 'cotangent'), default='uniform')
+    parser.add_argument('--tol', type=float, default=None, help="stop smoothing when the displacement is below this")
+    parser.add_argument('--normal-mode', choices=('uniform', 'area', 'angle'), default='uniform')
+    parser.add_argument('--format', choices=('npz', 'obj', 'off', 'ply'), default='npz',
+                        help="output format: NumPy arrays (default) or a mesh file written by Mesh.save")
+    parser.add_argument('--weld', type=float, default=None, metavar='TOL',
+                        help="weld vertices closer than TOL (after normalizing to unit size)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=1,
+                        help="threads per worker process for normals and smoothing (results are identical)")
+    parser.add_argument('--manifest', default=None,
+                        help="progress manifest (JSON lines), default: OUTPUT_DIR/manifest.jsonl")
+    parser.add_argument('--force', action='store_true', help="reprocess files already recorded as done")
+    return parser.parse_args(argv)
+
+
+def find_files(inputs, output_dir, extension='.npz'):
+    """
+    输出文件名保留源文件的扩展名再加上 extension(a.obj -> a.obj.npz), 同名的 a.obj 与 a.off 不会写入同一个文件
+    :return: [(输入文件, 输出文件)], 按输入路径排序
+    """
+    tasks = {}
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in files:
+                    if name.lower().endswith(EXTENSIONS):
+                        source = os.path.join(root, name)
+                        tasks[os.path.abspath(source)] = os.path.join(output_dir, os.path.relpath(source, path))
+        elif path.lower().endswith(EXTENSIONS):
+            tasks[os.path.abspath(path)] = os.path.join(output_dir, os.path.basename(path))
+        else:
+            raise ValueError(f"Not an OBJ/OFF/PLY/STL file or directory: {path}")
+    result = [(source, target + extension) for source, target in sorted(tasks.items())]
+    targets = {}
+    for source, target in result:
+        # 如分别给出 x/a.obj 与 y/a.obj 两个文件时, 在提交任何任务之前报错
+        other = targets.setdefault(os.path.normcase(os.path.abspath(target)), source)
+        if other != source:
+            raise ValueError(f"{other} and {source} would both be written to {target}")
+    return result
+
+
+def source_info(filename):
+    stat = os.stat(filename)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def save_npz(filename, mesh):
+    """ 数组名与网格缓存相同: vertices, normals, face_counts, face_indices """
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    staging = filename + '.tmp.npz'
+    np.savez(staging, vertices=np.asarray(mesh.vertices, dtype=np.float32),
+             normals=np.asarray(mesh.normals, dtype=np.float32), face_counts=mesh.face_counts(),
+             face_indices=mesh.face_indices)
+    os.replace(staging, filename)
+
+
+def process_file(source, target, settings, threads=1):
+    """
+    在工作进程中处理一个文件, 异常记录在结果中而不抛出
+    :param threads: 法向量计算和光顺的线程数(见 Mesh.workers), 不影响结果, 因此不记入 settings
+    :return: 清单记录
+    """
+    from mesh import Mesh
+
+    record = {'input': source, 'output': target, 'settings': settings, 'status': 'failed', 'pid': os.getpid()}
+    timing = {}
+    start = time.perf_counter()
+    try:
+        record['source'] = source_info(source)
+        mesh = Mesh()
+        mesh.normal_mode = settings['normal_mode']
+        mesh.workers = threads
+        mesh.load(source)
+        timing['load_s'] = time.perf_counter() - start
+
+        if settings['weld'] is not None:
+            stage = time.perf_counter()
+            record['weld'] = mesh.weld_vertices(settings['weld'])
+            timing['weld_s'] = time.perf_counter() - stage
+
+        if settings['iterations'] > 0:
+            stage = time.perf_counter()
+            record['smoothing'] = mesh.laplacian_smoothing(
+                settings['iterations'], settings['lambda_factor'], settings['method'], settings['weights'],
+                tol=settings['tol'])
+            timing['smoothing_s'] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        if target.endswith('.npz'):
+            save_npz(target, mesh)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            mesh.save(target)
+        timing['write_s'] = time.perf_counter() - stage
+        record.update(status='ok', vertices=len(mesh.vertices), faces=len(mesh.face_offsets) - 1,
+                      triangles=len(mesh.triangles))
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+    timing['total_s'] = time.perf_counter() - start
+    record['timing'] = timing
+    return record
+
+
+def load_manifest(filename):
+    """ :return: {输入文件: 最后一条记录} """
+    records = {}
+    try:
+        with open(filename) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 上次被中断时可能只写了半行
+                records[record['input']] = record
+    except OSError:
+        pass
+    return records
+
+
+def is_done(record, settings, target):
+    if record is None or record.get('status') != 'ok' or record.get('settings') != settings \
+            or record.get('output') != target:
+        return False
+    try:
+        return record.get('source') == source_info(record['input']) and os.path.exists(record['output'])
+    except OSError:
+        return False
+
+
+def run(tasks, settings, workers, manifest, report=None, threads=1):
+    """
+    用进程池处理 tasks, 每完成一个文件就写入清单
+    工作进程崩溃时进程池不可用, 重建进程池后逐个重新提交当时正在处理的文件, 崩溃次数达到 MAX_ATTEMPTS 的文件记为失败
+    :param report: 可选, 每完成一个文件调用 report(record)
+    :param threads: 每个工作进程中的线程数, 见 process_file
+    :return: 本次的所有记录
+    """
+    pending = [(source, target, 0) for source, target in reversed(tasks)]
+    records = []
+
+    def finish(record):
+        manifest.write(json.dumps(record) + '\n')
+        manifest.flush()
+        records.append(record)
+        if report is not None:
+            report(record)
+
+    while pending:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            running = {}
+            try:
+                while pending or running:
+                    # 同时提交的文件数不超过进程数的两倍, 崩溃时只需重新处理少量文件;
+                    # 崩溃时正在处理的文件逐个单独重试, 以区分真正导致崩溃的文件
+                    while pending and len(running) < 2 * workers:
+                        if pending[-1][2] > 0 and running or any(task[2] > 0 for task in running.values()):
+                            break
+                        source, target, attempts = pending.pop()
+                        future = executor.submit(process_file, source, target, settings, threads)
+                        running[future] = (source, target, attempts)
+                    done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        record = future.result()
+                        del running[future]
+                        finish(record)
+            except BrokenProcessPool:
+                for source, target, attempts in running.values():
+                    if attempts + 1 >= MAX_ATTEMPTS:
+                        finish({'input': source, 'output': target, 'settings': settings, 'status': 'failed',
+                                'error': "worker process crashed", 'timing': {}})
+                    else:
+                        pending.append((source, target, attempts + 1))
+    return records
+
+
+def summarize(records, elapsed):
+    ok = [record for record in records if record['status'] == 'ok']
+    faces = sum(record['faces'] for record in ok)
+    return {
+        'files': len(records),
+        'succeeded': len(ok),
+        'failed': len(records) - len(ok),
+        'elapsed_s': elapsed,
+        'files_per_s': len(ok) / elapsed if elapsed > 0 else 0.0,
+        'faces_per_s': faces / elapsed if elapsed > 0 else 0.0,
+        'faces': faces,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    settings = {'iterations': args.iterations, 'lambda_factor': args.lambda_factor, 'method': args.method,
+                'weights': args.weights, 'tol': args.tol, 'normal_mode': args.normal_mode, 'weld': args.weld,
+                'format': args.format}
+    tasks = find_files(args.inputs, args.output_dir, '.' + args.format)
+    manifest_path = args.manifest or os.path.join(args.output_dir, 'manifest.jsonl')
+    previous = {} if args.force else load_manifest(manifest_path)
+    remaining = [(source, target) for source, target in tasks if not is_done(previous.get(source), settings, target)]
+    print(f"{len(tasks)} files, {len(tasks) - len(remaining)} already done, {len(remaining)} to process "
+          f"with {args.workers} workers", file=sys.stderr)
+
+    def report(record):
+        name = record['input']
+        if record['status'] == 'ok':
+            print(f"ok     {name}: {record['faces']} faces, {record['timing']['total_s']:.2f} s", file=sys.stderr)
+        else:
+            print(f"FAILED {name}: {record['error']}", file=sys.stderr)
+
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    start = time.perf_counter()
+    with open(manifest_path, 'a') as manifest:
+        records = run(remaining, settings, args.workers, manifest, report, args.threads)
+    summary = summarize(records, time.perf_counter() - start)
+    print(f"{summary['succeeded']} succeeded, {summary['failed']} failed in {summary['elapsed_s']:.1f} s: "
+          f"{summary['files_per_s']:.2f} files/s, {summary['faces_per_s']:.0f} faces/s", file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,374 @@
+"""
+离屏渲染基准测试: 不需要窗口, 用软件OpenGL上下文(Mesa llvmpipe, 通过EGL无表面上下文或OSMesa)驱动 GLWidget 绘制
+
+对逐渐增大的合成网格记录:
+- 加载、法向量计算、Laplacian光顺各阶段的耗时
+- 每帧的CPU耗时(paintGL提交命令)、GPU耗时(GL_TIME_ELAPSED查询, 不支持时为glFinish等待时间)和总耗时
+
+    python benchmark.py --sizes 64 128 256 512 --frames 60 --output bench.json
+
+--scaling 只测量法向量计算和光顺在不同线程数下的耗时(不需要OpenGL), 并检查结果与单线程逐位相同:
+
+    python benchmark.py --scaling --sizes 1024 2048 --workers 1 2 4 8 16
+"""
+import argparse
+import ctypes
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless rendering benchmark for the 3D viewer")
+    parser.add_argument('--backend', choices=('egl', 'osmesa'), default='egl',
+                        help="offscreen context: EGL surfaceless (default) or OSMesa")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[64, 128, 256, 512],
+                        help="grid resolutions of the synthetic meshes (2*(n-1)^2 triangles each)")
+    parser.add_argument('--frames', type=int, default=60, help="measured frames per mesh")
+    parser.add_argument('--warmup', type=int, default=3, help="frames rendered before measuring")
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--smoothing-iterations', type=int, default=10)
+    parser.add_argument('--smoothing-method', choices=('explicit', 'implicit', 'taubin'), default='explicit')
+    parser.add_argument('--fixed-function', action='store_true', help="disable GLSL per-pixel lighting")
+    parser.add_argument('--scaling', action='store_true',
+                        help="only measure normals/smoothing with each --workers count (no rendering)")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                        help="thread counts for --scaling")
+    parser.add_argument('--repeat', type=int, default=3, help="--scaling: best of this many runs")
+    parser.add_argument('--output', default='-', help="JSON output file, '-' for stdout")
+    return parser.parse_args(argv)
+
+
+def _egl_context():
+    from OpenGL import EGL
+    from OpenGL.EGL.EXT.platform_base import eglGetPlatformDisplayEXT
+    # EGL_PLATFORM_SURFACELESS_MESA: 不需要窗口系统, 绘制到帧缓冲对象
+    display = eglGetPlatformDisplayEXT(0x31DD, None, None)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("eglInitialize failed")
+    attributes = (EGL.EGLint * 13)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8,
+        EGL.EGL_BLUE_SIZE, 8, EGL.EGL_DEPTH_SIZE, 24, EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT, EGL.EGL_NONE)
+    config, count = EGL.EGLConfig(), EGL.EGLint()
+    if not EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1, ctypes.pointer(count)) \
+            or count.value == 0:
+        raise RuntimeError("No suitable EGL config")
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    if context == EGL.EGL_NO_CONTEXT:
+        raise RuntimeError("eglCreateContext failed")
+    if not EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context):
+        raise RuntimeError("eglMakeCurrent failed")
+    return display, context
+
+
+def load_platform(backend):
+    """
+    加载 backend 对应的PyOpenGL平台(需要在此之前设置 PYOPENGL_PLATFORM)
+    找不到OpenGL库时PyOpenGL不会报错, 直到第一次导入 OpenGL.GL 才以 AttributeError 失败, 这里提前检查
+    """
+    from OpenGL import platform as gl_platform
+    library = 'libOSMesa' if backend == 'osmesa' else 'libEGL/libGL'
+    if gl_platform.PLATFORM.GL is None:
+        raise RuntimeError(f"PyOpenGL could not load the {backend} platform ({library} not found); "
+                           f"install Mesa's {library} or use --backend {'egl' if backend == 'osmesa' else 'osmesa'}")
+
+
+def _osmesa_context(width, height):
+    from OpenGL import osmesa, arrays
+    from OpenGL.GL import GL_UNSIGNED_BYTE
+    if not osmesa.OSMesaCreateContextExt:
+        raise RuntimeError("OSMesaCreateContextExt is not available (libOSMesa not found or too old)")
+    context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+    if not context:
+        raise RuntimeError("OSMesaCreateContextExt failed")
+    buffer = arrays.GLubyteArray.zeros((height, width, 4))
+    if not osmesa.OSMesaMakeCurrent(context, buffer, GL_UNSIGNED_BYTE, width, height):
+        raise RuntimeError("OSMesaMakeCurrent failed")
+    return context, buffer
+
+
+def create_context(backend, width, height):
+    """
+    创建并激活离屏上下文, 绘制目标为 width x height 的帧缓冲对象
+    :return: 需要在测试期间保持引用的对象
+    """
+    from OpenGL.GL import (glGenFramebuffers, glBindFramebuffer, glGenRenderbuffers, glBindRenderbuffer,
+                           glRenderbufferStorage, glFramebufferRenderbuffer, glCheckFramebufferStatus,
+                           GL_FRAMEBUFFER, GL_RENDERBUFFER, GL_RGBA8, GL_DEPTH_COMPONENT24,
+                           GL_COLOR_ATTACHMENT0, GL_DEPTH_ATTACHMENT, GL_FRAMEBUFFER_COMPLETE)
+    handles = _egl_context() if backend == 'egl' else _osmesa_context(width, height)
+    framebuffer = glGenFramebuffers(1)
+    glBindFramebuffer(GL_FRAMEBUFFER, framebuffer)
+    color, depth = glGenRenderbuffers(2)
+    glBindRenderbuffer(GL_RENDERBUFFER, color)
+    glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+    glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, color)
+    glBindRenderbuffer(GL_RENDERBUFFER, depth)
+    glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+    glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, depth)
+    if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+        raise RuntimeError("Offscreen framebuffer is incomplete")
+    return handles, framebuffer
+
+
+class GpuTimer:
+    """ GL_TIME_ELAPSED计时查询(ARB_timer_query); 不支持时退化为测量 glFinish 的等待时间 """
+    def __init__(self):
+        from OpenGL.GL import glGenQueries
+        try:
+            self.query = int(glGenQueries(1)[0])
+            self.method = 'timer_query'
+        except Exception:
+            self.query = None
+            self.method = 'finish'
+
+    def begin(self):
+        from OpenGL.GL import glBeginQuery, GL_TIME_ELAPSED
+        if self.query is not None:
+            glBeginQuery(GL_TIME_ELAPSED, self.query)
+
+    def end(self):
+        """ 等待GPU完成并返回耗时(秒) """
+        from OpenGL.GL import glEndQuery, glFinish, glGetQueryObjectui64v, GL_TIME_ELAPSED, GL_QUERY_RESULT
+        if self.query is None:
+            start = time.perf_counter()
+            glFinish()
+            return time.perf_counter() - start
+        glEndQuery(GL_TIME_ELAPSED)
+        elapsed = ctypes.c_uint64()
+        glGetQueryObjectui64v(self.query, GL_QUERY_RESULT, ctypes.byref(elapsed))
+        return elapsed.value * 1e-9
+
+
+def synthetic_mesh(resolution):
+    """
+    n x n 顶点的起伏高度场
+    :return: 顶点 (n*n,3), 三角形 (2(n-1)^2,3)
+    """
+    u = np.linspace(-1.0, 1.0, resolution)
+    x, y = np.meshgrid(u, u)
+    z = 0.15 * np.sin(3.0 * np.pi * x) * np.cos(3.0 * np.pi * y)
+    vertices = np.stack([x.ravel(), y.ravel(), z.ravel()], axis=1)
+    index = np.arange(resolution * resolution).reshape(resolution, resolution)
+    a, b = index[:-1, :-1].ravel(), index[:-1, 1:].ravel()
+    c, d = index[1:, :-1].ravel(), index[1:, 1:].ravel()
+    triangles = np.concatenate([np.stack([a, b, d], axis=1), np.stack([a, d, c], axis=1)])
+    return vertices, triangles
+
+
+def write_obj(filename, vertices, triangles):
+    import mesh_io
+    with open(filename, 'wb') as f:
+        mesh_io.write_obj(f, vertices, np.arange(0, 3 * len(triangles) + 1, 3), triangles.ravel())
+
+
+def benchmark_stages(filename, smoothing_iterations, smoothing_method):
+    """ :return: (加载后的网格, 各阶段耗时(秒)) """
+    from mesh import Mesh
+    mesh = Mesh()
+    start = time.perf_counter()
+    mesh.load_obj(filename)
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mesh.calculate_normals()
+    normals = time.perf_counter() - start
+
+    # 在副本上光顺, 绘制使用原始网格
+    smoothed = mesh.shallow_copy()
+    start = time.perf_counter()
+    smoothed.laplacian_smoothing(smoothing_iterations, 0.3, method=smoothing_method)
+    smoothing = time.perf_counter() - start
+    return mesh, {'load_s': load, 'normals_s': normals, 'smoothing_s': smoothing,
+                  'smoothing_iterations': smoothing_iterations, 'smoothing_method': smoothing_method}
+
+
+def benchmark_scaling(vertices, triangles, workers_list, smoothing_iterations, smoothing_method, repeat):
+    """
+    同一网格在不同线程数下计算法向量(三种加权方式)和光顺的耗时, 取 repeat 次中的最短时间
+    :return: 每个线程数的 {'workers', 'normals_s', 'smoothing_s', 'normals_speedup', 'smoothing_speedup', 'identical'},
+             identical 表示法向量和光顺后的顶点与单线程逐位相同
+    """
+    from mesh import Mesh
+    base = Mesh()
+    base._set_arrays(np.asarray(vertices, dtype=np.float32), np.full(len(triangles), 3), triangles.ravel())
+    base.calculate_normals()
+    base.laplacian_operator()  # 算子只构建一次, 不计入光顺时间
+    results, reference = [], None
+    for workers in workers_list:
+        mesh = base.shallow_copy()
+        mesh.workers = workers
+        mesh.calculate_normals()  # 预热: 线程池和按顶点分组的缓存
+        normals_time = smoothing_time = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outputs = [mesh.calculate_normals(mode) or mesh.normals for mode in ('uniform', 'area', 'angle')]
+            normals_time = min(normals_time, time.perf_counter() - start)
+            smoothed = mesh.shallow_copy()
+            start = time.perf_counter()
+            smoothed.laplacian_smoothing(smoothing_iterations, 0.3, method=smoothing_method)
+            smoothing_time = min(smoothing_time, time.perf_counter() - start)
+        outputs += [smoothed.vertices, smoothed.normals]
+        if reference is None:
+            reference = outputs
+        results.append({
+            'workers': workers, 'normals_s': normals_time, 'smoothing_s': smoothing_time,
+            'normals_speedup': results[0]['normals_s'] / normals_time if results else 1.0,
+            'smoothing_speedup': results[0]['smoothing_s'] / smoothing_time if results else 1.0,
+            'identical': all(np.array_equal(a, b) for a, b in zip(outputs, reference))})
+    return results
+
+
+def main_scaling(args):
+    cpus = os.cpu_count() or 1
+    if max(args.workers) > cpus:
+        # 线程数超过CPU核数时线程只能轮流运行, 测得的只是调度开销, 不是加速比
+        print(f"warning: only {cpus} CPUs available, results for more than {cpus} workers show no real speedup",
+              file=sys.stderr)
+    report = {
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__, 'cpus': cpus},
+        'settings': {'smoothing_iterations': args.smoothing_iterations, 'smoothing_method': args.smoothing_method,
+                     'repeat': args.repeat},
+        'results': [],
+    }
+    for resolution in args.sizes:
+        vertices, triangles = synthetic_mesh(resolution)
+        scaling = benchmark_scaling(vertices, triangles, args.workers, args.smoothing_iterations,
+                                    args.smoothing_method, args.repeat)
+        report['results'].append({'resolution': resolution, 'vertices': len(vertices), 'triangles': len(triangles),
+                                  'scaling': scaling})
+        for row in scaling:
+            print(f"{len(triangles):>9} triangles, {row['workers']:>2} workers: "
+                  f"normals {row['normals_s'] * 1000:8.1f} ms ({row['normals_speedup']:4.2f}x), "
+                  f"smoothing {row['smoothing_s'] * 1000:8.1f} ms ({row['smoothing_speedup']:4.2f}x), "
+                  f"{'identical' if row['identical'] else 'DIFFERENT'}", file=sys.stderr)
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def benchmark_frames(widget, mesh, frames, warmup, gpu_timer):
+    """
+    绕Y轴旋转一周, 逐帧调用 paintGL
+    :return: 首帧(含缓冲上传和BVH构建)耗时与每帧CPU/GPU/总耗时统计
+    """
+    from OpenGL.GL import glFinish
+    from frame_stats import summarize
+    widget.mesh = mesh
+    widget.picked = None
+    widget.dirty_state.add('geometry')
+    widget.yRot = 0
+    cpu, gpu, total = [], [], []
+    first_frame = None
+    for frame in range(warmup + frames):
+        widget.yRot = int(16 * 360 * frame / max(frames, 1))
+        widget.dirty_state.add('transform')
+        glFinish()
+        start = time.perf_counter()
+        gpu_timer.begin()
+        widget.paintGL()
+        submitted = time.perf_counter()
+        gpu_time = gpu_timer.end()
+        glFinish()
+        finished = time.perf_counter()
+        if frame == 0:
+            first_frame = finished - start
+        if frame >= warmup:
+            cpu.append(submitted - start)
+            gpu.append(gpu_time)
+            total.append(finished - start)
+    return {'first_frame_ms': first_frame * 1000.0, 'cpu': summarize(cpu), 'gpu': summarize(gpu),
+            'total': summarize(total), 'lod': widget.current_lod}
+
+
+def create_widget(width, height, use_shaders):
+    from gl_widget import GLWidget
+
+    class HeadlessGLWidget(GLWidget):
+        # 上下文由基准测试创建并一直保持激活
+        def makeCurrent(self):
+            pass
+
+        def doneCurrent(self):
+            pass
+
+    widget = HeadlessGLWidget()
+    widget.resize(width, height)
+    widget.use_shaders = use_shaders
+    widget.initializeGL()
+    widget.resizeGL(width, height)
+    return widget
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.scaling:
+        return main_scaling(args)
+    # 必须在导入PyOpenGL和创建QApplication之前设置
+    os.environ['PYOPENGL_PLATFORM'] = args.backend
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        load_platform(args.backend)
+    except RuntimeError as error:
+        raise SystemExit(f"benchmark: {error}")
+    from PyQt5.QtWidgets import QApplication
+    from OpenGL.GL import glGetString, GL_RENDERER, GL_VERSION
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    context = create_context(args.backend, args.width, args.height)
+    widget = create_widget(args.width, args.height, not args.fixed_function)
+    gpu_timer = GpuTimer()
+    report = {
+        'environment': {
+            'backend': args.backend,
+            'renderer': glGetString(GL_RENDERER).decode(),
+            'gl_version': glGetString(GL_VERSION).decode(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'gpu_timing': gpu_timer.method,
+            'lighting': 'glsl' if widget.lighting_program is not None and widget.use_shaders else 'fixed-function',
+        },
+        'settings': {'width': args.width, 'height': args.height, 'frames': args.frames, 'warmup': args.warmup},
+        'results': [],
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        for resolution in args.sizes:
+            vertices, triangles = synthetic_mesh(resolution)
+            filename = os.path.join(directory, f"grid_{resolution}.obj")
+            write_obj(filename, vertices, triangles)
+            mesh, stages = benchmark_stages(filename, args.smoothing_iterations, args.smoothing_method)
+            result = {'resolution': resolution, 'vertices': len(mesh.vertices), 'triangles': len(mesh.triangles),
+                      'file_bytes': os.path.getsize(filename), 'stages': stages,
+                      'frames': benchmark_frames(widget, mesh, args.frames, args.warmup, gpu_timer)}
+            report['results'].append(result)
+            frames = result['frames']
+            print(f"{result['triangles']:>9} triangles: load {stages['load_s'] * 1000:8.1f} ms, "
+                  f"normals {stages['normals_s'] * 1000:7.1f} ms, smoothing {stages['smoothing_s'] * 1000:8.1f} ms, "
+                  f"frame cpu p50 {frames['cpu']['p50_ms']:7.2f} ms, gpu p50 {frames['gpu']['p50_ms']:7.2f} ms, "
+                  f"total p95 {frames['total']['p95_ms']:7.2f} ms", file=sys.stderr)
+
+    widget.mesh_buffers.release()
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    del context, app
+    return report
+
+
+if __name__ == '__main__':
+    main()
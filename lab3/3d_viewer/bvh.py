@@ -0,0 +1,159 @@
+"""
+三角形包围盒层次(BVH): 射线拾取与视锥体裁剪
+
+三角形按重心的Morton码排序后递归二分(线性BVH), 建树、重算包围盒和遍历都按层批量计算
+"""
+import numpy as np
+from vertex_cache import morton_codes
+
+
+class TriangleBVH:
+    def __init__(self, vertices, triangles, leaf_size=8):
+        """
+        :param triangles: (T,3) 三角形, 树中的三角形顺序为 triangles[self.order]
+        :param leaf_size: 叶节点最多包含的三角形数
+        """
+        self.triangles = np.asarray(triangles)
+        vertices = np.asarray(vertices)
+        count = len(self.triangles)
+        if count:
+            # 重心的3倍, Morton编码前会归一化到包围盒
+            centroids = sum(vertices[self.triangles[:, k]].astype(np.float64) for k in range(3))
+            self.order = np.argsort(morton_codes(centroids), kind='stable')
+        else:
+            self.order = np.zeros(0, dtype=np.int64)
+        self.sorted_triangles = self.triangles[self.order]
+
+        # 逐层二分: 每个节点对应排序后三角形的一个连续区间 [start, end)
+        starts, ends, lefts = [np.zeros(1, dtype=np.int64)], [np.array([count], dtype=np.int64)], []
+        self.levels = [np.zeros(1, dtype=np.int64)]
+        next_id = 1
+        while True:
+            start, end = starts[-1], ends[-1]
+            split = end - start > leaf_size
+            left = np.full(len(start), -1, dtype=np.int64)
+            left[split] = next_id + 2 * np.arange(np.count_nonzero(split))
+            lefts.append(left)
+            if not np.any(split):
+                break
+            middle = (start[split] + end[split]) // 2
+            starts.append(np.stack([start[split], middle], axis=1).ravel())
+            ends.append(np.stack([middle, end[split]], axis=1).ravel())
+            self.levels.append(np.arange(next_id, next_id + len(starts[-1])))
+            next_id += len(starts[-1])
+        self.start = np.concatenate(starts)
+        self.end = np.concatenate(ends)
+        self.left = np.concatenate(lefts)   # 右子节点为 left + 1, 叶节点为 -1
+        self.lower = np.zeros((len(self.start), 3))
+        self.upper = np.zeros((len(self.start), 3))
+        self.refit(vertices)
+        self.version = None  # 包围盒对应的顶点版本, 由调用方维护
+
+    def refit(self, vertices):
+        """ 拓扑不变、顶点移动后(例如光顺)自底向上重新计算包围盒, 不改变树结构 """
+        if len(self.sorted_triangles) == 0:
+            return
+        # 叶节点的包围盒直接由其三角形的所有角点归约得到
+        corners = np.asarray(vertices)[self.sorted_triangles.ravel()]
+        leaves = np.flatnonzero(self.left < 0)
+        self.lower[leaves] = np.minimum.reduceat(corners, 3 * self.start[leaves], axis=0)
+        self.upper[leaves] = np.maximum.reduceat(corners, 3 * self.start[leaves], axis=0)
+        for level in reversed(self.levels):
+            inner = level[self.left[level] >= 0]
+            left = self.left[inner]
+            self.lower[inner] = np.minimum(self.lower[left], self.lower[left + 1])
+            self.upper[inner] = np.maximum(self.upper[left], self.upper[left + 1])
+
+    def _ray_boxes(self, nodes, origin, inv_direction, t_max):
+        t1 = (self.lower[nodes] - origin) * inv_direction
+        t2 = (self.upper[nodes] - origin) * inv_direction
+        near = np.minimum(t1, t2).max(axis=1)
+        far = np.maximum(t1, t2).min(axis=1)
+        return (near <= far) & (far >= 0) & (near <= t_max)
+
+    def intersect(self, vertices, origin, direction):
+        """
+        射线与网格的最近交点(双面)
+        :return: (三角形在原数组中的编号, 射线参数t, 交点), 没有交点时返回None
+        """
+        if len(self.sorted_triangles) == 0:
+            return None
+        vertices = np.asarray(vertices, dtype=np.float64)
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        safe = np.where(np.abs(direction) < 1e-12, 1e-12, direction)
+        inv_direction = 1.0 / safe
+
+        # 按层向下遍历与射线相交的节点, 收集叶节点中的三角形
+        candidates = []
+        nodes = np.zeros(1, dtype=np.int64)
+        while len(nodes):
+            nodes = nodes[self._ray_boxes(nodes, origin, inv_direction, np.inf)]
+            leaf = self.left[nodes] < 0
+            for start, end in zip(self.start[nodes[leaf]], self.end[nodes[leaf]]):
+                candidates.append(np.arange(start, end))
+            inner = self.left[nodes[~leaf]]
+            nodes = np.concatenate([inner, inner + 1])
+        if not candidates:
+            return None
+        candidates = np.concatenate(candidates)
+
+        # Möller–Trumbore 射线-三角形求交
+        corners = vertices[self.sorted_triangles[candidates]]
+        edge1 = corners[:, 1] - corners[:, 0]
+        edge2 = corners[:, 2] - corners[:, 0]
+        p = np.cross(direction, edge2)
+        det = np.einsum('ij,ij->i', edge1, p)
+        valid = np.abs(det) > 1e-12
+        inv_det = np.divide(1.0, det, out=np.zeros_like(det), where=valid)
+        s = origin - corners[:, 0]
+        u = np.einsum('ij,ij->i', s, p) * inv_det
+        q = np.cross(s, edge1)
+        v = (q @ direction) * inv_det
+        t = np.einsum('ij,ij->i', q, edge2) * inv_det
+        hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > 1e-9)
+        if not np.any(hit):
+            return None
+        best = np.flatnonzero(hit)[np.argmin(t[hit])]
+        return int(self.order[candidates[best]]), float(t[best]), origin + t[best] * direction
+
+    def visible_ranges(self, planes, chunk_size=4096):
+        """
+        视锥体裁剪, 以不超过 chunk_size 个三角形的节点为单位
+        :param planes: (6,4) 平面 (a,b,c,d), 内侧满足 ax+by+cz+d >= 0
+        :return: 排序后三角形(triangles[self.order])中可见的区间列表 [(start, end), ...], 相邻区间已合并
+        """
+        normals, offsets = planes[:, :3], planes[:, 3]
+        ranges = []
+        nodes = np.zeros(1, dtype=np.int64) if len(self.sorted_triangles) else np.zeros(0, dtype=np.int64)
+        while len(nodes):
+            # 包围盒在法向量方向上最远/最近的角点
+            lower, upper = self.lower[nodes][:, np.newaxis], self.upper[nodes][:, np.newaxis]
+            farthest = np.where(normals >= 0, upper, lower)
+            nearest = np.where(normals >= 0, lower, upper)
+            outside = np.any(np.einsum('nkj,kj->nk', farthest, normals) + offsets < 0, axis=1)
+            inside = np.all(np.einsum('nkj,kj->nk', nearest, normals) + offsets >= 0, axis=1)
+            nodes, inside = nodes[~outside], inside[~outside]
+            done = inside | (self.left[nodes] < 0) | (self.end[nodes] - self.start[nodes] <= chunk_size)
+            ranges.extend(zip(self.start[nodes[done]].tolist(), self.end[nodes[done]].tolist()))
+            inner = self.left[nodes[~done]]
+            nodes = np.concatenate([inner, inner + 1])
+
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and merged[-1][1] == start:
+                merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+
+def frustum_planes(modelview, projection):
+    """
+    由OpenGL矩阵(glGetDoublev返回的列主序数组)得到模型坐标系下的6个裁剪平面
+    """
+    clip = (np.asarray(modelview) @ np.asarray(projection)).T
+    planes = np.array([clip[3] + clip[0], clip[3] - clip[0],
+                       clip[3] + clip[1], clip[3] - clip[1],
+                       clip[3] + clip[2], clip[3] - clip[2]])
+    return planes / np.linalg.norm(planes[:, :3], axis=1)[:, np.newaxis]
@@ -0,0 +1,264 @@
+"""
+基于二次误差度量(QEM, Garland & Heckbert 1997)的边折叠网格简化
+
+每一轮选出一组互不影响(一环邻域互不相交)的低代价边同时折叠, 所有计算都是NumPy批量操作
+"""
+import numpy as np
+from topology import MeshTopology
+
+# 对称4x4二次型矩阵的上三角元素, 每个顶点用10个数表示
+_UPPER = [(0, 0), (0, 1), (0, 2), (0, 3), (1, 1), (1, 2), (1, 3), (2, 2), (2, 3), (3, 3)]
+_COST_BUCKETS = 8
+_SELECTION_PASSES = 4
+
+
+def _plane_quadrics(planes, weights):
+    """ 平面 (a,b,c,d) 的二次型 w * p p^T, 返回 (K,10) """
+    return np.stack([weights * planes[:, r] * planes[:, c] for r, c in _UPPER], axis=1)
+
+
+def _accumulate(quadrics, corners, num_vertices):
+    """ 把每个元素的二次型累加到其所有顶点上, corners 为 (K,m) 顶点索引 """
+    repeats = corners.shape[1]
+    flat = corners.ravel()
+    return np.stack([np.bincount(flat, weights=np.repeat(quadrics[:, k], repeats), minlength=num_vertices)
+                     for k in range(10)], axis=1)
+
+
+def _edges(topology):
+    """
+    :return: (edges (E,2) 较小索引在前, keys (E,) 有序的边键, 每条边相邻的三角形数, 每条边的一个相邻三角形)
+    """
+    first = topology.edge_halfedges[topology.edge_offsets[:-1]]
+    return topology.edges, topology.edge_keys, topology.edge_face_counts, topology.face[first]
+
+
+def _quadrics(vertices, triangles, boundary_weight):
+    num_vertices = len(vertices)
+    v0, v1, v2 = (vertices[triangles[:, k]] for k in range(3))
+    normals = np.cross(v1 - v0, v2 - v0)
+    double_area = np.linalg.norm(normals, axis=1)
+    unit = np.divide(normals, double_area[:, np.newaxis], out=np.zeros_like(normals),
+                     where=double_area[:, np.newaxis] > 0)
+    planes = np.concatenate([unit, -np.einsum('ij,ij->i', unit, v0)[:, np.newaxis]], axis=1)
+    quadrics = _accumulate(_plane_quadrics(planes, 0.5 * double_area), triangles, num_vertices)
+
+    # 边界边: 加入过该边且垂直于所在三角形的约束平面, 防止边界向内收缩
+    edges, _, counts, edge_triangles = _edges(MeshTopology.from_triangles(triangles, num_vertices))
+    boundary = counts == 1
+    if np.any(boundary):
+        a, b = vertices[edges[boundary, 0]], vertices[edges[boundary, 1]]
+        direction = b - a
+        side = np.cross(direction, unit[edge_triangles[boundary]])
+        length = np.linalg.norm(side, axis=1)
+        side = np.divide(side, length[:, np.newaxis], out=np.zeros_like(side), where=length[:, np.newaxis] > 0)
+        planes = np.concatenate([side, -np.einsum('ij,ij->i', side, a)[:, np.newaxis]], axis=1)
+        weights = boundary_weight * np.einsum('ij,ij->i', direction, direction)
+        quadrics += _accumulate(_plane_quadrics(planes, weights), edges[boundary], num_vertices)
+    return quadrics
+
+
+def _evaluate(q, x):
+    """ 计算 [x,1]^T Q [x,1], q为 (E,10), x为 (E,3) """
+    X, Y, Z = x[:, 0], x[:, 1], x[:, 2]
+    return (q[:, 0] * X * X + 2 * q[:, 1] * X * Y + 2 * q[:, 2] * X * Z + 2 * q[:, 3] * X
+            + q[:, 4] * Y * Y + 2 * q[:, 5] * Y * Z + 2 * q[:, 6] * Y
+            + q[:, 7] * Z * Z + 2 * q[:, 8] * Z + q[:, 9])
+
+
+def _collapse_targets(q, a, b):
+    """
+    每条边折叠后的最优位置及其误差; 二次型矩阵奇异或最优点离边太远时, 在两端点和中点中选误差最小者
+    """
+    matrix = np.stack([q[:, [0, 1, 2]], q[:, [1, 4, 5]], q[:, [2, 5, 7]]], axis=1)
+    rhs = -q[:, [3, 6, 8]]
+    scale = np.abs(matrix).max(axis=(1, 2)) + 1e-30
+    solvable = np.abs(np.linalg.det(matrix / scale[:, np.newaxis, np.newaxis])) > 1e-8
+    midpoint = 0.5 * (a + b)
+    position = midpoint.copy()
+    if np.any(solvable):
+        position[solvable] = np.linalg.solve(matrix[solvable], rhs[solvable][:, :, np.newaxis])[:, :, 0]
+    length = np.linalg.norm(b - a, axis=1)
+    far = np.linalg.norm(position - midpoint, axis=1) > length
+    fallback = ~solvable | far
+
+    cost = _evaluate(q, position)
+    if np.any(fallback):
+        options = np.stack([a[fallback], b[fallback], midpoint[fallback]], axis=1)
+        costs = np.stack([_evaluate(q[fallback], options[:, k]) for k in range(3)], axis=1)
+        best = np.argmin(costs, axis=1)
+        position[fallback] = options[np.arange(len(best)), best]
+        cost[fallback] = costs[np.arange(len(best)), best]
+    return position, np.maximum(cost, 0.0)
+
+
+def _independent(ranks, edges, triangles, num_vertices):
+    """
+    选出代价排名在其周围最小的边: 两条被选中的边所影响的三角形(两端点的一环)互不相交,
+    因此可以同时折叠而互不干扰
+    """
+    sentinel = len(ranks)
+    # 顶点 -> 相邻边的最小排名 -> 三角形 -> 顶点, 排名最小的边向外扩散两层
+    vertex_min = np.full(num_vertices, sentinel, dtype=np.int64)
+    np.minimum.at(vertex_min, edges[:, 0], ranks)
+    np.minimum.at(vertex_min, edges[:, 1], ranks)
+    triangle_min = vertex_min[triangles].min(axis=1)
+    ring_min = np.full(num_vertices, sentinel, dtype=np.int64)
+    np.minimum.at(ring_min, triangles.ravel(), np.repeat(triangle_min, 3))
+    return (ranks < sentinel) & (ranks == ring_min[edges[:, 0]]) & (ranks == ring_min[edges[:, 1]])
+
+
+def _gather(indptr, values, rows):
+    """ 取出CSR中若干行的元素, 返回 (元素, 所属的行在rows中的位置) """
+    lengths = indptr[rows + 1] - indptr[rows]
+    which = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.cumsum(lengths) - lengths
+    return values[np.arange(lengths.sum()) - np.repeat(offsets, lengths) + np.repeat(indptr[rows], lengths)], which
+
+
+def _link_condition(selected, topology):
+    """
+    折叠边 (i,j) 保持流形的条件: i与j的公共邻居数等于该边相邻的三角形数
+    :param selected: 需要检查的边(布尔掩码), 其余边返回False
+    """
+    edges, edge_keys, counts, num_vertices = (topology.edges, topology.edge_keys, topology.edge_face_counts,
+                                              topology.num_vertices)
+    indptr, neighbors = topology.one_ring()
+    i, j = edges[selected, 0], edges[selected, 1]
+    k, which = _gather(indptr, neighbors, i)
+    other = j[which]
+    keys = np.minimum(other, k) * num_vertices + np.maximum(other, k)
+    position = np.minimum(np.searchsorted(edge_keys, keys), len(edge_keys) - 1)
+    shared = (edge_keys[position] == keys) & (k != other)
+    common = np.bincount(which, weights=shared, minlength=len(i))
+
+    valid = np.zeros(len(edges), dtype=bool)
+    valid[np.flatnonzero(selected)] = common == counts[selected]
+    return valid
+
+
+def _no_flips(candidates, targets, vertices, triangles, edges, star):
+    """
+    折叠后两端点一环中保留的三角形法向量不能翻转或接近退化
+    :param star: 顶点 -> 相邻三角形(CSR), 见 MeshTopology.vertex_faces
+    :return: 每个候选折叠是否有效
+    """
+    valid = np.ones(len(candidates), dtype=bool)
+    for end in (0, 1):
+        # 依次检查以两个端点为角点的三角形, 同时包含两个端点的三角形会被删除, 不参与检查
+        moved_vertex = edges[candidates, end]
+        other_vertex = edges[candidates, 1 - end]
+        tris, which = _gather(star[0], star[1], moved_vertex)
+        corners = triangles[tris]
+        keep = ~np.any(corners == other_vertex[which][:, np.newaxis], axis=1)
+        tris, which, corners = tris[keep], which[keep], corners[keep]
+        before = vertices[corners]
+        after = before.copy()
+        after[corners == moved_vertex[which][:, np.newaxis]] = targets[which]
+        n_before = np.cross(before[:, 1] - before[:, 0], before[:, 2] - before[:, 0])
+        n_after = np.cross(after[:, 1] - after[:, 0], after[:, 2] - after[:, 0])
+        dot = np.einsum('ij,ij->i', n_before, n_after)
+        bad = dot <= 0.2 * np.linalg.norm(n_before, axis=1) * np.linalg.norm(n_after, axis=1)
+        valid[which[bad]] = False
+    return valid
+
+
+def _remove_degenerate(triangles):
+    degenerate = (triangles[:, 0] == triangles[:, 1]) | (triangles[:, 1] == triangles[:, 2]) | \
+                 (triangles[:, 0] == triangles[:, 2])
+    return triangles[~degenerate]
+
+
+def decimate(vertices, triangles, target_triangles, boundary_weight=100.0, max_rounds=200, cancelled=None):
+    """
+    :param vertices: (N,3) 顶点坐标
+    :param triangles: (T,3) 三角形
+    :param target_triangles: 目标三角形数(无法继续折叠时可能达不到)
+    :param boundary_weight: 边界约束平面的权重
+    :param cancelled: 可选, 每轮开始前调用, 返回True时提前结束
+    :return: (vertices (N',3) float32, triangles (T',3) int32), 未被引用的顶点已删除
+    """
+    vertices = np.array(vertices, dtype=np.float64)
+    triangles = _remove_degenerate(np.array(triangles, dtype=np.int64).reshape(-1, 3))
+    num_vertices = len(vertices)
+    quadrics = _quadrics(vertices, triangles, boundary_weight)
+
+    # 端点都没有变化的边沿用上一轮的折叠位置与代价
+    changed = np.ones(num_vertices, dtype=bool)
+    cached_keys = np.zeros(0, dtype=np.int64)
+    cached_targets, cached_cost = np.zeros((0, 3)), np.zeros(0)
+    blocked = np.zeros(0, dtype=np.int64)  # 检查未通过的边, 不再参与排序
+    rng = np.random.default_rng(0)  # 固定种子, 结果可重复
+    for _ in range(max_rounds):
+        if len(triangles) <= target_triangles or (cancelled is not None and cancelled()):
+            break
+        mesh_topology = MeshTopology.from_triangles(triangles, num_vertices)
+        edges, edge_keys, counts, _ = _edges(mesh_topology)
+        stale = changed[edges[:, 0]] | changed[edges[:, 1]]
+        if len(cached_keys):
+            position = np.minimum(np.searchsorted(cached_keys, edge_keys), len(cached_keys) - 1)
+            stale |= cached_keys[position] != edge_keys
+            targets, cost = cached_targets[position], cached_cost[position]
+        else:
+            targets, cost = np.zeros((len(edges), 3)), np.zeros(len(edges))
+        if np.any(stale):
+            q = quadrics[edges[stale, 0]] + quadrics[edges[stale, 1]]
+            targets[stale], cost[stale] = _collapse_targets(q, vertices[edges[stale, 0]], vertices[edges[stale, 1]])
+        cached_keys, cached_targets, cached_cost = edge_keys, targets, cost
+
+        # 两端点都在边界上的内部边折叠后会把网格捏成非流形
+        on_boundary = np.zeros(num_vertices, dtype=bool)
+        on_boundary[edges[counts == 1].ravel()] = True
+        allowed = (counts <= 2) & ~((counts == 2) & on_boundary[edges[:, 0]] & on_boundary[edges[:, 1]])
+        if len(blocked):
+            allowed &= ~np.isin(edge_keys, blocked)
+
+        # 在代价最低的若干条边中选出互不影响的一组, 每次折叠约删除两个三角形
+        needed = (len(triangles) - target_triangles + 1) // 2
+        candidates = np.flatnonzero(allowed)
+        if needed < len(candidates):
+            candidates = candidates[np.argpartition(cost[candidates], needed)[:needed]]
+        candidates = candidates[np.argsort(cost[candidates])]
+        # 代价在网格上连续变化时, 严格按代价排序只有少数局部最小的边能被选中;
+        # 因此把候选边按代价分成若干档, 档内随机排列
+        buckets = np.arange(len(candidates)) * _COST_BUCKETS // max(len(candidates), 1)
+        priority = buckets * len(candidates) + rng.permutation(len(candidates))
+        ranks = np.full(len(edges), len(edges), dtype=np.int64)
+        ranks[candidates] = np.argsort(np.argsort(priority))
+        selected = np.zeros(len(edges), dtype=bool)
+        for _ in range(_SELECTION_PASSES):
+            chosen = _independent(ranks, edges, triangles, num_vertices)
+            if not np.any(chosen):
+                break
+            selected |= chosen
+            # 端点与已选边的一环中的三角形相邻的边不能再选, 其余候选边再选一遍
+            locked = np.zeros(num_vertices, dtype=bool)
+            locked[edges[chosen].ravel()] = True
+            locked[triangles[locked[triangles].any(axis=1)].ravel()] = True
+            ranks[locked[edges[:, 0]] | locked[edges[:, 1]]] = len(edges)
+
+        # 折叠后需保持流形且不翻转三角形
+        valid = _link_condition(selected, mesh_topology)[selected]
+        selected = np.flatnonzero(selected)
+        valid[valid] = _no_flips(selected[valid], targets[selected[valid]], vertices, triangles, edges,
+                                 mesh_topology.vertex_faces())
+        collapse = selected[valid]
+        if not np.all(valid):
+            blocked = np.union1d(blocked, edge_keys[selected[~valid]])
+        elif len(collapse) == 0:
+            break
+
+        keep, remove = edges[collapse, 0], edges[collapse, 1]
+        vertices[keep] = targets[collapse]
+        quadrics[keep] += quadrics[remove]
+        changed[:] = False
+        changed[keep] = True
+        remap = np.arange(num_vertices)
+        remap[remove] = keep
+        triangles = _remove_degenerate(remap[triangles])
+
+    # 删除不再被引用的顶点
+    used = np.zeros(num_vertices, dtype=bool)
+    used[triangles.ravel()] = True
+    index = np.cumsum(used) - 1
+    return vertices[used].astype(np.float32), index[triangles].astype(np.int32)
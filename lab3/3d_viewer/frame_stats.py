@@ -0,0 +1,46 @@
+"""
+帧时间统计: 查看器中的实时帧率显示与离屏基准测试共用
+"""
+import time
+from collections import deque
+import numpy as np
+
+
+def summarize(durations):
+    """
+    :param durations: 每帧耗时(秒)
+    :return: 毫秒为单位的平均值、分位数和最大值
+    """
+    durations = np.asarray(durations, dtype=np.float64) * 1000.0
+    if durations.size == 0:
+        return {'frames': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    p50, p95, p99 = np.percentile(durations, [50, 95, 99])
+    return {'frames': int(durations.size), 'mean_ms': float(durations.mean()), 'p50_ms': float(p50),
+            'p95_ms': float(p95), 'p99_ms': float(p99), 'max_ms': float(durations.max())}
+
+
+class FrameStats:
+    """ 最近 window 帧的绘制耗时与帧间隔 """
+    def __init__(self, window=120):
+        self.durations = deque(maxlen=window)
+        self.timestamps = deque(maxlen=window)
+
+    def add(self, duration, timestamp=None):
+        self.durations.append(duration)
+        self.timestamps.append(time.perf_counter() if timestamp is None else timestamp)
+
+    def clear(self):
+        self.durations.clear()
+        self.timestamps.clear()
+
+    def fps(self):
+        # 按帧间隔计算, 只在有重绘时才有意义(查看器按需重绘)
+        if len(self.timestamps) < 2:
+            return 0.0
+        span = self.timestamps[-1] - self.timestamps[0]
+        return (len(self.timestamps) - 1) / span if span > 0 else 0.0
+
+    def summary(self):
+        stats = summarize(self.durations)
+        stats['fps'] = self.fps()
+        return stats
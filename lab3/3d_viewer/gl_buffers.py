@@ -0,0 +1,110 @@
+"""
+网格的GPU缓冲对象(VBO/VAO), 几何数据上传一次后每帧只需一次绘制调用
+"""
+from OpenGL.GL import *
+import ctypes
+import numpy as np
+
+
+class MeshBuffers:
+    def __init__(self):
+        self.position_buffer = None
+        self.normal_buffer = None
+        self.index_buffer = None
+        self.vao = None
+        self.index_count = 0
+        self.vertex_count = 0
+        self.version = None  # 已上传数据对应的网格版本
+
+    def upload(self, vertices, normals, triangles):
+        """ 上传顶点坐标、法向量和三角形索引(需在OpenGL上下文中调用) """
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        normals = np.ascontiguousarray(normals, dtype=np.float32)
+        if getattr(triangles, 'dtype', None) == np.int32:
+            # 索引非负, 直接按无符号整数解释, 避免复制(外存模式下为内存映射数组)
+            indices = np.ascontiguousarray(triangles).view(np.uint32)
+        else:
+            indices = np.ascontiguousarray(triangles, dtype=np.uint32)
+        if self.position_buffer is None:
+            self.position_buffer, self.normal_buffer, self.index_buffer = glGenBuffers(3)
+            if bool(glGenVertexArrays):
+                self.vao = glGenVertexArrays(1)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.position_buffer)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, self.normal_buffer)
+        glBufferData(GL_ARRAY_BUFFER, normals.nbytes, normals, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        self.index_count = indices.size
+        self.vertex_count = len(vertices)
+
+        if self.vao is not None:
+            # VAO记录顶点数组状态, 绘制时只需绑定
+            glBindVertexArray(self.vao)
+            self._bind_arrays()
+            glBindVertexArray(0)
+            self._unbind_arrays()
+
+    def update_geometry(self, vertices, normals, start=0, stop=None):
+        """
+        只更新 [start, stop) 范围内的顶点坐标和法向量, 索引缓冲保持不变
+        整体更新时先丢弃旧的缓冲存储(orphaning), 避免等待GPU仍在使用的上一帧数据
+        """
+        stop = self.vertex_count if stop is None else min(stop, self.vertex_count)
+        if stop <= start:
+            return
+        whole = start == 0 and stop == self.vertex_count
+        for buffer, data in ((self.position_buffer, vertices), (self.normal_buffer, normals)):
+            chunk = np.ascontiguousarray(data[start:stop], dtype=np.float32)
+            glBindBuffer(GL_ARRAY_BUFFER, buffer)
+            if whole:
+                glBufferData(GL_ARRAY_BUFFER, chunk.nbytes, None, GL_DYNAMIC_DRAW)
+            glBufferSubData(GL_ARRAY_BUFFER, start * 12, chunk.nbytes, chunk)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def _bind_arrays(self):
+        glBindBuffer(GL_ARRAY_BUFFER, self.position_buffer)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glBindBuffer(GL_ARRAY_BUFFER, self.normal_buffer)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glNormalPointer(GL_FLOAT, 0, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+
+    def _unbind_arrays(self):
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def draw(self, ranges=None):
+        """
+        :param ranges: 只绘制这些三角形区间 [(start, end), ...], None表示全部
+        """
+        if self.index_count == 0:
+            return
+        if self.vao is not None:
+            glBindVertexArray(self.vao)
+            self._draw_elements(ranges)
+            glBindVertexArray(0)
+        else:
+            self._bind_arrays()
+            self._draw_elements(ranges)
+            self._unbind_arrays()
+
+    def _draw_elements(self, ranges):
+        if ranges is None:
+            glDrawElements(GL_TRIANGLES, self.index_count, GL_UNSIGNED_INT, None)
+            return
+        for start, end in ranges:
+            glDrawElements(GL_TRIANGLES, 3 * (end - start), GL_UNSIGNED_INT, ctypes.c_void_p(12 * start))
+
+    def release(self):
+        if self.position_buffer is not None:
+            glDeleteBuffers(3, [self.position_buffer, self.normal_buffer, self.index_buffer])
+        if self.vao is not None:
+            glDeleteVertexArrays(1, [self.vao])
+        self.__init__()
@@ -4,22 +4,95 @@ OpenGL渲染和交互
 
 from OpenGL.GL import *
 from OpenGL.GLU import *
+from OpenGL.error import GLError
+import math
+import os
+import time
+import numpy as np
 from PyQt5.QtOpenGL import QGLWidget, QGLFormat
-from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtCore import Qt, QSize, QTimer, pyqtSignal
+from PyQt5.QtGui import QGuiApplication
 from mesh import Mesh
+import mesh_io
+from mesh_cache import MeshCache
+from smoothing_worker import SmoothingThread
+from lod_worker import LodThread
+from load_worker import LoadThread, load_mesh_file
+from out_of_core import physical_memory
+from gl_buffers import MeshBuffers
+from shaders import PhongProgram
+from bvh import frustum_planes
+from frame_stats import FrameStats
+
+# 可以单独标记为需要更新的渲染状态, 见 GLWidget.request_redraw
+RENDER_STATES = ('transform', 'lighting', 'geometry', 'polygon_mode')
+
 
 class GLWidget(QGLWidget):
+    smoothing_progress = pyqtSignal(int)   # 已完成的光顺迭代次数
+    status_message = pyqtSignal(str)
+    mesh_loaded = pyqtSignal(str, bool)     # 后台加载完成: (文件名, 是否命中网格缓存)
+
     def __init__(self, parent=None):
         fmt = QGLFormat()
         fmt.setStereo(True) # 启用立体缓冲
         super(GLWidget, self).__init__(fmt, parent)
         self.mesh = Mesh()
+        self.mesh_cache = MeshCache()
+        self.mesh_buffers = MeshBuffers()
+        self.load_thread = None
+        # 不小于该字节数的文件以外存模式(内存映射)加载, None表示总是读入内存
+        memory = physical_memory()
+        self.out_of_core_min_bytes = memory // 2 if memory else None
+        self.out_of_core_dir = None     # 映射文件的父目录, 默认见 out_of_core.DEFAULT_STORAGE_DIR
+        self._mesh_before_load = None   # 后台加载期间显示部分网格, 取消或失败时恢复
+        # 法向量计算和光顺的线程数(见 Mesh.workers), None表示CPU核数; 多核加速比未经测量前默认单线程
+        self.mesh_workers = 1
         self.xRot = self.yRot = self.zRot = 0  # 旋转角度
         self.zoom = 1.0
         self.translation = [0.0, 0.0, -5.0]
         self.lastPos = None
         self.wireframe = False
+        self.triangle_order = None  # 加载后三角形的重排方式('tipsify'/'morton'), None保持文件中的顺序
+        self.triangle_order_stats = None
+        self.weld_tolerance = None  # 加载时焊接顶点的容差(相对于归一化后的模型尺寸), None不焊接
+        self.weld_stats = None
+
+        # 细节层次: 加载后在后台简化, 按模型在屏幕上的大小选择层级, 拖动时使用最粗的一层
+        self.lod_ratios = (0.25, 0.0625)
+        self.lod_min_triangles = 200000     # 三角形数少于该值的网格不构建LOD
+        self.lod_triangles_per_pixel = 1.0
+        self.lod_levels = []
+        self.lod_buffers = []
+        self.lod_version = None
+        self.lod_thread = None
+        self.current_lod = 0
+
+        # 视锥体裁剪: 大网格按BVH节点分块, 只绘制与视锥体相交的块
+        self.frustum_culling = True
+        self.cull_min_triangles = 500000
+        self.cull_chunk_size = 4096
+        self.picked = None      # Ctrl+左键拾取的面和顶点, 见 Mesh.pick
+        self._matrices = None   # 最近一次绘制时的 (模型视图矩阵, 投影矩阵, 视口)
+        self.interacting = False
+        self.frame_stats = FrameStats()
+        self.show_stats = False     # 在画面左上角显示帧率和帧时间分位数
+        self.refine_timer = QTimer(self)
+        self.refine_timer.setSingleShot(True)
+        self.refine_timer.timeout.connect(self.end_interaction)
+
+        # 重绘调度: 记录自上一帧以来改变的状态, 同一帧内的多次请求合并为一次绘制
+        self.dirty_state = set(RENDER_STATES)
+        self.redraw_timer = QTimer(self)
+        self.redraw_timer.setSingleShot(True)
+        self.redraw_timer.timeout.connect(self.update)
+        self._last_frame = 0.0
+        self._applied_state = None      # 已设置的 (光照开关, 线框模式), None表示未知
+        self._transform_serial = 0
+        self._visible_cache = None      # 视锥体裁剪结果, 视图和顶点都未变时复用
         self.lighting = True
+        self.use_shaders = True        # 优先使用GLSL逐像素光照, 不支持时回退到固定管线
+        self.lighting_program = None
         
         # 光照参数初始化 RGB + alpha
         self.light_params = {
@@ -41,9 +114,13 @@ class GLWidget(QGLWidget):
 
         self.smoothing_iterations = 0
         self.max_iterations = 20
-        self.smoothing_timer = QTimer(self)
-        self.smoothing_timer.timeout.connect(self.step_smoothing)
+        self.smoothing_thread = None
+        self.running_threads = set()
+        self.smoothing_interval = 0.2  # 每200ms更新一次
         self.lambda_factor = 0.3  # 默认平滑系数
+        self.smoothing_method = 'explicit'
+        self.smoothing_weights = 'uniform'
+        self.smoothing_tol = 1e-5  # 最大顶点位移小于该值时认为已收敛
         
     def minimumSizeHint(self):
         return QSize(400, 400)
@@ -51,61 +128,238 @@ class GLWidget(QGLWidget):
     def sizeHint(self):
         return QSize(800, 600)
         
+    def request_redraw(self, *states):
+        """
+        标记改变的状态并安排一次重绘; 多次请求合并为一帧, 两帧的间隔不小于显示器的刷新周期
+        :param states: RENDER_STATES 中的名称, 为空时只重绘
+        """
+        self.dirty_state.update(states)
+        if self.redraw_timer.isActive():
+            return
+        wait = self.frame_interval() - (time.perf_counter() - self._last_frame)
+        self.redraw_timer.start(max(0, int(math.ceil(wait * 1000))))
+
+    def frame_interval(self):
+        screen = self.screen() or QGuiApplication.primaryScreen()
+        rate = screen.refreshRate() if screen is not None else 0.0
+        return 1.0 / (rate if rate > 0 else 60.0)
+
     def paintGL(self):
+        start = time.perf_counter()
+        self._last_frame = start
+        dirty, self.dirty_state = self.dirty_state, set()
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glMatrixMode(GL_MODELVIEW)
         glLoadIdentity()
-        self.render()
+        if 'lighting' in dirty:
+            # 在单位模型视图矩阵下设置, 光源位置与着色器一样位于视坐标系
+            self.setup_lighting()
+        self.render(dirty)
+        # CPU端耗时(提交绘制命令), 不包括统计信息本身的绘制
+        self.frame_stats.add(time.perf_counter() - start)
+        if self.show_stats:
+            self.draw_stats()
+
+    def draw_stats(self):
+        stats = self.frame_stats.summary()
+        text = (f"{stats['fps']:.1f} fps  frame p50 {stats['p50_ms']:.2f} ms  "
+                f"p95 {stats['p95_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms  LOD {self.current_lod}")
+        glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT | GL_POLYGON_BIT)
+        glDisable(GL_LIGHTING)
+        glDisable(GL_DEPTH_TEST)
+        glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
+        glColor3f(1.0, 1.0, 0.0)
+        self.renderText(10, 20, text)
+        glPopAttrib()
+
+    def toggle_stats(self):
+        self.show_stats = not self.show_stats
+        self.frame_stats.clear()
+        self.request_redraw()
         
-    def render(self):
+    def render(self, dirty=RENDER_STATES):
+        """
+        :param dirty: 自上一帧以来改变的状态, 未改变的状态不重新设置
+        """
         # 应用模型变换
         glTranslatef(*self.translation)
         glRotatef(self.xRot / 16.0, 1.0, 0.0, 0.0)
         glRotatef(self.yRot / 16.0, 0.0, 1.0, 0.0)
         glRotatef(self.zRot / 16.0, 0.0, 0.0, 1.0)
         glScalef(self.zoom, self.zoom, self.zoom)
-        
-        if self.lighting:
+        if 'transform' in dirty or self._matrices is None:
+            self._matrices = (glGetDoublev(GL_MODELVIEW_MATRIX), glGetDoublev(GL_PROJECTION_MATRIX),
+                              glGetIntegerv(GL_VIEWPORT))
+            self._transform_serial += 1
+
+        if 'lighting' in dirty or 'polygon_mode' in dirty:
+            self.apply_render_state()
+
+        shaded = (self.lighting_program is not None and self.use_shaders and self.lighting
+                  and self.light_params['enabled'] and not self.wireframe)
+        if shaded:
+            # 光照参数未变时不产生GL调用, 改变时只更新一次uniform缓冲
+            self.lighting_program.update(self.light_params, self.material)
+            self.lighting_program.bind()
+        self.draw_mesh()
+        if shaded:
+            self.lighting_program.unbind()
+        if self.picked is not None:
+            self.draw_picked()
+
+    def apply_render_state(self):
+        # 只在光照开关或多边形模式与已设置的不同时产生GL调用
+        state = (self.lighting and self.light_params['enabled'] and not self.wireframe, self.wireframe)
+        if state == self._applied_state:
+            return
+        if state[0]:
             glEnable(GL_LIGHTING)
         else:
             glDisable(GL_LIGHTING)
-            
-        if self.wireframe:
-            glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
-            glDisable(GL_LIGHTING)
-        else:
-            glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
-            
-        self.draw_mesh()
+        glPolygonMode(GL_FRONT_AND_BACK, GL_LINE if self.wireframe else GL_FILL)
+        self._applied_state = state
           
     def draw_mesh(self):
-        if self.mesh.vertices is None or len(self.mesh.vertices) == 0:
+        self.current_lod = self.select_lod_level()
+        if self.current_lod > 0:
+            mesh, buffers = self.lod_levels[self.current_lod - 1], self.lod_buffers[self.current_lod - 1]
+        else:
+            mesh, buffers = self.mesh, self.mesh_buffers
+        if mesh.vertices is None or len(mesh.vertices) == 0:
             return
         
-            
-        glBegin(GL_TRIANGLES)
-        for face in self.mesh.faces:
-            if len(face) < 3:
-                continue
-                
-            # 三角形面
-            if len(face) == 3:
-                for vertex_idx in face:
-                    glNormal3fv(self.mesh.normals[vertex_idx])
-                    glVertex3fv(self.mesh.vertices[vertex_idx])
-            # 多边形面
-            else:
-                for i in range(1, len(face) - 1):
-                    # 绘制三角形扇
-                    glNormal3fv(self.mesh.normals[face[0]])
-                    glVertex3fv(self.mesh.vertices[face[0]])
-                    glNormal3fv(self.mesh.normals[face[i]])
-                    glVertex3fv(self.mesh.vertices[face[i]])
-                    glNormal3fv(self.mesh.normals[face[i+1]])
-                    glVertex3fv(self.mesh.vertices[face[i+1]])
+        # 裁剪时索引缓冲按BVH中的三角形顺序存放, 每个节点对应一段连续的索引;
+        # 光顺过程中顶点每帧都在变化, 不做裁剪以免每帧重算包围盒
+        culled = (self.current_lod == 0 and self.frustum_culling and self.smoothing_thread is None
+                  and self.load_thread is None and mesh.storage is None
+                  and len(mesh.triangles) >= self.cull_min_triangles)
+        tree = mesh.triangle_bvh() if culled else None
+
+        # 拓扑变化时重新上传全部数据; 只有顶点变化(如光顺)时只更新被修改的顶点范围
+        topology = (id(mesh), mesh.topology_version, culled)
+        if buffers.version != topology or buffers.vertex_count != len(mesh.vertices):
+            mesh.consume_dirty_range()
+            buffers.upload(mesh.vertices, mesh.normals, mesh.triangles[tree.order] if culled else mesh.triangles)
+            buffers.version = topology
+        else:
+            dirty_range = mesh.consume_dirty_range()
+            if dirty_range is not None:
+                buffers.update_geometry(mesh.vertices, mesh.normals, *dirty_range)
+        if culled:
+            key = (id(mesh), mesh.topology_version, mesh.geometry_version, self._transform_serial)
+            if self._visible_cache is None or self._visible_cache[0] != key:
+                ranges = tree.visible_ranges(frustum_planes(*self._matrices[:2]), self.cull_chunk_size)
+                self._visible_cache = (key, ranges)
+            buffers.draw(self._visible_cache[1])
+        else:
+            buffers.draw()
+
+    def draw_picked(self):
+        # 高亮拾取的面(轮廓)和顶点, 不受深度测试影响
+        corners = self.mesh.faces[self.picked['face']]
+        glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT | GL_LINE_BIT | GL_POINT_BIT)
+        glDisable(GL_LIGHTING)
+        glDisable(GL_DEPTH_TEST)
+        glColor3f(1.0, 1.0, 0.0)
+        glLineWidth(2.0)
+        glBegin(GL_LINE_LOOP)
+        for index in corners:
+            glVertex3fv(self.mesh.vertices[index])
         glEnd()
+        glPointSize(8.0)
+        glBegin(GL_POINTS)
+        glVertex3fv(self.mesh.vertices[self.picked['vertex']])
+        glEnd()
+        glPopAttrib()
+
+    def pick_at(self, x, y):
+        """
+        拾取窗口坐标 (x, y) 处的面和顶点
+        :return: 见 Mesh.pick
+        """
+        if self._matrices is None or len(self.mesh.vertices) == 0:
+            return None
+        modelview, projection, viewport = self._matrices
+        window_y = self.height() - y
+        near = np.array(gluUnProject(x, window_y, 0.0, modelview, projection, viewport))
+        far = np.array(gluUnProject(x, window_y, 1.0, modelview, projection, viewport))
+        self.picked = self.mesh.pick(near, far - near)
+        if self.picked is None:
+            self.status_message.emit("Nothing picked")
+        else:
+            point = self.mesh.vertices[self.picked['vertex']]
+            self.status_message.emit(
+                f"Face {self.picked['face']}, vertex {self.picked['vertex']} "
+                f"({point[0]:.4f}, {point[1]:.4f}, {point[2]:.4f})")
+        self.request_redraw()
+        return self.picked
+
+    def select_lod_level(self):
+        """
+        :return: 0表示原网格, k表示 lod_levels[k-1]
+        """
+        version = (id(self.mesh), self.mesh.topology_version, self.mesh.geometry_version)
+        if not self.lod_levels or self.lod_version != version:
+            # 顶点已改变(例如正在光顺), 简化结果不再对应当前网格
+            return 0
+        if self.interacting:
+            return len(self.lod_levels)
+
+        # 模型已缩放到单位大小, 包围球半径约为 zoom*sqrt(3)/2, 按投影直径估计覆盖的像素数
+        radius = 0.5 * math.sqrt(3.0) * self.zoom
+        distance = max(-self.translation[2], 1e-3)
+        diameter = radius / (distance * math.tan(math.radians(22.5))) * min(self.width(), self.height())
+        budget = diameter * diameter * self.lod_triangles_per_pixel
+        for level, mesh in enumerate([self.mesh] + self.lod_levels):
+            if len(mesh.triangles) <= budget:
+                return level
+        return len(self.lod_levels)
+
+    def start_lod_build(self):
+        """ 丢弃旧的细节层次, 网格足够大时在后台重新构建 """
+        version = (id(self.mesh), self.mesh.topology_version, self.mesh.geometry_version)
+        if version in (self.lod_version, self.lod_thread and self.lod_thread.version):
+            return
+        if self.lod_thread is not None:
+            self.lod_thread.cancel()
+            self.lod_thread = None
+        if self.lod_buffers:
+            self.makeCurrent()
+            for buffers in self.lod_buffers:
+                buffers.release()
+        self.lod_levels, self.lod_buffers, self.lod_version = [], [], None
+        # 简化需要把整个网格读入内存, 外存模式下不构建LOD
+        if len(self.mesh.triangles) < self.lod_min_triangles or self.mesh.storage is not None:
+            return
+
+        self.lod_thread = LodThread(self.mesh, self.lod_ratios, self.triangle_order, parent=self)
+        self.lod_thread.levels_ready.connect(self.on_lod_ready)
+        self.lod_thread.failed.connect(self.on_lod_failed)
+        self.track_thread(self.lod_thread)
+        self.lod_thread.start()
+
+    def on_lod_ready(self, levels, version):
+        if self.sender() is not self.lod_thread:
+            return
+        self.lod_thread = None
+        self.lod_levels = levels
+        self.lod_buffers = [MeshBuffers() for _ in levels]
+        self.lod_version = version
+        self.status_message.emit(
+            "LOD levels: " + ", ".join(str(len(level.triangles)) for level in [self.mesh] + levels) + " triangles")
+        self.request_redraw('geometry')
+
+    def on_lod_failed(self, message):
+        print(f"LOD error: {message}")
+        self.status_message.emit(f"LOD error: {message}")
+
+    def end_interaction(self):
+        # 交互停止后切换回与屏幕大小匹配的层级
+        self.interacting = False
+        self.request_redraw('geometry')
         
     def resizeGL(self, width, height):
+        self.dirty_state.add('transform')
         side = min(width, height)
         glViewport((width - side) // 2, (height - side) // 2, side, side)
         
@@ -115,7 +369,15 @@ class GLWidget(QGLWidget):
         gluPerspective(45.0, aspect, 0.1, 100.0)
         
     def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and event.modifiers() & Qt.ControlModifier:
+            self.lastPos = None
+            self.pick_at(event.x(), event.y())
+            return
         self.lastPos = event.pos()
+        self.interacting = True
+
+    def mouseReleaseEvent(self, event):
+        self.end_interaction()
         
     def mouseMoveEvent(self, event):
         if self.lastPos is None:
@@ -132,7 +394,7 @@ class GLWidget(QGLWidget):
             self.translation[1] -= dy * 0.01
             
         self.lastPos = event.pos()
-        self.update()
+        self.request_redraw('transform')
         
     def wheelEvent(self, event):
         delta = event.angleDelta().y()
@@ -140,51 +402,183 @@ class GLWidget(QGLWidget):
             self.zoom *= 1.1
         elif delta < 0:
             self.zoom /= 1.1
-        self.update()
+        # 滚轮停止一段时间后再恢复精细层级
+        self.interacting = True
+        self.refine_timer.start(300)
+        self.request_redraw('transform')
     
     # 加载网格文件
     def load_mesh(self, filename):
-        if filename.lower().endswith('.obj'):
-            self.mesh.load_obj(filename)
-        elif filename.lower().endswith('.off'):
-            self.mesh.load_off(filename)
-        else:
+        """
+        在界面线程中同步加载
+        :return: 是否命中网格缓存
+        """
+        if not filename.lower().endswith(mesh_io.SUPPORTED_EXTENSIONS):
             raise ValueError("Unsupported file format")
-            
-        self.update()
+        self.cancel_loading()
+        self.stop_smoothing_animation()
+        mesh, cache_hit, self.triangle_order_stats, self.weld_stats = load_mesh_file(
+            filename, self.mesh_cache, self.triangle_order, out_of_core=self.use_out_of_core(filename),
+            storage_dir=self.out_of_core_dir, weld_tolerance=self.weld_tolerance)
+        self.set_mesh(mesh)
+        return cache_hit
+
+    def save_mesh(self, filename):
+        """ 保存当前显示的网格(光顺过程中为最近一帧的结果), 格式见 Mesh.save """
+        self.mesh.save(filename)
+
+    def load_mesh_async(self, filename):
+        """
+        在后台线程中加载, 进度通过 status_message 报告, 解析过程中显示已读取的部分, 完成后发出 mesh_loaded
+        """
+        if not filename.lower().endswith(mesh_io.SUPPORTED_EXTENSIONS):
+            raise ValueError("Unsupported file format")
+        self.cancel_loading()
+        self.stop_smoothing_animation()
+        self._mesh_before_load = self.mesh
+        self.load_thread = LoadThread(filename, self.mesh_cache, self.triangle_order, parent=self,
+                                      out_of_core=self.use_out_of_core(filename), storage_dir=self.out_of_core_dir,
+                                      weld_tolerance=self.weld_tolerance)
+        self.load_thread.progress.connect(self.on_load_progress)
+        self.load_thread.partial_ready.connect(self.on_load_partial)
+        self.load_thread.loaded.connect(self.on_load_finished)
+        self.load_thread.failed.connect(self.on_load_failed)
+        self.track_thread(self.load_thread)
+        self.load_thread.start()
+
+    def use_out_of_core(self, filename):
+        return self.out_of_core_min_bytes is not None and os.path.getsize(filename) >= self.out_of_core_min_bytes
+
+    def cancel_loading(self):
+        """ 取消后台加载并恢复加载前的网格 """
+        if self.load_thread is None:
+            return False
+        self.load_thread.cancel()
+        self.load_thread = None
+        self.set_mesh(self._mesh_before_load, build_lod=False)
+        self._mesh_before_load = None
+        return True
+
+    def set_mesh(self, mesh, build_lod=True):
+        mesh.workers = self.mesh_workers
+        self.mesh = mesh
+        self.picked = None
+        if build_lod:
+            self.start_lod_build()
+        self.request_redraw('geometry')
+
+    def on_load_progress(self, consumed, total, face_count):
+        if self.sender() is not self.load_thread:
+            return
+        name = os.path.basename(self.load_thread.filename)
+        self.status_message.emit(f"Loading {name}: {consumed / 1024 ** 2:.1f}/{total / 1024 ** 2:.1f} MB, "
+                                 f"{face_count} faces")
+
+    def on_load_partial(self, mesh):
+        if self.sender() is not self.load_thread:
+            return
+        # 预览不构建LOD, 也不做视锥体裁剪(避免为每个预览建立BVH)
+        self.set_mesh(mesh, build_lod=False)
+
+    def on_load_finished(self, mesh, cache_hit, order_stats, weld_stats):
+        if self.sender() is not self.load_thread:
+            return
+        filename = self.load_thread.filename
+        self.load_thread = None
+        self._mesh_before_load = None
+        self.triangle_order_stats = order_stats
+        self.weld_stats = weld_stats
+        self.set_mesh(mesh)
+        self.mesh_loaded.emit(filename, cache_hit)
+
+    def on_load_failed(self, message):
+        if self.sender() is not self.load_thread:
+            return
+        self.cancel_loading()
+        print(f"Load error: {message}")
+        self.status_message.emit(f"Error: {message}")
         
     # 网格显示模式切换
     def toggle_wireframe(self):
         self.wireframe = not self.wireframe
-        self.update()
+        self.request_redraw('polygon_mode')
         
     def stereo_format(self):
         fmt = self.format()
         fmt.setStereo(True)
         return fmt
     
-    def step_smoothing(self):
-        if self.smoothing_iterations < self.max_iterations:
-            try:
-                self.mesh.laplacian_smoothing(iterations=1, lambda_factor=self.lambda_factor)
-                self.smoothing_iterations += 1
-                
-                main_window = self.parent().parent()  # QGLWidget -> CentralWidget -> MainWindow
-                if hasattr(main_window, 'update_iteration_label'):
-                    main_window.update_iteration_label(self.smoothing_iterations)
-                    
-                self.update()
-            except Exception as e:
-                print(f"Smoothing error: {e}")
-                self.smoothing_timer.stop()
-        else:
-            self.smoothing_timer.stop()
-    
-    def start_smoothing_animation(self, max_iter=20, lambda_factor=0.3):
+    def start_smoothing_animation(self, max_iter=20, lambda_factor=0.3, method='explicit', weights='uniform'):
+        if self.load_thread is not None:
+            self.status_message.emit("Mesh is still loading")
+            return
+        self.stop_smoothing_animation()
         self.max_iterations = max_iter
         self.lambda_factor = lambda_factor
+        self.smoothing_method = method
+        self.smoothing_weights = weights
         self.smoothing_iterations = 0
-        self.smoothing_timer.start(200)  # 每200ms更新一次
+
+        # 光顺在后台线程中进行, 界面线程只负责交换顶点数组并重绘
+        self.smoothing_thread = SmoothingThread(
+            self.mesh, max_iter, interval=self.smoothing_interval, parent=self,
+            lambda_factor=lambda_factor, method=method, weights=weights, tol=self.smoothing_tol)
+        self.smoothing_thread.frame_ready.connect(self.swap_smoothed_buffers)
+        self.smoothing_thread.progress.connect(self.on_smoothing_progress)
+        self.smoothing_thread.failed.connect(self.on_smoothing_failed)
+        self.smoothing_thread.finished.connect(self.on_smoothing_finished)
+        self.track_thread(self.smoothing_thread)
+        self.smoothing_thread.start()
+
+    def stop_smoothing_animation(self, wait=False):
+        """
+        :param wait: 是否等待后台线程结束(退出程序时需要), 否则只发出取消请求立即返回
+        """
+        if self.smoothing_thread is not None:
+            self.smoothing_thread.cancel()
+            self.smoothing_thread = None
+        if wait:
+            if self.lod_thread is not None:
+                self.lod_thread.cancel()
+            if self.load_thread is not None:
+                self.load_thread.cancel()
+            for thread in list(self.running_threads):
+                thread.wait()
+
+    def track_thread(self, thread):
+        # 保留仍在运行(包括已取消)的后台线程, 结束后再释放
+        self.running_threads.add(thread)
+        thread.finished.connect(lambda: self.running_threads.discard(thread))
+        thread.finished.connect(thread.deleteLater)
+
+    def swap_smoothed_buffers(self, vertices, normals):
+        # 忽略已取消的线程仍在队列中的结果
+        if self.sender() is not self.smoothing_thread:
+            return
+        self.mesh.vertices = vertices
+        self.mesh.normals = normals
+        # 外存网格的后台线程在此之后才写入另一组映射数组
+        self.smoothing_thread.frame_consumed()
+        self.request_redraw('geometry')
+
+    def on_smoothing_progress(self, iterations, stats):
+        if self.sender() is not self.smoothing_thread:
+            return
+        self.smoothing_iterations = iterations
+        self.smoothing_progress.emit(iterations)
+        if self.smoothing_method == 'implicit':
+            self.status_message.emit(
+                f"CG iterations: {stats['cg_iterations']}, residual: {stats['residual']:.2e}")
+
+    def on_smoothing_finished(self):
+        # 光顺正常结束(未被取消)后按新的顶点重新构建LOD
+        if self.sender() is self.smoothing_thread:
+            self.smoothing_thread = None
+            self.start_lod_build()
+
+    def on_smoothing_failed(self, message):
+        print(f"Smoothing error: {message}")
+        self.status_message.emit(f"Smoothing error: {message}")
 
     def initializeGL(self):
         """
@@ -197,12 +591,27 @@ class GLWidget(QGLWidget):
         glEnable(GL_NORMALIZE)
         glShadeModel(GL_SMOOTH)
         
-        # 设置光照
-        self.setup_lighting()
+        try:
+            self.lighting_program = PhongProgram()
+        except (RuntimeError, GLError) as e:
+            print(f"Falling back to fixed-function lighting: {e}")
+            self.lighting_program = None
+
+        # 新的上下文中所有状态都需要重新设置
+        self._applied_state = None
+        self.dirty_state.update(RENDER_STATES)
+
+    def set_shader_lighting(self, enabled):
+        """ 切换GLSL逐像素光照与固定管线光照 """
+        self.use_shaders = enabled
+        self.request_redraw('lighting')
         
     def setup_lighting(self):
+        """ 设置固定管线的光源和材质, 由 paintGL 在光照参数改变后调用; GL_LIGHTING 的开关见 apply_render_state """
+        if self.lighting_program is not None and self.use_shaders:
+            # 着色器路径在绘制前从 light_params/material 整体更新uniform缓冲
+            return
         if self.light_params['enabled']:
-            glEnable(GL_LIGHTING)
             glEnable(GL_LIGHT0)
             
             # 光源属性
@@ -216,6 +625,4 @@ class GLWidget(QGLWidget):
             glMaterialfv(GL_FRONT, GL_DIFFUSE, self.material['diffuse'])
             glMaterialfv(GL_FRONT, GL_SPECULAR, self.material['specular'])
             glMaterialfv(GL_FRONT, GL_EMISSION, self.material['emission'])
-            glMaterialfv(GL_FRONT, GL_SHININESS, self.light_params['shininess'])
-        else:
-            glDisable(GL_LIGHTING)
\ No newline at end of file
+            glMaterialfv(GL_FRONT, GL_SHININESS, self.light_params['shininess'])
\ No newline at end of file
@@ -0,0 +1,179 @@
+"""
+网格Laplacian算子(稀疏矩阵, CSR格式, 只依赖NumPy)
+"""
+import numpy as np
+import parallel
+
+
+class LaplacianOperator:
+    """
+    L = D^-1 W - I, W为对称权重矩阵, D为W的行和
+    作用在顶点坐标上得到每个顶点到其邻居加权平均的位移(伞形算子)
+    """
+    def __init__(self, num_vertices, rows, cols, weights=None):
+        """
+        :param rows, cols: W中非零元素的行列号(需同时包含 (i,j) 与 (j,i))
+        :param weights: 非零元素的值, None表示全部为1(均匀权重)
+        """
+        order = np.argsort(rows, kind='stable')
+        self.num_vertices = num_vertices
+        self.indices = np.ascontiguousarray(cols[order], dtype=np.int32)
+        self.weights = None if weights is None else np.ascontiguousarray(weights[order], dtype=np.float64)
+        counts = np.bincount(rows, minlength=num_vertices)
+        self.indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+
+        self._nonempty = counts > 0  # 没有邻居的孤立顶点保持不动
+        self._row_starts = self.indptr[:-1][self._nonempty]
+        if self.weights is None:
+            self.degree = counts.astype(np.float64)
+        else:
+            self.degree = np.zeros(num_vertices)
+            self.degree[self._nonempty] = np.add.reduceat(self.weights, self._row_starts)
+        self._inv_degree = np.zeros(num_vertices)
+        valid = self.degree != 0
+        self._inv_degree[valid] = 1.0 / self.degree[valid]
+
+    @classmethod
+    def uniform(cls, num_vertices, edges):
+        """ 均匀权重(每个邻居权重为1) """
+        rows = np.concatenate([edges[:, 0], edges[:, 1]])
+        cols = np.concatenate([edges[:, 1], edges[:, 0]])
+        return cls(num_vertices, rows, cols)
+
+    @classmethod
+    def cotangent(cls, num_vertices, triangles, vertices):
+        """
+        余切权重: 边 (i,j) 的权重为其两侧三角形中对角余切之和的一半
+        权重由传入的顶点位置计算一次后固定; 钝角导致的负权重截断为0以保证迭代稳定
+        """
+        triangles = np.asarray(triangles, dtype=np.int64)
+        vertices = np.asarray(vertices, dtype=np.float64)
+        rows, cols, weights = [], [], []
+        for k in range(3):
+            # 角点k所对的边为 (i, j)
+            i, j = triangles[:, (k + 1) % 3], triangles[:, (k + 2) % 3]
+            a = vertices[i] - vertices[triangles[:, k]]
+            b = vertices[j] - vertices[triangles[:, k]]
+            cross = np.linalg.norm(np.cross(a, b), axis=1)
+            dot = np.einsum('ij,ij->i', a, b)
+            cot = np.divide(dot, cross, out=np.zeros_like(dot), where=cross > 0)
+            rows.append(i)
+            cols.append(j)
+            weights.append(0.5 * cot)
+        rows, cols, weights = np.concatenate(rows), np.concatenate(cols), np.concatenate(weights)
+
+        # 合并同一条无向边在两侧三角形中的贡献
+        lo, hi = np.minimum(rows, cols), np.maximum(rows, cols)
+        keys = lo * num_vertices + hi
+        order = np.argsort(keys, kind='stable')
+        keys, weights = keys[order], weights[order]
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1]))) if len(keys) else keys
+        edge_keys = keys[starts]
+        edge_weights = np.maximum(np.add.reduceat(weights, starts), 0.0) if len(keys) else weights
+        keep = (edge_weights > 0) & (edge_keys // num_vertices != edge_keys % num_vertices)
+        lo, hi, edge_weights = edge_keys[keep] // num_vertices, edge_keys[keep] % num_vertices, edge_weights[keep]
+        return cls(num_vertices, np.concatenate([lo, hi]), np.concatenate([hi, lo]),
+                   np.concatenate([edge_weights, edge_weights]))
+
+    def _rows_weighted_sum(self, x, start, stop):
+        # 第 [start, stop) 行的 W x, 每行按邻居的顺序依次相加, 与分块方式无关
+        lo, hi = self.indptr[start], self.indptr[stop]
+        values = np.take(x, self.indices[lo:hi], axis=0)
+        if self.weights is not None:
+            values *= self.weights[lo:hi, np.newaxis]
+        nonempty = self._nonempty[start:stop]
+        row_starts = self.indptr[start:stop][nonempty] - lo
+        if len(row_starts) == stop - start:
+            return np.add.reduceat(values, row_starts, axis=0)
+        result = np.zeros((stop - start,) + x.shape[1:], dtype=values.dtype)
+        if len(row_starts):
+            result[nonempty] = np.add.reduceat(values, row_starts, axis=0)
+        return result
+
+    def weighted_sum(self, x, workers=1):
+        """
+        计算 W x, x为 (N,k) 数组
+        :param workers: 线程数, 按行分块并行计算, 结果与单线程逐位相同
+        """
+        result = np.empty((self.num_vertices,) + x.shape[1:], dtype=x.dtype)
+
+        def rows(start, stop):
+            result[start:stop] = self._rows_weighted_sum(x, start, stop)
+
+        parallel.for_chunks(rows, self.num_vertices, workers)
+        return result
+
+    def _rows_apply(self, x, start, stop):
+        displacement = (self._rows_weighted_sum(x, start, stop)
+                        * self._inv_degree[start:stop, np.newaxis]).astype(x.dtype) - x[start:stop]
+        displacement[~self._nonempty[start:stop]] = 0
+        return displacement
+
+    def apply(self, x, workers=1):
+        """ 计算 L x = D^-1 W x - x, 孤立顶点处为0 """
+        result = np.empty_like(x)
+
+        def rows(start, stop):
+            result[start:stop] = self._rows_apply(x, start, stop)
+
+        parallel.for_chunks(rows, self.num_vertices, workers)
+        return result
+
+    def step(self, x, factor, workers=1):
+        """ 显式迭代一步 x + factor * L x, 按行分块时每块只读取x, 写入新数组中自己的行 """
+        result = np.empty_like(x)
+
+        def rows(start, stop):
+            result[start:stop] = x[start:stop] + factor * self._rows_apply(x, start, stop)
+
+        parallel.for_chunks(rows, self.num_vertices, workers)
+        return result
+
+    def solve_implicit(self, x, lambda_factor, x0=None, tol=1e-6, maxiter=200, workers=1):
+        """
+        向后欧拉(隐式)光顺: 求解 (I - λL) x' = x
+        两边乘D得到对称正定系统 ((1+λ)D - λW) x' = D x, 用Jacobi预条件共轭梯度法求解;
+        孤立顶点所在行替换为 x'_i = x_i
+        :param x0: 初始解(例如上一次的结果), 默认为x
+        :param workers: 矩阵-向量乘法的线程数
+        :return: (x', {'iterations': 迭代次数, 'residual': 最大相对残差})
+        """
+        isolated = ~self._nonempty
+        diagonal = (1.0 + lambda_factor) * self.degree
+        diagonal[isolated] = 1.0
+
+        def matvec(v):
+            result = diagonal[:, np.newaxis] * v - lambda_factor * self.weighted_sum(v, workers)
+            result[isolated] = v[isolated]
+            return result
+
+        x = np.asarray(x, dtype=np.float64)
+        b = self.degree[:, np.newaxis] * x
+        b[isolated] = x[isolated]
+        solution = np.array(x if x0 is None else x0, dtype=np.float64)
+        inv_diagonal = 1.0 / diagonal[:, np.newaxis]
+
+        # 三个坐标分量作为三个右端项同时迭代
+        b_norm = np.linalg.norm(b, axis=0)
+        b_norm[b_norm == 0] = 1.0
+        residual = b - matvec(solution)
+        z = inv_diagonal * residual
+        direction = z.copy()
+        rz = np.einsum('ij,ij->j', residual, z)
+        iterations = 0
+        relative = np.max(np.linalg.norm(residual, axis=0) / b_norm)
+        while relative > tol and iterations < maxiter:
+            a_direction = matvec(direction)
+            denominator = np.einsum('ij,ij->j', direction, a_direction)
+            alpha = np.divide(rz, denominator, out=np.zeros_like(rz), where=denominator != 0)
+            solution += alpha * direction
+            residual -= alpha * a_direction
+            iterations += 1
+            relative = np.max(np.linalg.norm(residual, axis=0) / b_norm)
+            z = inv_diagonal * residual
+            rz_new = np.einsum('ij,ij->j', residual, z)
+            beta = np.divide(rz_new, rz, out=np.zeros_like(rz), where=rz != 0)
+            direction = z + beta * direction
+            rz = rz_new
+        return solution, {'iterations': iterations, 'residual': float(relative)}
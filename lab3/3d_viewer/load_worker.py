@@ -0,0 +1,125 @@
+"""
+在后台线程中加载网格文件, 解析过程中报告进度并提供已读取部分的预览
+"""
+import os
+import threading
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from mesh import Mesh
+from mesh_cache import content_hasher
+import mesh_io
+
+
+def load_mesh_file(filename, mesh_cache=None, triangle_order=None, callback=None, chunk_size=mesh_io.CHUNK_SIZE,
+                   out_of_core=False, storage_dir=None, weld_tolerance=None, cancelled=None):
+    """
+    加载网格文件(优先读取缓存), 按需焊接顶点并重排三角形; 焊接和重排后的结果写入缓存, 命中时不再重复计算
+    :param callback: 见 Mesh.load_chunked; 二进制PLY/STL一次映射读取, 只在读取完成后调用一次(snapshot为None)
+    :param triangle_order: 三角形的重排方式(见 Mesh.reorder_triangles), 不同的重排方式单独缓存
+    :param out_of_core: 以外存模式加载OBJ/OFF(见 Mesh.load_out_of_core), 不使用缓存, 不焊接也不重排三角形
+    :param storage_dir: 外存模式下映射文件的父目录
+    :param weld_tolerance: 居中缩放后焊接顶点的容差(见 Mesh.weld_vertices), None表示不焊接; 焊接后的网格单独缓存
+    :param cancelled: 可选, 每个阶段(读取、焊接、重排三角形、写入缓存)开始前调用, 返回True时停止加载
+    :return: (网格, 是否命中缓存, 三角形重排的统计信息或None, 焊接的统计信息或None), 两项统计信息在
+             未焊接/未重排或命中缓存时为None; 被取消时返回None
+    """
+    def stop():
+        return cancelled is not None and cancelled()
+
+    mesh = Mesh()
+    chunked = filename.lower().endswith(('.obj', '.off'))
+    if out_of_core and chunked:
+        if not mesh.load_out_of_core(filename, storage_dir, chunk_size, callback) or stop():
+            return None
+        return mesh, False, None, None
+    options = {}
+    if weld_tolerance is not None:
+        options['weld_tolerance'] = weld_tolerance
+    if triangle_order is not None:
+        options['triangle_order'] = triangle_order
+    options = options or None  # 未焊接也未重排时与原先的缓存键相同
+    cache_hit = mesh_cache is not None and mesh_cache.load(filename, mesh, options)
+    order_stats = weld_stats = content = None
+    if not cache_hit:
+        if chunked:
+            # 解析时顺便计算写入缓存所需的内容哈希; 映射读取的PLY/STL由缓存在写入时计算(页面已在内存中)
+            content = content_hasher() if mesh_cache is not None else None
+            if not mesh.load_chunked(filename, chunk_size, callback, content):
+                return None
+        else:
+            mesh.load(filename)
+            total = os.path.getsize(filename)
+            if callback is not None and callback(total, total, len(mesh.face_offsets) - 1, None) is False:
+                return None
+        if stop():
+            return None
+        if weld_tolerance is not None:
+            weld_stats = mesh.weld_vertices(weld_tolerance)
+            if stop():
+                return None
+        if triangle_order is not None:
+            order_stats = mesh.reorder_triangles(triangle_order)
+            if stop():
+                return None
+        if mesh_cache is not None:
+            mesh_cache.store(filename, mesh, options, content)
+    if stop():
+        return None
+    return mesh, cache_hit, order_stats, weld_stats
+
+
+class LoadThread(QThread):
+    progress = pyqtSignal(object, object, object)    # (已处理字节数, 文件字节数, 已读面数)
+    partial_ready = pyqtSignal(object)               # 由已读部分构成的网格
+    loaded = pyqtSignal(object, bool, object, object)  # (网格, 是否命中缓存, 三角形重排和焊接的统计信息)
+    failed = pyqtSignal(str)
+
+    def __init__(self, filename, mesh_cache=None, triangle_order=None, parent=None,
+                 chunk_size=mesh_io.CHUNK_SIZE, partial_interval=1.0, partial_growth=1.5,
+                 out_of_core=False, storage_dir=None, weld_tolerance=None):
+        """
+        :param out_of_core, storage_dir, weld_tolerance: 见 load_mesh_file, 外存模式下没有预览
+        :param partial_interval: 两次预览之间的最短时间(秒)
+        :param partial_growth: 面数至少增长到上次预览的这个倍数时才生成新的预览,
+                               每次预览都要重新拼接和计算法向量, 按几何级数增长时总开销不超过最终网格的常数倍
+        """
+        super().__init__(parent)
+        self.filename = filename
+        self.mesh_cache = mesh_cache
+        self.triangle_order = triangle_order
+        self.chunk_size = chunk_size
+        self.out_of_core = out_of_core
+        self.storage_dir = storage_dir
+        self.weld_tolerance = weld_tolerance
+        self.partial_interval = partial_interval
+        self.partial_growth = partial_growth
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        # 当前块解析或当前阶段(焊接、重排三角形、写入缓存)完成后停止
+        self._cancel.set()
+
+    def run(self):
+        last_time = time.perf_counter()
+        last_faces = 0
+
+        def callback(consumed, total, face_count, snapshot):
+            nonlocal last_time, last_faces
+            if self._cancel.is_set():
+                return False
+            self.progress.emit(consumed, total, face_count)
+            now = time.perf_counter()
+            if snapshot is not None and consumed < total and now - last_time >= self.partial_interval \
+                    and face_count >= max(1, last_faces * self.partial_growth):
+                self.partial_ready.emit(snapshot())
+                last_time, last_faces = time.perf_counter(), face_count
+            return not self._cancel.is_set()
+
+        try:
+            result = load_mesh_file(self.filename, self.mesh_cache, self.triangle_order, callback,
+                                    self.chunk_size, self.out_of_core, self.storage_dir, self.weld_tolerance,
+                                    self._cancel.is_set)
+            if result is not None and not self._cancel.is_set():
+                self.loaded.emit(*result)
+        except Exception as e:
+            self.failed.emit(str(e))
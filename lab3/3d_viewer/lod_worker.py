@@ -0,0 +1,39 @@
+"""
+在后台线程中构建网格的细节层次(LOD)
+"""
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class LodThread(QThread):
+    levels_ready = pyqtSignal(object, object)   # (由细到粗的简化网格列表, 源网格版本)
+    failed = pyqtSignal(str)
+
+    def __init__(self, mesh, ratios=(0.25, 0.0625), triangle_order=None, parent=None):
+        """
+        :param mesh: 源网格, 线程使用其当前顶点数组的副本
+        :param ratios: 见 Mesh.build_lod
+        :param triangle_order: 简化后三角形的重排方式, 见 Mesh.reorder_triangles
+        """
+        super().__init__(parent)
+        self.source = mesh.shallow_copy()
+        self.version = (id(mesh), mesh.topology_version, mesh.geometry_version)
+        self.ratios = ratios
+        self.triangle_order = triangle_order
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        # 当前层简化完成后停止
+        self._cancel.set()
+
+    def run(self):
+        try:
+            levels = self.source.build_lod(self.ratios, cancelled=self._cancel.is_set)[1:]
+            if self._cancel.is_set():
+                return
+            if self.triangle_order is not None:
+                for level in levels:
+                    level.reorder_triangles(self.triangle_order)
+            self.levels_ready.emit(levels, self.version)
+        except Exception as e:
+            self.failed.emit(str(e))
@@ -5,7 +5,7 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QPushButton, QFileDialog, 
                            QLabel, QSlider, QGroupBox, QCheckBox,
-                           QFormLayout)
+                           QFormLayout, QComboBox)
 from PyQt5.QtCore import Qt
 from gl_widget import GLWidget
 import os
@@ -24,6 +24,9 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(main_layout)
         
         self.glWidget = GLWidget(central_widget) # 创建OpenGL窗口
+        self.glWidget.smoothing_progress.connect(self.update_iteration_label)
+        self.glWidget.status_message.connect(self.statusBar().showMessage)
+        self.glWidget.mesh_loaded.connect(self.on_model_loaded)
         main_layout.addWidget(self.glWidget)
         
         control_panel = QWidget()
@@ -34,10 +37,35 @@ class MainWindow(QMainWindow):
         self.load_button = QPushButton("加载模型")
         self.load_button.clicked.connect(self.load_model)
         control_layout.addWidget(self.load_button)
+
+        self.save_button = QPushButton("保存模型")
+        self.save_button.clicked.connect(self.save_model)
+        control_layout.addWidget(self.save_button)
+
+        self.cancel_load_button = QPushButton("取消加载")
+        self.cancel_load_button.clicked.connect(self.cancel_loading)
+        control_layout.addWidget(self.cancel_load_button)
         
         self.wireframe_button = QPushButton("显示网格")
         self.wireframe_button.clicked.connect(self.glWidget.toggle_wireframe)
         control_layout.addWidget(self.wireframe_button)
+
+        self.stats_button = QPushButton("显示帧率")
+        self.stats_button.clicked.connect(self.glWidget.toggle_stats)
+        control_layout.addWidget(self.stats_button)
+
+        self.order_combo = QComboBox()
+        self.order_combo.addItems(["Original Order", "Tipsify", "Morton"])
+        self.order_combo.setToolTip("加载时三角形的绘制顺序")
+        control_layout.addWidget(self.order_combo)
+
+        self.weld_toggle = QCheckBox("焊接顶点")
+        self.weld_toggle.setToolTip("加载时合并重合的顶点(如UV接缝处拆开的顶点)并删除退化的面")
+        control_layout.addWidget(self.weld_toggle)
+        
+        self.clear_cache_button = QPushButton("清除缓存")
+        self.clear_cache_button.clicked.connect(self.clear_cache)
+        control_layout.addWidget(self.clear_cache_button)
         
         # 添加平滑控制组件
         smoothing_group = QGroupBox("Laplacian Smoothing")
@@ -63,6 +91,14 @@ class MainWindow(QMainWindow):
         smoothing_layout.addWidget(QLabel("Lambda:"))
         smoothing_layout.addWidget(self.lambda_slider)
         
+        self.method_combo = QComboBox()
+        self.method_combo.addItems(["Explicit", "Implicit", "Taubin"])
+        smoothing_layout.addWidget(self.method_combo)
+        
+        self.weights_combo = QComboBox()
+        self.weights_combo.addItems(["Uniform", "Cotangent"])
+        smoothing_layout.addWidget(self.weights_combo)
+        
         self.iteration_label = QLabel("Iteration: 0/20")
         smoothing_layout.addWidget(self.iteration_label)
         
@@ -79,6 +115,12 @@ class MainWindow(QMainWindow):
         self.light_toggle.stateChanged.connect(self.toggle_lighting)
         light_layout.addWidget(self.light_toggle)
         
+        # 逐像素光照(GLSL)开关, 取消后使用固定管线光照
+        self.shader_toggle = QCheckBox("Per-pixel Lighting (GLSL)")
+        self.shader_toggle.setChecked(True)
+        self.shader_toggle.stateChanged.connect(self.toggle_shader_lighting)
+        light_layout.addWidget(self.shader_toggle)
+        
         # 光源位置控制
         pos_group = QGroupBox("Light Position")
         pos_layout = QHBoxLayout()
@@ -120,25 +162,74 @@ class MainWindow(QMainWindow):
 
         self.statusBar().showMessage("Ready")
         
+    def closeEvent(self, event):
+        self.glWidget.stop_smoothing_animation(wait=True)
+        super().closeEvent(event)
+
     def load_model(self):
         filename, _ = QFileDialog.getOpenFileName(
-            self, "Open 3D Model", "", "3D Model Files (*.obj *.off)")
+            self, "Open 3D Model", "", "3D Model Files (*.obj *.off *.ply *.stl)")
             
         if filename:
             try:
-                self.glWidget.load_mesh(filename)
-                self.statusBar().showMessage(f"Loaded: {os.path.basename(filename)}")
+                order = self.order_combo.currentText().lower()
+                self.glWidget.triangle_order = None if order == "original order" else order
+                self.glWidget.weld_tolerance = 1e-6 if self.weld_toggle.isChecked() else None
+                # 后台加载, 完成后由 on_model_loaded 显示结果
+                self.glWidget.load_mesh_async(filename)
             except Exception as e:
                 self.statusBar().showMessage(f"Error: {str(e)}")
                 print(str(e))
 
+    def save_model(self):
+        filename, selected = QFileDialog.getSaveFileName(
+            self, "Save 3D Model", "", "OBJ Files (*.obj);;OFF Files (*.off);;Binary PLY Files (*.ply)")
+        if filename:
+            if not filename.lower().endswith(('.obj', '.off', '.ply')):
+                # 没有输入扩展名时使用所选的文件类型
+                filename += selected[selected.index('*') + 1:selected.index(')')]
+            try:
+                self.glWidget.save_mesh(filename)
+                self.statusBar().showMessage(f"Saved: {os.path.basename(filename)}")
+            except Exception as e:
+                self.statusBar().showMessage(f"Error: {str(e)}")
+                print(str(e))
+
+    def on_model_loaded(self, filename, cache_hit):
+        stats = self.glWidget.mesh_cache.stats()
+        message = (f"Loaded: {os.path.basename(filename)} "
+                   f"(cache {'hit' if cache_hit else 'miss'}, hits: {stats['hits']}, misses: {stats['misses']})")
+        if self.glWidget.mesh.storage is not None:
+            message += ", out-of-core"
+        order_stats = self.glWidget.triangle_order_stats
+        if order_stats is not None:
+            message += f", ACMR: {order_stats['acmr_before']:.3f} -> {order_stats['acmr_after']:.3f}"
+        weld_stats = self.glWidget.weld_stats
+        if weld_stats is not None:
+            message += (f", welded: -{weld_stats['vertices_removed']} vertices, "
+                        f"-{weld_stats['faces_removed']} faces")
+        self.statusBar().showMessage(message)
+
+    def cancel_loading(self):
+        if self.glWidget.cancel_loading():
+            self.statusBar().showMessage("Loading cancelled")
+
+    def clear_cache(self):
+        self.glWidget.mesh_cache.invalidate()
+        stats = self.glWidget.mesh_cache.stats()
+        self.statusBar().showMessage(f"Cache cleared (hits: {stats['hits']}, misses: {stats['misses']})")
+
     def start_smoothing(self):
         max_iter = self.iter_slider.value()
         lambda_factor = self.lambda_slider.value() / 10.0
-        self.glWidget.start_smoothing_animation(max_iter, lambda_factor)
+        method = self.method_combo.currentText().lower()
+        weights = self.weights_combo.currentText().lower()
+        self.glWidget.start_smoothing_animation(max_iter, lambda_factor, method, weights)
     
     def stop_smoothing(self):
-        self.glWidget.smoothing_timer.stop()
+        self.glWidget.stop_smoothing_animation()
+        # 光顺中途停止时, 按当前顶点重新构建LOD
+        self.glWidget.start_lod_build()
     
     def update_iteration_label(self, current_iter):
         max_iter = self.iter_slider.value()
@@ -160,32 +251,32 @@ class MainWindow(QMainWindow):
         
     def toggle_lighting(self, state):
         self.glWidget.light_params['enabled'] = state == Qt.Checked
-        self.glWidget.setup_lighting()
-        self.glWidget.update()
+        self.glWidget.request_redraw('lighting')
+        
+    def toggle_shader_lighting(self, state):
+        self.glWidget.set_shader_lighting(state == Qt.Checked)
+        if self.glWidget.lighting_program is None:
+            self.statusBar().showMessage("GLSL lighting is not available, using fixed-function lighting")
         
     def update_light_position(self):
         x = self.x_slider.value() / 10.0
         y = self.y_slider.value() / 10.0
         z = self.z_slider.value() / 10.0
         self.glWidget.light_params['position'] = [x, y, z, 0.0]
-        self.glWidget.setup_lighting()
-        self.glWidget.update()
+        self.glWidget.request_redraw('lighting')
         
     def update_light_ambient(self, value):
         val = value / 100.0
         self.glWidget.light_params['ambient'] = [val, val, val, 1.0]
-        self.glWidget.setup_lighting()
-        self.glWidget.update()
+        self.glWidget.request_redraw('lighting')
         
     def update_light_diffuse(self, value):
         val = value / 100.0
         self.glWidget.light_params['diffuse'] = [val, val, val, 1.0]
-        self.glWidget.setup_lighting()
-        self.glWidget.update()
+        self.glWidget.request_redraw('lighting')
         
     def update_light_specular(self, value):
         val = value / 100.0
         self.glWidget.light_params['specular'] = [val, val, val, 1.0]
-        self.glWidget.setup_lighting()
-        self.glWidget.update()
+        self.glWidget.request_redraw('lighting')
         
\ No newline at end of file
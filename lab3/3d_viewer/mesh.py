@@ -1,36 +1,316 @@
 """
 负责3D模型的加载、处理和数据结构管理
 """
+import os
 import numpy as np
+import mesh_io
+import laplacian
+import vertex_cache
+import decimate
+import bvh
+import out_of_core
+import topology
+import weld
+import parallel
+
+NORMAL_MODES = ('uniform', 'area', 'angle')
+
+
+def _face_weights(face_normals, mode):
+    """ 面对顶点法向量的权重: 'area' 为面积向量, 其余为单位法向量 """
+    if mode == 'area':
+        return 0.5 * face_normals
+    lengths = np.linalg.norm(face_normals, axis=1)
+    lengths[lengths == 0] = 1.0  # 退化面(共线或重合的顶点)法向量为0, 不参与累加
+    return face_normals / lengths[:, np.newaxis]
+
+
+def _corner_angles(to_prev, to_next):
+    """ 角点处两条边的夹角 """
+    return np.arctan2(np.linalg.norm(np.cross(to_prev, to_next), axis=1), np.einsum('ij,ij->i', to_prev, to_next))
+
+
+class FaceList:
+    """
+    面的只读视图, 兼容原先 list-of-lists 的访问方式(len/下标/迭代)
+    数据实际保存在 Mesh.face_offsets 与 Mesh.face_indices 中
+    """
+    def __init__(self, offsets, indices):
+        self._offsets = offsets
+        self._indices = indices.view()
+        self._indices.flags.writeable = False
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("face index out of range")
+        return self._indices[self._offsets[i]:self._offsets[i + 1]]
+
+    def __iter__(self):
+        for start, end in zip(self._offsets[:-1].tolist(), self._offsets[1:].tolist()):
+            yield self._indices[start:end]
+
 
 class Mesh:
     def __init__(self):
+        self.topology_version = 0  # 面拓扑改变时递增
+        self.geometry_version = 0  # 顶点坐标或法向量改变时递增, 供渲染器判断是否需要重新上传
+        self.dirty_range = None    # 上次渲染器读取之后被修改的顶点范围 [start, stop)
         self.vertices = []    # 存储顶点坐标 (x,y,z)
-        self.faces = []       # 存储面信息 (顶点索引)
         self.normals = []     # 存储顶点法向量
-        
+        # 面以CSR形式存储: 第i个面的顶点为 face_indices[face_offsets[i]:face_offsets[i+1]]
+        self.face_offsets = np.zeros(1, dtype=np.int32)
+        self.face_indices = np.zeros(0, dtype=np.int32)
+        self.triangles = np.zeros((0, 3), dtype=np.int32)      # 扇形三角化后的三角形 (T,3)
+        self.triangle_faces = np.zeros(0, dtype=np.int32)      # 每个三角形所属的面
+        self.normal_mode = 'uniform'  # 顶点法向量的加权方式, 见 calculate_normals
+        self.storage = None    # 外存模式下数组所在的 out_of_core.MappedStorage, 见 load_out_of_core
+        self.workers = 1       # 法向量计算和光顺的线程数, None表示CPU核数, 见 parallel
+        self.deterministic = True  # 多线程时结果与单线程逐位相同; False时法向量按元素分块累加, 更快但末位可能不同
+        self._topology = {}
+
+    @property
+    def vertices(self):
+        return self._vertices
+
+    @vertices.setter
+    def vertices(self, vertices):
+        self._vertices = vertices
+        self.mark_dirty()
+
+    @property
+    def normals(self):
+        return self._normals
+
+    @normals.setter
+    def normals(self, normals):
+        self._normals = normals
+        self.mark_dirty()
+
+    def mark_dirty(self, start=0, stop=None):
+        """ 标记 [start, stop) 范围内顶点的坐标或法向量已被修改(原地修改数组后需手动调用) """
+        if stop is None:
+            stop = len(self._vertices)
+        if self.dirty_range is not None:
+            start, stop = min(start, self.dirty_range[0]), max(stop, self.dirty_range[1])
+        self.dirty_range = (start, stop)
+        self.geometry_version += 1
+
+    def consume_dirty_range(self):
+        """ 返回并清除被修改的顶点范围, 没有修改时返回None """
+        dirty_range, self.dirty_range = self.dirty_range, None
+        return dirty_range
+
+    def shallow_copy(self):
+        """ 与原网格共享面数组和拓扑缓存的副本, 顶点与法向量数组独立 """
+        other = Mesh.__new__(Mesh)
+        other.__dict__.update(self.__dict__)
+        if self.storage is not None:
+            # 外存模式: 顶点与法向量复制到新的映射文件中
+            other.storage = out_of_core.MappedStorage(os.path.dirname(self.storage.directory))
+            other.vertices = other.storage.copy(self.vertices, 'vertices')
+            other.normals = other.storage.copy(self.normals, 'normals')
+            return other
+        other.vertices = np.array(self.vertices, dtype=np.float32)
+        other.normals = np.array(self.normals, dtype=np.float32)
+        return other
+
+    @property
+    def faces(self):
+        return FaceList(self.face_offsets, self.face_indices)
+
+    @faces.setter
+    def faces(self, faces):
+        counts = np.fromiter((len(face) for face in faces), dtype=np.int64, count=len(faces))
+        indices = np.fromiter((i for face in faces for i in face), dtype=np.int64, count=int(counts.sum()))
+        self.set_faces(counts, indices)
+
+    def set_faces(self, counts, indices, triangles=None):
+        """
+        :param counts: 每个面的顶点数
+        :param indices: 所有面的顶点索引依次拼接
+        :param triangles: 可选, 已三角化的 (三角形 (T,3), 所属的面 (T,)), 如缓存中重排过的三角形; None时扇形三角化
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        self.face_offsets = np.zeros(len(counts) + 1, dtype=np.int32)
+        np.cumsum(counts, out=self.face_offsets[1:])
+        self.face_indices = np.ascontiguousarray(indices, dtype=np.int32)
+        self._topology = {}
+        self.topology_version += 1
+        if triangles is None:
+            self._triangulate(counts)
+        else:
+            self.triangles, self.triangle_faces = triangles
+
+    def face_counts(self):
+        return np.diff(self.face_offsets)
+
+    def _triangulate(self, counts):
+        # 多边形按三角形扇 (v0, vi, vi+1) 三角化, 只在加载时计算一次
+        self.triangles, self.triangle_faces = out_of_core.fan_triangulate(counts, self.face_indices)
+
+    def reorder_triangles(self, method='tipsify', cache_size=16, acmr_sample=1 << 16):
+        """
+        重排三角形的绘制顺序以提高GPU顶点缓存命中率(面和顶点本身不变)
+        :param method: 见 vertex_cache.ORDER_METHODS
+        :param acmr_sample: 统计ACMR时模拟的三角形数(见 vertex_cache.acmr), None表示全部模拟
+        :return: {'acmr_before', 'acmr_after'} 重排前后的平均缓存未命中率
+        """
+        before = vertex_cache.acmr(self.triangles, cache_size, acmr_sample)
+        order = vertex_cache.optimize_order(self.triangles, self.vertices, method, cache_size)
+        self.triangles = np.ascontiguousarray(self.triangles[order])
+        self.triangle_faces = self.triangle_faces[order]
+        self.topology_version += 1
+        return {'acmr_before': before, 'acmr_after': vertex_cache.acmr(self.triangles, cache_size, acmr_sample)}
+
+    def triangle_bvh(self):
+        """ 三角形包围盒层次, 拓扑不变时只在顶点移动后重新计算包围盒 """
+        tree = self._topology_cached(('bvh', self.topology_version),
+                                     lambda: bvh.TriangleBVH(self.vertices, self.triangles))
+        if tree.version != self.geometry_version:
+            if tree.version is not None:
+                tree.refit(self.vertices)
+            tree.version = self.geometry_version
+        return tree
+
+    def pick(self, origin, direction):
+        """
+        射线拾取
+        :return: {'face': 面编号, 'vertex': 该面上离交点最近的顶点, 'point': 交点, 'distance': 射线参数}, 未命中时为None
+        """
+        hit = self.triangle_bvh().intersect(self.vertices, origin, direction)
+        if hit is None:
+            return None
+        triangle, distance, point = hit
+        face = int(self.triangle_faces[triangle])
+        corners = self.face_indices[self.face_offsets[face]:self.face_offsets[face + 1]]
+        nearest = np.argmin(np.linalg.norm(np.asarray(self.vertices)[corners] - point, axis=1))
+        return {'face': face, 'vertex': int(corners[nearest]), 'point': point, 'distance': distance}
+
+    def _topology_cached(self, name, build):
+        # 只依赖面拓扑的中间结果, 在 set_faces 时失效
+        if name not in self._topology:
+            self._topology[name] = build()
+        return self._topology[name]
+
+    def topology(self):
+        """ 半边拓扑(一环邻居、边、边界环、流形检查等), 缓存到面拓扑改变为止 """
+        return self._topology_cached(('halfedge', len(self.vertices)), lambda: topology.MeshTopology(
+            self.face_offsets, self.face_indices, len(self.vertices)))
+
+    def _all_triangles(self):
+        return self._topology_cached('all_triangles', lambda: bool(np.all(self.face_counts() == 3)))
+
     # 为每个顶点计算平滑的法向量，用于光照计算
-    def calculate_normals(self):
-        self.normals = np.zeros((len(self.vertices), 3), dtype=np.float32)
-        
-        for face in self.faces:
-            if len(face) < 3:
-                continue
-                
-            v0, v1, v2 = [self.vertices[i] for i in face[:3]]
-            
-            # 计算面法向量（叉积）
-            normal = np.cross(v1 - v0, v2 - v0)
-            normal = normal / np.linalg.norm(normal) 
-            
-            for vertex_idx in face:
-                self.normals[vertex_idx] += normal
-                
-        norms = np.linalg.norm(self.normals, axis=1)
-        norms[norms == 0] = 1.0  # 避免除0
-        self.normals = self.normals / norms[:, np.newaxis]
-    
-    
+    def calculate_normals(self, mode=None):
+        """
+        面法向量用Newell方法计算(适用于非平面多边形), 再按权重一次性累加到顶点
+        :param mode: 'uniform' 每个面权重相同, 'area' 按面积加权, 'angle' 按顶点处的内角加权;
+                     默认使用 self.normal_mode
+        """
+        mode = mode or self.normal_mode
+        if mode not in NORMAL_MODES:
+            raise ValueError(f"Unknown normal mode: {mode}")
+        if self.storage is not None:
+            normals = self.normals
+            if not isinstance(normals, np.memmap) or normals.shape != (len(self.vertices), 3):
+                normals = self.storage.create('normals', (len(self.vertices), 3), np.float32)
+            out_of_core.vertex_normals(self.vertices, self.face_offsets, self.face_indices, normals, self.storage,
+                                       mode)
+            self.normals = normals
+            return
+        vertices = np.asarray(self.vertices, dtype=np.float32)
+        num_vertices = len(vertices)
+        if num_vertices == 0 or len(self.triangles) == 0:
+            self.normals = np.zeros((num_vertices, 3), dtype=np.float32)
+            return
+        workers = parallel.resolve_workers(self.workers)
+        triangles = self.triangles
+        angle = mode == 'angle'
+
+        # Newell法向量等于扇形三角形叉积之和, 长度为面积的两倍; 三角形、面、角点和顶点分别按索引范围分块计算
+        if self._all_triangles():
+            # 每组角点的 (顶点索引, 面权重, 角点处的夹角或None), 所属的面就是三角形本身
+            face_weights = np.empty((len(triangles), 3))
+            corners = [(triangles[:, k], face_weights, np.empty(len(triangles), dtype=np.float32) if angle else None)
+                       for k in range(3)]
+
+            def weigh_triangles(start, stop):
+                v = [vertices[triangles[start:stop, k]] for k in range(3)]
+                face_weights[start:stop] = _face_weights(np.cross(v[1] - v[0], v[2] - v[0]).astype(np.float64),
+                                                         mode)
+                if angle:
+                    for k, (_, _, angles) in enumerate(corners):
+                        angles[start:stop] = _corner_angles(v[(k + 2) % 3] - v[k], v[(k + 1) % 3] - v[k])
+
+            parallel.for_chunks(weigh_triangles, len(triangles), workers)
+        else:
+            face_normals = np.empty((len(triangles), 3))
+
+            def cross_products(start, stop):
+                v0, v1, v2 = (vertices[triangles[start:stop, k]] for k in range(3))
+                face_normals[start:stop] = np.cross(v1 - v0, v2 - v0)
+
+            parallel.for_chunks(cross_products, len(triangles), workers)
+            num_faces = len(self.face_offsets) - 1
+            face_normals = np.stack([self._scatter_add('triangle_faces', self.triangle_faces, face_normals[:, axis],
+                                                       num_faces, workers) for axis in range(3)], axis=1)
+            face_weights = np.empty_like(face_normals)
+
+            def weigh_faces(start, stop):
+                face_weights[start:stop] = _face_weights(face_normals[start:stop], mode)
+
+            parallel.for_chunks(weigh_faces, num_faces, workers)
+
+            mesh_topology = self.topology()
+            weights = np.empty((len(self.face_indices), 3))
+
+            def weigh_corners(start, stop):
+                corner_weights = face_weights[mesh_topology.face[start:stop]]
+                if angle:
+                    positions = vertices[self.face_indices[start:stop]]
+                    to_prev = vertices[self.face_indices[mesh_topology.prev[start:stop]]] - positions
+                    to_next = vertices[self.face_indices[mesh_topology.next[start:stop]]] - positions
+                    corner_weights = corner_weights * _corner_angles(to_prev, to_next)[:, np.newaxis]
+                weights[start:stop] = corner_weights
+
+            parallel.for_chunks(weigh_corners, len(self.face_indices), workers)
+            corners = [(self.face_indices, weights, None)]
+
+        normals = np.zeros((3, num_vertices))
+        for group, (indices, weights, angles) in enumerate(corners):
+            for axis in range(3):
+                normals[axis] += self._scatter_add(('corners', group), indices, weights[:, axis], num_vertices,
+                                                   workers, angles)
+
+        result = np.empty((num_vertices, 3), dtype=np.float32)
+
+        def normalize(start, stop):
+            block = normals[:, start:stop].T
+            norms = np.linalg.norm(block, axis=1)
+            norms[norms == 0] = 1.0  # 避免除0
+            result[start:stop] = block / norms[:, np.newaxis]
+
+        parallel.for_chunks(normalize, num_vertices, workers)
+        self.normals = result
+
+    def _scatter_add(self, name, indices, weights, size, workers, scale=None):
+        """
+        np.bincount(indices, weights * scale, minlength=size) 的多线程版本;
+        确定模式下按目标范围分块(分组缓存到拓扑或三角形顺序改变为止), 否则按元素分块后求和
+        """
+        if workers == 1:
+            return np.bincount(indices, weights=weights if scale is None else weights * scale, minlength=size)
+        if not self.deterministic:
+            return parallel.bincount(indices, weights, size, workers, scale)
+        groups = self._topology_cached(('scatter', name, self.topology_version, size),
+                                       lambda: parallel.ScatterGroups(indices, size))
+        return groups.bincount(indices, weights, workers, scale)
+
     def center_and_scale(self):
         """
         平移变换-将模型包围盒中心对齐坐标系原点
@@ -38,23 +318,46 @@ class Mesh:
         """
         if self.vertices is None or len(self.vertices) == 0:
             return
+        if self.storage is not None:
+            out_of_core.center_and_scale(self.vertices)
+            self.mark_dirty()
+            return
         
-        # 居中
-        vertices = np.array(self.vertices)
+        # 居中; 可写的浮点数组原地修改, 不产生额外的副本
+        vertices = self.vertices
+        if not (isinstance(vertices, np.ndarray) and vertices.dtype.kind == 'f' and vertices.flags.writeable):
+            vertices = np.array(vertices, dtype=np.float64)
         min_coords = np.min(vertices, axis=0)
         max_coords = np.max(vertices, axis=0)
-        center = (min_coords + max_coords) / 2.0
-        self.vertices = vertices - center
+        vertices -= ((min_coords + max_coords) / 2.0).astype(vertices.dtype)
         
         # 缩放
         max_dim = np.max(max_coords - min_coords)
         if max_dim > 0:
-            self.vertices /= max_dim
+            vertices /= vertices.dtype.type(max_dim)
+        self.vertices = vertices
     
     # 加载obj模型
-    def load_obj(self, filename):
+    def load_obj(self, filename, fast=True):
+        """
+        :param fast: True使用NumPy批量解析, False使用逐行解析(便于对比加载时间)
+        """
+        if fast:
+            with open(filename, 'rb') as f:
+                self._set_arrays(*mesh_io.parse_obj(f.read()))
+        else:
+            self._load_obj_lines(filename)
+        self.calculate_normals() 
+        self.center_and_scale()
+
+    def _set_arrays(self, vertices, counts, indices, triangles=None):
+        # 由解析器输出的 (顶点, 每个面的顶点数, 展平的索引) 设置网格
+        self.vertices = vertices
+        self.set_faces(counts, indices, triangles)
+
+    def _load_obj_lines(self, filename):
         self.vertices = []
-        self.faces = []
+        faces = []
         
         with open(filename, 'r') as f:
             for line in f:
@@ -65,18 +368,163 @@ class Mesh:
                     parts = line.split()
                     face = []
                     for part in parts[1:]:
-                        vertex_info = part.split('/')[0]
-                        face.append(int(vertex_info) - 1) # 0-based index
-                    self.faces.append(face)
+                        index = int(part.split('/')[0])
+                        # 0-based index, 负索引相对于当前已读入的顶点
+                        face.append(index - 1 if index > 0 else len(self.vertices) + index)
+                    faces.append(face)
                     
         self.vertices = np.array(self.vertices, dtype=np.float32) # 转换为numpy数组
-        self.calculate_normals() 
+        self.faces = faces
+
+
+    def load_off(self, filename, fast=True):
+        """
+        :param fast: True按文件头中的计数整块解析(支持COFF/NOFF等), False逐行解析
+        """
+        if fast:
+            with open(filename, 'rb') as f:
+                self._set_arrays(*mesh_io.parse_off(f.read()))
+        else:
+            self._load_off_lines(filename)
+        self.calculate_normals()
+        self.center_and_scale()
+
+    def load_ply(self, filename):
+        """ 二进制PLY: 映射文件后直接按结构数组读取顶点和面 """
+        self._set_arrays(*mesh_io.read_ply(filename))
+        self.calculate_normals()
+        self.center_and_scale()
+
+    def load_stl(self, filename):
+        """ 二进制STL: 每个三角形的顶点是独立的, 合并坐标完全相同的顶点以恢复共享的拓扑(光顺需要) """
+        self._set_arrays(*mesh_io.read_stl(filename))
+        self.weld_vertices(0.0, update_normals=False)
+        self.calculate_normals()
+        self.center_and_scale()
+
+    def load(self, filename):
+        """ 按扩展名选择 load_obj/load_off/load_ply/load_stl """
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in mesh_io.SUPPORTED_EXTENSIONS:
+            raise ValueError(f"Unsupported file format: {extension}")
+        getattr(self, 'load_' + extension[1:])(filename)
+
+    def save(self, filename):
+        """
+        按扩展名保存为OBJ(含法向量)、OFF或二进制PLY(含法向量), 分块格式化后写出, 不产生完整大小的副本;
+        先写入临时文件再替换, 写入失败时不破坏已有的文件
+        """
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in ('.obj', '.off', '.ply'):
+            raise ValueError(f"Unsupported file format: {extension}")
+        normals = self.normals
+        if normals is None or len(normals) != len(self.vertices):
+            normals = None
+        staging = filename + '.tmp'
+        try:
+            with open(staging, 'wb') as f:
+                if extension == '.off':
+                    mesh_io.write_off(f, self.vertices, self.face_offsets, self.face_indices)
+                else:
+                    write = mesh_io.write_obj if extension == '.obj' else mesh_io.write_ply
+                    write(f, self.vertices, self.face_offsets, self.face_indices, normals)
+            os.replace(staging, filename)
+        except BaseException:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+
+    def load_chunked(self, filename, chunk_size=mesh_io.CHUNK_SIZE, callback=None, content_hash=None):
+        """
+        按行边界分块解析OBJ/OFF文件, 结果与 load_obj/load_off 相同
+        :param callback: 每解析完一块调用 callback(已处理字节数, 文件字节数, 已读面数, snapshot),
+                         snapshot() 返回由已读部分构成的新网格(只保留顶点都已读到的面); 返回False时停止加载
+        :param content_hash: 可选, hashlib的哈希对象, 读取的文件内容依次传给它(见 mesh_cache.content_hasher)
+        :return: 是否加载完成, 被取消时网格不变
+        """
+        parse = mesh_io.iter_off_chunks if filename.lower().endswith('.off') else mesh_io.iter_obj_chunks
+        total = os.path.getsize(filename)
+        vertex_chunks, count_chunks, index_chunks = [], [], []
+
+        def concatenated():
+            return (np.concatenate(vertex_chunks) if vertex_chunks else np.zeros((0, 3), dtype=np.float32),
+                    np.concatenate(count_chunks) if count_chunks else np.zeros(0, dtype=np.int64),
+                    np.concatenate(index_chunks) if index_chunks else np.zeros(0, dtype=np.int64))
+
+        def snapshot():
+            vertices, counts, indices = concatenated()
+            missing = (indices < 0) | (indices >= len(vertices))
+            keep = np.ones(len(counts), dtype=bool)
+            keep[np.repeat(np.arange(len(counts)), counts)[missing]] = False
+            partial = Mesh()
+            partial.normal_mode = self.normal_mode
+            partial._set_arrays(vertices, counts[keep], indices[np.repeat(keep, counts)])
+            partial.calculate_normals()
+            partial.center_and_scale()
+            return partial
+
+        face_count = 0
+        with open(filename, 'rb') as f:
+            source = f if content_hash is None else mesh_io.HashingReader(f, content_hash)
+            for vertices, counts, indices, consumed in parse(source, chunk_size):
+                vertex_chunks.append(vertices)
+                count_chunks.append(counts)
+                index_chunks.append(indices)
+                face_count += len(counts)
+                if callback is not None and callback(consumed, total, face_count, snapshot) is False:
+                    return False
+        self._set_arrays(*concatenated())
+        self.calculate_normals()
         self.center_and_scale()
+        return True
 
+    def load_out_of_core(self, filename, directory=None, chunk_size=mesh_io.CHUNK_SIZE, callback=None):
+        """
+        外存模式加载: 分块解析后直接写入内存映射文件, 法向量计算和居中缩放也按块进行
+        :param directory: 映射文件的父目录, 见 out_of_core.MappedStorage
+        :param callback: 同 load_chunked, 但不提供预览(snapshot 为None)
+        :return: 是否加载完成
+        """
+        parse = mesh_io.iter_off_chunks if filename.lower().endswith('.off') else mesh_io.iter_obj_chunks
+        total = os.path.getsize(filename)
+        storage = out_of_core.MappedStorage(directory)
+        vertices = storage.writer('vertices', np.float32, 3)
+        offsets = storage.writer('face_offsets', np.int64)
+        indices = storage.writer('face_indices', np.int32)
+        triangles = storage.writer('triangles', np.int32, 3)
+        triangle_faces = storage.writer('triangle_faces', np.int32)
+        offsets.append(np.zeros(1, dtype=np.int64))
+        face_count = corner_count = 0
+        with open(filename, 'rb') as f:
+            for chunk_vertices, counts, chunk_indices, consumed in parse(f, chunk_size):
+                vertices.append(chunk_vertices)
+                offsets.append(np.cumsum(counts) + corner_count)
+                indices.append(chunk_indices)
+                chunk_triangles, chunk_faces = out_of_core.fan_triangulate(counts, chunk_indices, face_count)
+                triangles.append(chunk_triangles)
+                triangle_faces.append(chunk_faces)
+                face_count += len(counts)
+                corner_count += len(chunk_indices)
+                if callback is not None and callback(consumed, total, face_count, None) is False:
+                    storage.remove()
+                    return False
+
+        self.storage = storage
+        self.vertices = vertices.finish()
+        self.face_offsets = offsets.finish()
+        self.face_indices = indices.finish()
+        self.triangles = triangles.finish()
+        self.triangle_faces = triangle_faces.finish()
+        self._topology = {}
+        self.topology_version += 1
+        self.normals = None
+        self.calculate_normals()
+        self.center_and_scale()
+        return True
 
-    def load_off(self, filename):
+    def _load_off_lines(self, filename):
         self.vertices = []
-        self.faces = []
+        faces = []
         
         with open(filename, 'r') as f:
             line = f.readline().strip()
@@ -108,51 +556,148 @@ class Mesh:
                 parts = line.split()
                 num_vertices_in_face = int(parts[0])
                 face = [int(parts[i+1]) for i in range(num_vertices_in_face)]
-                self.faces.append(face)
+                faces.append(face)
                 
         self.vertices = np.array(self.vertices, dtype=np.float32)
-        self.calculate_normals()
-        self.center_and_scale()
+        self.faces = faces
 
 
-    def laplacian_smoothing(self, iterations=1, lambda_factor=0.5):
+    def laplacian_operator(self, weights='uniform'):
         """
-        Laplacian网格光顺
-        :param iterations: 迭代次数
-        :param lambda_factor: 平滑系数(0-1)
+        伞形Laplacian算子, 缓存到面拓扑改变为止
+        :param weights: 'uniform' 均匀权重; 'cotangent' 余切权重(按首次调用时的顶点位置计算)
         """
+        def build():
+            if weights == 'uniform':
+                return laplacian.LaplacianOperator.uniform(len(self.vertices), self.topology().edges)
+            if weights == 'cotangent':
+                return laplacian.LaplacianOperator.cotangent(len(self.vertices), self.triangles, self.vertices)
+            raise ValueError(f"Unknown Laplacian weights: {weights}")
+        return self._topology_cached(('laplacian', weights, len(self.vertices)), build)
 
-        if self.vertices.size == 0 or len(self.faces) == 0:
-            return
+    def laplacian_smoothing(self, iterations=1, lambda_factor=0.5, method='explicit', weights='uniform',
+                            mu=None, tol=None, tol_norm='max', cg_tol=1e-6, cg_maxiter=200, update_normals=True):
+        """
+        Laplacian网格光顺
+        :param iterations: 最大迭代次数
+        :param lambda_factor: 平滑系数(显式为0-1, 隐式可取更大的值)
+        :param method: 'explicit' 显式迭代 x += λLx;
+                       'implicit' 向后欧拉, 每次迭代求解 (I - λL)x' = x;
+                       'taubin' 每次迭代先以λ收缩再以μ(<0)膨胀, 减少网格收缩
+        :param weights: Laplacian算子的权重, 'uniform' 或 'cotangent'
+        :param mu: Taubin方法的膨胀系数, 默认按通带频率0.1由λ计算
+        :param tol: 顶点位移小于该值时提前停止, None表示总是执行全部迭代
+        :param tol_norm: 位移的度量, 'max' 最大位移或 'rms' 均方根位移
+        :param cg_tol, cg_maxiter: 隐式求解时共轭梯度法的相对残差阈值和最大迭代次数
+        :param update_normals: False不重新计算法向量(结果不会被显示时, 由调用者在需要时计算)
+        :return: 统计信息(实际迭代次数、是否收敛、最后一次位移, 隐式时包括共轭梯度迭代次数和残差)
+        """
+        stats = {'iterations': 0, 'converged': False, 'displacement': 0.0, 'cg_iterations': 0, 'residual': 0.0}
+        if self.vertices.size == 0 or len(self.face_indices) == 0:
+            return stats
+        if tol_norm not in ('max', 'rms'):
+            raise ValueError(f"Unknown displacement norm: {tol_norm}")
+        if method == 'taubin' and mu is None:
+            mu = 1.0 / (0.1 - 1.0 / lambda_factor)
+        if self.storage is not None:
+            # 外存模式按面分块流式计算, 只支持均匀权重的显式和Taubin方法
+            if method not in ('explicit', 'taubin') or weights != 'uniform':
+                raise ValueError("Out-of-core smoothing supports only explicit/taubin with uniform weights")
+            # 去重后的边保存在映射文件中, 与在内存中时的均匀权重算子相同; 缓存到面拓扑改变为止
+            edges = self._topology_cached(('out_of_core_edges', len(self.vertices)), lambda: out_of_core.unique_edges(
+                self.face_offsets, self.face_indices, len(self.vertices), self.storage))
+            stats = out_of_core.laplacian_smoothing(
+                self.vertices, edges, self.storage, iterations, lambda_factor, mu if method == 'taubin' else None,
+                tol, tol_norm)
+            self.mark_dirty()
+            if update_normals:
+                self.calculate_normals()
+            return stats
         
-        # 构建邻接表
-        adjacency = [[] for _ in range(len(self.vertices))]
-        for face in self.faces:
-            for i in range(len(face)):
-                v1 = face[i]
-                v2 = face[(i+1)%len(face)]
-                if v2 not in adjacency[v1]:
-                    adjacency[v1].append(v2)
-                if v1 not in adjacency[v2]:
-                    adjacency[v2].append(v1)
+        # 稀疏Laplacian算子只在拓扑改变时重建
+        operator = self.laplacian_operator(weights)
+        workers = parallel.resolve_workers(self.workers)
         
-        # 执行光顺迭代
         for _ in range(iterations):
-            new_vertices = np.copy(self.vertices)
-            for i in range(len(self.vertices)):
-                if len(adjacency[i]) == 0:  # 孤立顶点
-                    continue
-                    
-                # 计算Laplacian位移
-                neighbor_sum = np.sum(self.vertices[adjacency[i]], axis=0) # fancy indexing
-                centroid = neighbor_sum / len(adjacency[i])
-                displacement = centroid - self.vertices[i]
-                
-                # 应用位移
-                new_vertices[i] += lambda_factor * displacement
-            
-            self.vertices = new_vertices
+            previous = self.vertices
+            if method == 'explicit':
+                # 每次迭代为一次稀疏矩阵-向量乘法, 按行分块多线程计算
+                self.vertices = operator.step(self.vertices, np.float32(lambda_factor), workers)
+            elif method == 'taubin':
+                self.vertices = operator.step(self.vertices, np.float32(lambda_factor), workers)
+                self.vertices = operator.step(self.vertices, np.float32(mu), workers)
+            elif method == 'implicit':
+                # 以当前顶点(上一次的解)作为初值
+                solution, info = operator.solve_implicit(self.vertices, lambda_factor, x0=self.vertices,
+                                                         tol=cg_tol, maxiter=cg_maxiter, workers=workers)
+                self.vertices = solution.astype(np.float32)
+                stats['cg_iterations'] += info['iterations']
+                stats['residual'] = info['residual']
+            else:
+                raise ValueError(f"Unknown smoothing method: {method}")
+            stats['iterations'] += 1
+
+            # 收敛判断: 本次迭代的顶点位移
+            displacement = np.linalg.norm(self.vertices - previous, axis=1)
+            if tol_norm == 'max':
+                stats['displacement'] = float(displacement.max())
+            else:
+                stats['displacement'] = float(np.sqrt(np.mean(displacement ** 2)))
+            if tol is not None and stats['displacement'] <= tol:
+                stats['converged'] = True
+                break
         
         # 更新法向量
-        self.calculate_normals()
-    
\ No newline at end of file
+        if update_normals:
+            self.calculate_normals()
+        return stats
+
+    def weld_vertices(self, tolerance=1e-6, update_normals=True):
+        """
+        焊接顶点: 合并相距不超过 tolerance 的顶点(如沿UV接缝或逐面拆开的顶点), 重新映射面并删除退化的面,
+        有变化时重新计算法向量
+        :param update_normals: False不计算法向量(由调用者之后计算)
+        :return: {'vertices_removed': 删除的顶点数, 'faces_removed': 删除的面数, 'vertices': 剩余顶点数, 'faces': 剩余面数}
+        """
+        if self.storage is not None:
+            raise ValueError("Vertex welding is not supported for out-of-core meshes")
+        remap, keep = weld.weld_vertices(self.vertices, tolerance)
+        counts, indices, faces_removed = weld.remap_faces(self.face_offsets, self.face_indices, remap)
+        vertices_removed = len(self.vertices) - len(keep)
+        if vertices_removed or faces_removed:
+            self._set_arrays(np.ascontiguousarray(np.asarray(self.vertices)[keep]), counts, indices)
+            if update_normals:
+                self.calculate_normals()
+        return {'vertices_removed': int(vertices_removed), 'faces_removed': faces_removed,
+                'vertices': len(self.vertices), 'faces': len(self.face_offsets) - 1}
+
+    def decimate(self, target_triangles, cancelled=None):
+        """
+        二次误差边折叠简化, 返回新的三角形网格(原网格不变, 坐标不再重新居中缩放)
+        :param target_triangles: 目标三角形数
+        :param cancelled: 见 decimate.decimate
+        """
+        vertices, triangles = decimate.decimate(self.vertices, self.triangles, target_triangles,
+                                                cancelled=cancelled)
+        result = Mesh()
+        result.normal_mode = self.normal_mode
+        result._set_arrays(vertices, np.full(len(triangles), 3), triangles.ravel())
+        result.calculate_normals()
+        return result
+
+    def build_lod(self, ratios=(0.25, 0.0625), cancelled=None):
+        """
+        细节层次(LOD)金字塔, 每一层由上一层继续简化得到
+        :param ratios: 各层三角形数相对于原网格的比例(从大到小)
+        :param cancelled: 可选, 返回True时尽快停止并返回已完成的层(最后一层可能未达到目标)
+        :return: [self, 第1层, 第2层, ...]
+        """
+        levels = [self]
+        for ratio in ratios:
+            if cancelled is not None and cancelled():
+                break
+            target = int(len(self.triangles) * ratio)
+            if target >= len(levels[-1].triangles):
+                continue
+            levels.append(levels[-1].decimate(target, cancelled))
+        return levels
@@ -0,0 +1,256 @@
+"""
+已处理网格的磁盘缓存(顶点、面、三角形、法向量以.npy格式保存, 可内存映射读取)
+
+多个进程(查看器、批处理)可以共用同一个缓存目录: 对索引的每次读-改-写都先锁住目录中的锁文件,
+加锁后重新读取索引; 缓存项在POSIX系统上被淘汰(删除)后, 已经映射它的进程仍可继续使用映射的数组
+"""
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', '3d_viewer', 'meshes')
+# 三角形按网格中的顺序保存(可能已重排), 命中时不需要重新三角化和重排
+_ARRAYS = ('vertices', 'normals', 'face_counts', 'face_indices', 'triangles', 'triangle_faces')
+
+
+def content_hasher():
+    """ 源文件内容的哈希对象: 加载时把读到的每块数据传给 update, 再交给 MeshCache.store, 不必为计算哈希再读一遍文件 """
+    return hashlib.blake2b(digest_size=20)
+
+
+class MeshCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=2 * 1024 ** 3):
+        """
+        :param directory: 缓存目录
+        :param max_bytes: 缓存总大小上限, 超出时按最近最少使用(LRU)淘汰
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+        # 加载线程与界面线程可能同时使用同一个缓存: 线程锁之外再锁住锁文件, 与其他进程互斥
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+
+    def stats(self):
+        with self._locked():
+            index = self._load_index()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(index['entries']),
+                'bytes': sum(entry['bytes'] for entry in index['entries'].values()),
+            }
+
+    def load(self, filename, mesh, options=None):
+        """
+        命中时把缓存的数组(写时复制的内存映射)放入mesh
+        路径/大小/修改时间与记录不符(新文件或文件已修改)时直接算作未命中, 不读取文件计算内容哈希;
+        内容哈希在随后解析文件时计算(见 content_hasher 与 store)
+        :param options: 影响处理结果的加载参数, 参与缓存键的计算
+        :return: 是否命中
+        """
+        with self._locked():
+            digest = self._known_digest(filename, options)
+            index = self._load_index()
+            entry = index['entries'].get(digest)
+            if entry is not None:
+                try:
+                    arrays = {name: np.load(os.path.join(self.directory, digest, name + '.npy'), mmap_mode='c')
+                              for name in _ARRAYS}
+                except (OSError, ValueError):
+                    self._remove(digest)
+                    arrays = None
+                if arrays is not None:
+                    mesh._set_arrays(arrays['vertices'], arrays['face_counts'], arrays['face_indices'],
+                                     (arrays['triangles'], arrays['triangle_faces']))
+                    mesh.normals = arrays['normals']
+                    entry['last_used'] = time.time()
+                    self._save_index()
+                    self.hits += 1
+                    return True
+            self.misses += 1
+            return False
+
+    def store(self, filename, mesh, options=None, content=None):
+        """
+        保存处理后的网格, 写入失败(磁盘已满、无权限等)时不影响加载
+        :param content: 加载时已计算的文件内容哈希(见 content_hasher), None时读取文件计算
+        :return: 是否已写入缓存
+        """
+        arrays = {
+            'vertices': np.asarray(mesh.vertices, dtype=np.float32),
+            'normals': np.asarray(mesh.normals, dtype=np.float32),
+            'face_counts': mesh.face_counts(),
+            'face_indices': mesh.face_indices,
+            'triangles': mesh.triangles,
+            'triangle_faces': mesh.triangle_faces,
+        }
+        size = sum(array.nbytes for array in arrays.values())
+        if size > self.max_bytes:
+            return False
+
+        path = os.path.abspath(filename)
+        try:
+            stat = os.stat(path)
+            if content is None:
+                content = content_hasher()
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b''):
+                        content.update(chunk)
+        except OSError:
+            return False
+        digest = self._entry_digest(content, options)
+        target = os.path.join(self.directory, digest)
+        # 每个进程和线程使用自己的临时目录, 写入数组时不持有锁
+        staging = '%s.%d-%d.tmp' % (target, os.getpid(), threading.get_ident())
+        try:
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            for name, array in arrays.items():
+                np.save(os.path.join(staging, name + '.npy'), array)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+
+        with self._locked():
+            try:
+                shutil.rmtree(target, ignore_errors=True)
+                os.replace(staging, target)
+            except OSError:
+                shutil.rmtree(staging, ignore_errors=True)
+                return False
+            index = self._load_index()
+            index['files'][self._file_key(path, options)] = {
+                'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest}
+            index['entries'][digest] = {'bytes': size, 'last_used': time.time()}
+            self._evict()
+            self._save_index()
+            return True
+
+    def invalidate(self, filename=None):
+        """ 删除某个文件对应的缓存, 不指定文件时清空整个缓存 """
+        with self._locked():
+            index = self._load_index()
+            if filename is None:
+                for digest in list(index['entries']):
+                    self._remove(digest)
+                index['files'].clear()
+            else:
+                prefix = os.path.abspath(filename) + '|'
+                for key in [key for key in index['files'] if key.startswith(prefix)]:
+                    self._remove(index['files'].pop(key)['digest'])
+            self._save_index()
+
+    @staticmethod
+    def _file_key(path, options):
+        return '%s|%s' % (path, json.dumps(options, sort_keys=True))
+
+    @staticmethod
+    def _entry_digest(content, options):
+        """ 缓存键: 文件内容哈希与加载参数 """
+        digest = content.copy()
+        digest.update(json.dumps(options, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _known_digest(self, filename, options):
+        """ 路径、大小、修改时间都与记录相同时返回记录的缓存键, 否则返回None """
+        path = os.path.abspath(filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        record = self._load_index()['files'].get(self._file_key(path, options))
+        if record is not None and record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns:
+            return record['digest']
+        return None
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """ 线程锁加上锁文件(进程间), 可重入; 最外层加锁后丢弃内存中的索引, 重新读取其他进程的修改 """
+        with self._lock:
+            if self._lock_depth == 0:
+                self._lock_file = self._lock_directory()
+                self._index = None
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    self._unlock_directory(self._lock_file)
+                    self._lock_file = None
+
+    def _lock_directory(self):
+        """ :return: 已加锁的锁文件, 无法创建时(如只读目录)返回None, 此时只有线程锁 """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            f = open(os.path.join(self.directory, 'index.lock'), 'a+b')
+        except OSError:
+            return None
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK 重试10次后仍未得到锁
+        return f
+
+    @staticmethod
+    def _unlock_directory(f):
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        f.close()
+
+    def _evict(self):
+        # 按最近使用时间从旧到新淘汰, 直到总大小不超过上限
+        entries = self._load_index()['entries']
+        total = sum(entry['bytes'] for entry in entries.values())
+        for digest in sorted(entries, key=lambda d: entries[d]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= entries[digest]['bytes']
+            self._remove(digest)
+
+    def _remove(self, digest):
+        self._load_index()['entries'].pop(digest, None)
+        shutil.rmtree(os.path.join(self.directory, digest), ignore_errors=True)
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(os.path.join(self.directory, 'index.json')) as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {'files': {}, 'entries': {}}
+        return self._index
+
+    def _save_index(self):
+        path = os.path.join(self.directory, 'index.json')
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(self._index, f)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass
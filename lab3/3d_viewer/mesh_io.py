@@ -0,0 +1,598 @@
+"""
+网格文件的批量解析(读取整个文件或按行边界分块读取后用NumPy一次性转换)与分块写出;
+二进制PLY/STL映射文件后直接看作NumPy结构数组
+"""
+import os
+import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
+
+SUPPORTED_EXTENSIONS = ('.obj', '.off', '.ply', '.stl')
+CHUNK_SIZE = 16 * 1024 ** 2  # 分块读取时每块的字节数
+WRITE_ROWS = 1 << 16         # 写出时每块的顶点数或面数
+
+_NEWLINE, _SPACE, _TAB, _CR, _SLASH = 10, 32, 9, 13, 47
+_SLASH_TO_SPACE = bytes.maketrans(b'/', b' ')
+
+
+def _whitespace(buf):
+    return (buf == _SPACE) | (buf == _NEWLINE) | (buf == _TAB) | (buf == _CR)
+
+
+def _token_starts(separator):
+    # 记号起点: 非分隔字符且前一个字符为分隔符
+    starts = ~separator
+    starts[1:] &= separator[:-1]
+    return starts
+
+
+def _count_per_line(positions, buf):
+    """ 按换行符把有序的字符位置分组, 返回每行的个数(最后一行必须以换行结尾) """
+    line_ends = np.flatnonzero(buf == _NEWLINE)
+    return np.diff(np.searchsorted(positions, line_ends), prepend=0)
+
+
+def tokens_per_line(blob):
+    """
+    统计以换行分隔的文本块中每一行的记号(token)数量
+    :param blob: bytes, 每一行(包括最后一行)都以 b'\\n' 结尾
+    :return: int64数组, 长度为行数
+    """
+    buf = np.frombuffer(blob, dtype=np.uint8)
+    return _count_per_line(np.flatnonzero(_token_starts(_whitespace(buf))), buf)
+
+
+def _select_records(buf, line_starts, line_ends, keyword):
+    """
+    取出以单字符关键字开头的所有行(含换行符), 关键字替换为空格
+    :return: (拼接后的uint8数组, 这些行的行号)
+    """
+    size = len(buf)
+    second = np.minimum(line_starts + 1, size - 1)
+    selected = (buf[line_starts] == ord(keyword)) & (line_starts + 1 < size) & \
+               ((buf[second] == _SPACE) | (buf[second] == _TAB))
+    rows = np.flatnonzero(selected)
+    if len(rows) == 0:
+        return np.zeros(0, dtype=np.uint8), rows
+    # 把若干个 [start, end) 区间拼接成一个索引数组
+    starts = line_starts[rows]
+    lengths = line_ends[rows] - starts
+    offsets = np.cumsum(lengths) - lengths
+    gather = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+    out = np.empty(len(gather) + 1, dtype=np.uint8)
+    out[:-1] = buf[gather]
+    out[-1] = _NEWLINE
+    out[offsets] = _SPACE
+    # 行尾已有换行符时, 末尾多出的换行只会产生一个空行
+    return out, rows
+
+
+def _split_lines(buf):
+    """ 返回每一行的起点和终点(终点包含换行符) """
+    newlines = np.flatnonzero(buf == _NEWLINE)
+    line_starts = np.concatenate(([0], newlines + 1))
+    line_ends = np.concatenate((newlines + 1, [len(buf)]))
+    if line_starts[-1] == len(buf):
+        line_starts, line_ends = line_starts[:-1], line_ends[:-1]
+    return line_starts, line_ends
+
+
+def parse_obj(data, vertex_offset=0):
+    """
+    解析OBJ文本, 只处理 v 和 f 记录
+    :param data: 文件的全部内容(bytes), 或按行边界切分的一块
+    :param vertex_offset: 分块解析时之前的块中已定义的顶点数, 用于换算负索引
+    :return: (vertices (N,3) float32, counts (F,) int64, indices (sum(counts),) int64)
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    vertices = np.zeros((0, 3), dtype=np.float32)
+    counts = indices = np.zeros(0, dtype=np.int64)
+    if len(buf) == 0:
+        return vertices, counts, indices
+    buf = _strip_comments(buf)  # 行尾的 '# ...' 注释
+    line_starts, line_ends = _split_lines(buf)
+
+    # 顶点: 只取前三个分量(忽略w或顶点颜色)
+    v_buf, v_rows = _select_records(buf, line_starts, line_ends, 'v')
+    if len(v_rows):
+        v_counts = _count_per_line(np.flatnonzero(_token_starts(_whitespace(v_buf))), v_buf)[:len(v_rows)]
+        if np.any(v_counts < 3):
+            raise ValueError("Invalid vertex record in OBJ file")
+        values = np.fromstring(v_buf.tobytes(), dtype=np.float64, sep=' ')
+        starts = np.cumsum(v_counts) - v_counts
+        vertices = values[starts[:, np.newaxis] + np.arange(3)].astype(np.float32)
+
+    # 面: v/vt/vn 中的 '/' 当作分隔符, 只保留每组的第一个数(顶点索引)
+    f_buf, f_rows = _select_records(buf, line_starts, line_ends, 'f')
+    if len(f_rows) == 0:
+        return vertices, counts, indices
+    slash = f_buf == _SLASH
+    token_starts = _token_starts(_whitespace(f_buf) | slash)
+    positions = np.flatnonzero(token_starts)
+    primary = np.ones(len(positions), dtype=bool)
+    if slash.any():
+        primary = ~slash[np.maximum(positions - 1, 0)]
+    counts = _count_per_line(positions[primary], f_buf)[:len(f_rows)]
+    values = np.fromstring(f_buf.tobytes().translate(_SLASH_TO_SPACE), dtype=np.int64, sep=' ')
+    if values.size != len(positions):
+        raise ValueError("Invalid face record in OBJ file")
+    indices = values[primary]
+
+    negative = indices < 0
+    if np.any(negative):
+        # 负索引相对于该面之前已定义的顶点数
+        defined = np.repeat(np.searchsorted(v_rows, f_rows), counts)
+        indices[negative] += defined[negative] + vertex_offset
+        indices[~negative] -= 1
+    else:
+        indices -= 1  # 0-based index
+    return vertices, counts, indices
+
+
+def _strip_comments(buf):
+    """ 把 '#' 到行尾的注释替换为空格(返回新数组) """
+    hashes = np.flatnonzero(buf == ord('#'))
+    if len(hashes) == 0:
+        return buf
+    newlines = np.flatnonzero(buf == _NEWLINE)
+    ends = np.concatenate((newlines, [len(buf)]))[np.searchsorted(newlines, hashes)]
+    marks = np.zeros(len(buf) + 1, dtype=np.int32)
+    np.add.at(marks, hashes, 1)
+    np.add.at(marks, ends, -1)
+    out = buf.copy()
+    out[np.cumsum(marks[:-1]) > 0] = _SPACE
+    return out
+
+
+def _off_header(buf):
+    """
+    解析OFF文件头, 计数可能与关键字在同一行
+    :param buf: 已去掉注释的uint8数组
+    :return: (顶点数, 面数, 文件体的起点), 文件头不完整时返回None
+    """
+    line_starts, line_ends = _split_lines(buf)
+    keyword = None
+    header = []
+    line = 0
+    while len(header) < 2 and line < len(line_starts):
+        parts = buf[line_starts[line]:line_ends[line]].tobytes().split()
+        line += 1
+        if not parts:
+            continue
+        if keyword is None:
+            keyword = parts.pop(0)
+            if not keyword.endswith(b'OFF'):
+                raise ValueError("Not a valid OFF file")
+        header.extend(parts)
+    if len(header) < 2:
+        return None
+    body_start = line_starts[line] if line < len(line_starts) else len(buf)
+    return int(header[0]), int(header[1]), body_start
+
+
+def _off_records(body, records=None):
+    """
+    :param body: 以换行结尾的若干完整行(已去掉注释)
+    :param records: 只解析前 records 个非空行, 之后的文本(如附加的说明)与逐行读取时一样被忽略
+    :return: (每个非空行的数值个数, 所有数值, 每行第一个数值的位置)
+    """
+    buf = np.frombuffer(body, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == _NEWLINE)
+    record_counts = _count_per_line(np.flatnonzero(_token_starts(_whitespace(buf))), buf)
+    lines = np.flatnonzero(record_counts > 0)  # 跳过空行
+    if records is not None and len(lines) > records:
+        lines = lines[:records]
+        body = body[:newlines[lines[-1]] + 1] if records else b''
+    record_counts = record_counts[lines]
+    values = np.fromstring(body, dtype=np.float64, sep=' ') if body else np.zeros(0)
+    starts = np.cumsum(record_counts) - record_counts
+    return record_counts, values, starts
+
+
+def _off_vertices(record_counts, values, starts):
+    # 顶点块直接写入预分配数组
+    if np.any(record_counts < 3):
+        raise ValueError("Invalid vertex record in OFF file")
+    vertices = np.empty((len(starts), 3), dtype=np.float32)
+    vertices[:] = values[starts[:, np.newaxis] + np.arange(3)]
+    return vertices
+
+
+def _off_faces(record_counts, values, starts):
+    # 面块: 每行第一个数为该面的顶点数
+    counts = values[starts].astype(np.int64)
+    if np.any(counts < 0) or np.any(counts + 1 > record_counts):
+        raise ValueError("Invalid face record in OFF file")
+    offsets = np.cumsum(counts) - counts
+    gather = np.arange(counts.sum()) + np.repeat(starts + 1 - offsets, counts)
+    return counts, values[gather].astype(np.int64)
+
+
+def parse_off(data):
+    """
+    按文件头给出的顶点数/面数整块解析OFF文本, 支持 OFF/COFF/NOFF/CNOFF 等文件头
+    顶点行只取前三个分量(法向量、颜色等附加列被忽略), 面行末尾的颜色列同样被忽略
+    :param data: 文件的全部内容(bytes)
+    :return: (vertices (N,3) float32, counts (F,) int64, indices (sum(counts),) int64)
+    """
+    buf = _strip_comments(np.frombuffer(data, dtype=np.uint8))
+    header = _off_header(buf)
+    if header is None:
+        raise ValueError("Not a valid OFF file")
+    num_vertices, num_faces, body_start = header
+
+    body = np.append(buf[body_start:], np.uint8(_NEWLINE)).tobytes()
+    record_counts, values, starts = _off_records(body, num_vertices + num_faces)
+    if len(record_counts) < num_vertices + num_faces:
+        raise ValueError("Unexpected end of OFF file")
+    vertices = _off_vertices(record_counts[:num_vertices], values, starts[:num_vertices])
+    faces = slice(num_vertices, num_vertices + num_faces)
+    counts, indices = _off_faces(record_counts[faces], values, starts[faces])
+    return vertices, counts, indices
+
+
+class HashingReader:
+    """ 包装二进制文件, 读取的每块数据同时传给 hasher.update, 解析时顺便计算文件内容的哈希 """
+    def __init__(self, f, hasher):
+        self.f = f
+        self.hasher = hasher
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.hasher.update(data)
+        return data
+
+
+def _line_blocks(f, chunk_size):
+    """ 从二进制文件按行边界分块读取, yield (若干完整行, 已读取并处理的字节数) """
+    rest = b''
+    consumed = 0
+    while True:
+        data = f.read(chunk_size)
+        block = rest + data
+        if data:
+            cut = block.rfind(b'\n') + 1
+            block, rest = block[:cut], block[cut:]
+        else:
+            rest = b''
+        if block:
+            consumed += len(block)
+            yield block, consumed
+        if not data:
+            return
+
+
+def iter_obj_chunks(f, chunk_size=CHUNK_SIZE):
+    """
+    分块解析OBJ文件, 每块的结果与 parse_obj 相同, 面的索引已换算为全局顶点编号
+    :param f: 以二进制方式打开的文件
+    :return: 生成器, yield (vertices, counts, indices, 已处理的字节数)
+    """
+    vertex_offset = 0
+    for block, consumed in _line_blocks(f, chunk_size):
+        vertices, counts, indices = parse_obj(block, vertex_offset)
+        vertex_offset += len(vertices)
+        yield vertices, counts, indices, consumed
+
+
+def iter_off_chunks(f, chunk_size=CHUNK_SIZE):
+    """
+    分块解析OFF文件, 文件头之后的记录依次分配给顶点块和面块
+    :return: 生成器, yield (vertices, counts, indices, 已处理的字节数)
+    """
+    header = None
+    pending = b''
+    num_vertices = num_faces = 0
+    for block, consumed in _line_blocks(f, chunk_size):
+        buf = _strip_comments(np.frombuffer(block, dtype=np.uint8))
+        if header is None:
+            # 文件头可能跨越多块
+            pending += buf.tobytes()
+            header = _off_header(np.frombuffer(pending, dtype=np.uint8))
+            if header is None:
+                continue
+            num_vertices, num_faces, body_start = header
+            buf = np.frombuffer(pending, dtype=np.uint8)[body_start:]
+            pending = b''
+
+        record_counts, values, starts = _off_records(np.append(buf, np.uint8(_NEWLINE)).tobytes(),
+                                                     num_vertices + num_faces)
+        split = min(num_vertices, len(starts))
+        vertices = _off_vertices(record_counts[:split], values, starts[:split])
+        num_vertices -= split
+        faces = slice(split, split + min(num_faces, len(starts) - split))
+        counts, indices = _off_faces(record_counts[faces], values, starts[faces])
+        num_faces -= len(counts)
+        yield vertices, counts, indices, consumed
+    if header is None:
+        raise ValueError("Not a valid OFF file")
+    if num_vertices or num_faces:
+        raise ValueError("Unexpected end of OFF file")
+
+
+def _face_blocks(face_offsets, face_indices):
+    """ 按块取出面, yield (每个面的顶点数, 这些面的顶点索引, 各面在块内的起点) """
+    num_faces = len(face_offsets) - 1
+    for start in range(0, num_faces, WRITE_ROWS):
+        offsets = np.asarray(face_offsets[start:min(num_faces, start + WRITE_ROWS) + 1], dtype=np.int64)
+        yield np.diff(offsets), np.asarray(face_indices[offsets[0]:offsets[-1]], dtype=np.int64), \
+            offsets[:-1] - offsets[0]
+
+
+def _face_format(counts, prefix, corner):
+    # 一块中的面顶点数都相同时(如三角形网格)直接重复同一个格式串
+    if counts.min() == counts.max():
+        return (prefix + corner * int(counts[0]) + '\n') * len(counts)
+    formats = {count: prefix + corner * count + '\n' for count in np.unique(counts).tolist()}
+    return ''.join([formats[count] for count in counts.tolist()])
+
+
+def _write_rows(f, row_format, values):
+    """ 逐块把 values (N,k) 按 row_format 格式化, 每块只做一次字符串格式化 """
+    for start in range(0, len(values), WRITE_ROWS):
+        block = np.asarray(values[start:start + WRITE_ROWS])
+        f.write(((row_format * len(block)) % tuple(block.ravel().tolist())).encode('ascii'))
+
+
+def write_obj(f, vertices, face_offsets, face_indices, normals=None):
+    """
+    写出OBJ文件, 坐标保留9位有效数字(float32读回后不变)
+    :param f: 以二进制方式打开的文件
+    :param normals: 可选, 每个顶点的法向量, 写为与顶点编号相同的 vn, 面写为 f v//vn
+    """
+    _write_rows(f, 'v %.9g %.9g %.9g\n', vertices)
+    if normals is not None:
+        _write_rows(f, 'vn %.9g %.9g %.9g\n', normals)
+    for counts, indices, _ in _face_blocks(face_offsets, face_indices):
+        if len(counts) == 0:
+            continue
+        indices = indices + 1
+        if normals is not None:
+            text = _face_format(counts, 'f', ' %d//%d') % tuple(np.repeat(indices, 2).tolist())
+        else:
+            text = _face_format(counts, 'f', ' %d') % tuple(indices.tolist())
+        f.write(text.encode('ascii'))
+
+
+def write_off(f, vertices, face_offsets, face_indices):
+    """ 写出OFF文件 :param f: 以二进制方式打开的文件 """
+    f.write(b'OFF\n%d %d 0\n' % (len(vertices), len(face_offsets) - 1))
+    _write_rows(f, '%.9g %.9g %.9g\n', vertices)
+    for counts, indices, starts in _face_blocks(face_offsets, face_indices):
+        if len(counts) == 0:
+            continue
+        # 每个面的顶点数放在其顶点索引之前
+        values = np.empty(len(indices) + len(counts), dtype=np.int64)
+        heads = starts + np.arange(len(counts))
+        values[heads] = counts
+        body = np.ones(len(values), dtype=bool)
+        body[heads] = False
+        values[body] = indices
+        f.write((_face_format(counts, '%d', ' %d') % tuple(values.tolist())).encode('ascii'))
+
+
+def write_ply(f, vertices, face_offsets, face_indices, normals=None):
+    """
+    写出二进制(little endian)PLY文件, 顶点坐标和法向量为float, 面为 list uchar int
+    (有超过255个顶点的面时顶点数用uint)
+    :param f: 以二进制方式打开的文件
+    """
+    num_faces = len(face_offsets) - 1
+    max_count = 0
+    for start in range(0, num_faces, WRITE_ROWS):
+        offsets = np.asarray(face_offsets[start:min(num_faces, start + WRITE_ROWS) + 1])
+        max_count = max(max_count, int(np.diff(offsets).max()))
+    count_type, count_dtype = ('uchar', np.dtype('u1')) if max_count <= 255 else ('uint', np.dtype('<u4'))
+    properties = ['x', 'y', 'z'] + (['nx', 'ny', 'nz'] if normals is not None else [])
+    header = ['ply', 'format binary_little_endian 1.0', 'element vertex %d' % len(vertices)]
+    header += ['property float %s' % name for name in properties]
+    header += ['element face %d' % num_faces, 'property list %s int vertex_indices' % count_type, 'end_header']
+    f.write(('\n'.join(header) + '\n').encode('ascii'))
+
+    for start in range(0, len(vertices), WRITE_ROWS):
+        stop = min(len(vertices), start + WRITE_ROWS)
+        block = np.empty((stop - start, len(properties)), dtype='<f4')
+        block[:, :3] = vertices[start:stop]
+        if normals is not None:
+            block[:, 3:] = normals[start:stop]
+        f.write(block)
+
+    for counts, indices, starts in _face_blocks(face_offsets, face_indices):
+        if len(counts) == 0:
+            continue
+        # 每个面占 (顶点数, 索引...) 字节, 逐字节放入一块缓冲区
+        sizes = count_dtype.itemsize + 4 * counts
+        face_starts = np.cumsum(sizes) - sizes
+        buffer = np.empty(int(sizes.sum()), dtype=np.uint8)
+        byte = np.arange(count_dtype.itemsize)
+        buffer[face_starts[:, np.newaxis] + byte] = counts.astype(count_dtype).view(np.uint8).reshape(-1, len(byte))
+        corner_faces = np.repeat(np.arange(len(counts)), counts)
+        corners = (face_starts[corner_faces] + count_dtype.itemsize
+                   + 4 * (np.arange(len(indices)) - starts[corner_faces]))
+        buffer[corners[:, np.newaxis] + np.arange(4)] = indices.astype('<i4').view(np.uint8).reshape(-1, 4)
+        f.write(buffer)
+
+_PLY_TYPES = {'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1', 'short': 'i2', 'int16': 'i2',
+              'ushort': 'u2', 'uint16': 'u2', 'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+              'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'}
+_PLY_BLOCK = 1 << 16  # 列表长度不同时每次确定记录起点的字节数, 跳转表的大小与之成正比
+
+
+def _map_file(filename):
+    """
+    写时复制映射整个文件(空文件返回空数组): 得到的视图可以原地修改(如居中缩放), 只有被修改的页才复制, 不会写回文件
+    """
+    if os.path.getsize(filename) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(filename, dtype=np.uint8, mode='c')
+
+
+def _ply_header(data):
+    """
+    :return: (字节序 '<' 或 '>', [(元素名, 记录数, [(属性名, 类型) 或 (属性名, (长度类型, 元素类型))])], 数据起点)
+    """
+    size = 1024
+    while True:
+        head = bytes(data[:size])
+        end = head.find(b'end_header')
+        newline = head.find(b'\n', end)
+        if end >= 0 and newline >= 0:
+            break
+        if size >= len(data):
+            raise ValueError("Not a valid PLY file")
+        size *= 4
+    lines = head[:end].decode('ascii', 'replace').splitlines()
+    if not lines or lines[0].strip() != 'ply':
+        raise ValueError("Not a valid PLY file")
+    endian, elements = None, []
+    try:
+        for line in lines[1:]:
+            words = line.split()
+            if not words or words[0] in ('comment', 'obj_info'):
+                continue
+            if words[0] == 'format':
+                if words[1] == 'ascii':
+                    raise ValueError("ASCII PLY is not supported, only binary PLY")
+                endian = {'binary_little_endian': '<', 'binary_big_endian': '>'}[words[1]]
+            elif words[0] == 'element':
+                elements.append((words[1], int(words[2]), []))
+            elif words[0] == 'property' and words[1] == 'list':
+                elements[-1][2].append((words[4], (_PLY_TYPES[words[2]], _PLY_TYPES[words[3]])))
+            elif words[0] == 'property':
+                elements[-1][2].append((words[2], _PLY_TYPES[words[1]]))
+    except (IndexError, KeyError):
+        raise ValueError(f"Invalid PLY header line: {line}")
+    if endian is None:
+        raise ValueError("Not a valid PLY file")
+    return endian, elements, newline + 1
+
+
+def _ply_values(data, offset, count, dtype, stride):
+    """ 从 offset 开始每隔 stride 字节读取一个值(不要求对齐), 得到映射文件上的视图 """
+    return np.ndarray((count,), dtype, data, offset, (stride,))
+
+
+def _ply_record_starts(data, offset, count, head, count_type, record_size, item_size):
+    """
+    列表长度不同的记录的起点: 每条记录的起点取决于之前所有记录的长度, 按 _PLY_BLOCK 字节分块,
+    把块中每个字节都当作可能的起点读出列表长度, 得到"下一条记录的起点"跳转表,
+    从已知的起点出发倍增跳转(每次把已找到的起点数翻倍), 不逐条记录执行Python代码
+    :param head: 列表长度之前的字节数
+    :param record_size: 列表长度为0时一条记录的字节数
+    :return: (各记录的起点 (count,), 元素之后的字节位置)
+    """
+    starts = []
+    done = 0
+    while done < count:
+        readable = min(_PLY_BLOCK, len(data) - offset - head - count_type.itemsize + 1)
+        if readable <= 0:
+            raise ValueError("Unexpected end of PLY file")
+        sizes = _ply_values(data, offset + head, readable, count_type, 1).astype(np.int64) * item_size + record_size
+        # 跳转到块外的记录都指向哨兵 readable
+        jump = np.append(np.minimum(np.arange(readable) + sizes, readable), readable)
+        chain = np.zeros(1, dtype=np.int64)
+        while len(chain) < count - done:
+            step = jump[chain]
+            step = step[step < readable]
+            complete = len(step) < len(chain)  # 已到达块的末尾
+            chain = np.concatenate((chain, step))
+            if complete:
+                break
+            jump = jump[jump]
+        chain = chain[:count - done]
+        starts.append(offset + chain)
+        done += len(chain)
+        offset += int(chain[-1] + sizes[chain[-1]])
+    if offset > len(data):
+        raise ValueError("Unexpected end of PLY file")
+    return np.concatenate(starts), offset
+
+
+def _ply_list_element(data, offset, count, properties, endian):
+    """
+    只含一个列表属性的元素(如面): 列表长度都相同时整段看作定长记录;
+    否则先确定每条记录的起点(见 _ply_record_starts), 再用一次花式索引取出所有列表元素
+    :return: (每条记录的列表长度, 展平的列表元素, 元素之后的字节位置)
+    """
+    position = [i for i, (_, kind) in enumerate(properties) if isinstance(kind, tuple)][0]
+    head = sum(np.dtype(endian + kind).itemsize for _, kind in properties[:position])
+    tail = sum(np.dtype(endian + kind).itemsize for _, kind in properties[position + 1:])
+    count_type, item_type = (np.dtype(endian + kind) for kind in properties[position][1])
+    record_size = head + count_type.itemsize + tail
+    if count == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), offset
+    if offset + head + count_type.itemsize > len(data):
+        raise ValueError("Unexpected end of PLY file")
+
+    length = int(_ply_values(data, offset + head, 1, count_type, 1)[0])
+    size = record_size + length * item_type.itemsize
+    if offset + count * size <= len(data) \
+            and np.all(_ply_values(data, offset + head, count, count_type, size) == length):
+        items = np.ndarray((count, length), item_type, data, offset + head + count_type.itemsize,
+                           (size, item_type.itemsize))
+        return np.full(count, length, dtype=np.int64), items.reshape(-1), offset + count * size
+
+    starts, end = _ply_record_starts(data, offset, count, head, count_type, record_size, item_type.itemsize)
+    lengths = _ply_values(data, offset + head, end - offset - head - count_type.itemsize + 1, count_type, 1)
+    lengths = lengths[starts - offset].astype(np.int64)
+    # 第 j 个列表元素位于 起点 + head + 列表长度的字节数 + j * 元素字节数
+    first = np.cumsum(lengths) - lengths
+    corners = np.repeat(starts + head + count_type.itemsize - first * item_type.itemsize, lengths) \
+        + np.arange(int(lengths.sum())) * item_type.itemsize
+    items = _ply_values(data, offset, max(end - offset - item_type.itemsize + 1, 0), item_type, 1)[corners - offset]
+    return lengths, items, end
+
+
+def read_ply(filename):
+    """
+    读取二进制PLY文件: 映射文件后把顶点元素直接看作结构数组, 坐标是本机字节序的float时不复制;
+    面(vertex_indices 或 vertex_index 列表)不逐条读取, 见 _ply_list_element
+    :return: (vertices (N,3) float32, counts, indices)
+    """
+    data = _map_file(filename)
+    endian, elements, offset = _ply_header(data)
+    vertices, counts, indices = None, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    for name, count, properties in elements:
+        lists = [prop for prop, kind in properties if isinstance(kind, tuple)]
+        if not lists:
+            record = np.dtype([(prop, endian + kind) for prop, kind in properties])
+            if offset + count * record.itemsize > len(data):
+                raise ValueError("Unexpected end of PLY file")
+            records = np.frombuffer(data, record, count, offset)
+            offset += count * record.itemsize
+            if name == 'vertex':
+                if not all(axis in record.names for axis in 'xyz'):
+                    raise ValueError("PLY vertex element has no x/y/z properties")
+                xyz = records[['x', 'y', 'z']]
+                if all(record.fields[axis][0] == np.dtype(np.float32) for axis in 'xyz'):
+                    # 三个坐标字段类型相同且间隔相同时, 得到的是映射文件上的视图
+                    vertices = structured_to_unstructured(xyz)
+                else:
+                    vertices = structured_to_unstructured(xyz, dtype=np.float32)
+        elif len(lists) == 1:
+            lengths, items, offset = _ply_list_element(data, offset, count, properties, endian)
+            if name == 'face' and lists[0] in ('vertex_indices', 'vertex_index'):
+                counts, indices = lengths, items
+        else:
+            raise ValueError(f"PLY element '{name}' has more than one list property")
+    if vertices is None:
+        raise ValueError("PLY file has no vertex element")
+    return vertices, counts, indices
+
+
+_STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+
+
+def read_stl(filename):
+    """
+    读取二进制STL文件: 映射文件后把三角形记录直接看作结构数组
+    每个三角形有自己的三个顶点(三角形汤), 需要焊接后才有共享的拓扑
+    :return: (vertices (3T,3) float32, counts, indices)
+    """
+    data = _map_file(filename)
+    count = int(np.frombuffer(data, '<u4', 1, 80)[0]) if len(data) >= 84 else -1
+    if len(data) != 84 + count * _STL_RECORD.itemsize:
+        if bytes(data[:5]).lower() == b'solid':
+            raise ValueError("ASCII STL is not supported, only binary STL")
+        raise ValueError("Not a valid binary STL file")
+    records = np.frombuffer(data, _STL_RECORD, count, 84)
+    return records['vertices'].reshape(-1, 3), np.full(count, 3, dtype=np.int64), np.arange(3 * count)
@@ -0,0 +1,317 @@
+"""
+外存(out-of-core)网格: 顶点、法向量和面数组保存在磁盘上的内存映射文件中,
+包围盒、法向量和Laplacian光顺按块流式计算, 内存占用只与块大小有关
+"""
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+
+DEFAULT_STORAGE_DIR = os.path.join(os.path.expanduser('~'), '.cache', '3d_viewer', 'out_of_core')
+CHUNK_ROWS = 1 << 20  # 每块处理的顶点数、面数或三角形数
+_MAX_BUCKETS = 256    # 边去重时同时写入的桶(文件)数上限
+
+
+def physical_memory():
+    """ 物理内存字节数, 无法获取时返回None """
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class MappedStorage:
+    """ 一个网格的内存映射文件所在的目录 """
+    def __init__(self, directory=None):
+        """
+        :param directory: 父目录, 需位于磁盘上(不能是tmpfs等内存文件系统), 默认为 DEFAULT_STORAGE_DIR
+        """
+        parent = directory or DEFAULT_STORAGE_DIR
+        os.makedirs(parent, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix='mesh_', dir=parent)
+        self._scratch = {}
+        # 不再被引用时删除目录; 仍被映射的文件在Linux上到解除映射前都有效
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, True)
+
+    def create(self, name, shape, dtype):
+        fd, path = tempfile.mkstemp(prefix=name + '_', suffix='.bin', dir=self.directory)
+        os.close(fd)
+        if int(np.prod(shape)) == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='w+', shape=shape)
+
+    def scratch(self, name, shape, dtype):
+        """ 可重复使用的临时数组, 同名的只保留一个 """
+        array = self._scratch.get(name)
+        if array is None or array.shape != tuple(shape) or array.dtype != np.dtype(dtype):
+            array = self._scratch[name] = self.create(name, shape, dtype)
+        return array
+
+    def writer(self, name, dtype, columns=None):
+        return ArrayWriter(self, name, dtype, columns)
+
+    def copy(self, array, name):
+        """ 按块复制到新的映射文件 """
+        result = self.create(name, array.shape, array.dtype)
+        copy_rows(array, result)
+        return result
+
+    def remove(self):
+        self._finalizer()
+
+
+class ArrayWriter:
+    """ 长度事先未知的数组: 按块追加写入文件, 结束后映射为数组 """
+    def __init__(self, storage, name, dtype, columns=None):
+        fd, self.path = tempfile.mkstemp(prefix=name + '_', suffix='.bin', dir=storage.directory)
+        self.file = os.fdopen(fd, 'wb')
+        self.dtype = np.dtype(dtype)
+        self.columns = columns
+        self.rows = 0
+
+    def append(self, values):
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        self.file.write(values.tobytes())
+        self.rows += len(values)
+
+    def finish(self):
+        self.file.close()
+        shape = (self.rows,) if self.columns is None else (self.rows, self.columns)
+        if self.rows == 0:
+            return np.zeros(shape, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode='r+', shape=shape)
+
+
+def copy_rows(source, target):
+    """ 按块把 source 复制到同样大小的 target 中 """
+    for start, stop in chunks(len(source)):
+        target[start:stop] = source[start:stop]
+
+
+def chunks(count, size=None):
+    size = size or CHUNK_ROWS
+    for start in range(0, count, size):
+        yield start, min(count, start + size)
+
+
+def fan_triangulate(counts, indices, face_base=0):
+    """
+    多边形按三角形扇 (v0, vi, vi+1) 三角化
+    :param counts: 每个面的顶点数
+    :param indices: 这些面的顶点索引依次拼接
+    :param face_base: 第一个面的全局编号
+    :return: (triangles (T,3) int32, triangle_faces (T,) int32)
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    offsets = np.cumsum(counts) - counts
+    tri_counts = np.maximum(counts - 2, 0)
+    local_faces = np.repeat(np.arange(len(counts)), tri_counts)
+    first_tri = np.cumsum(tri_counts) - tri_counts
+    k = np.arange(len(local_faces)) - np.repeat(first_tri, tri_counts)
+    base = offsets[local_faces]
+    triangles = np.stack([indices[base], indices[base + k + 1], indices[base + k + 2]], axis=1).astype(np.int32)
+    return triangles, (local_faces + face_base).astype(np.int32)
+
+
+def bounds(vertices):
+    """ :return: (最小坐标, 最大坐标) """
+    lower = np.full(3, np.inf)
+    upper = np.full(3, -np.inf)
+    for start, stop in chunks(len(vertices)):
+        block = vertices[start:stop]
+        lower = np.minimum(lower, block.min(axis=0))
+        upper = np.maximum(upper, block.max(axis=0))
+    return lower, upper
+
+
+def center_and_scale(vertices):
+    """ 原地把包围盒中心移到原点并使最大尺寸为1 """
+    if len(vertices) == 0:
+        return
+    lower, upper = bounds(vertices)
+    center = ((lower + upper) / 2.0).astype(vertices.dtype)
+    max_dim = np.max(upper - lower)
+    for start, stop in chunks(len(vertices)):
+        vertices[start:stop] -= center
+        if max_dim > 0:
+            vertices[start:stop] /= vertices.dtype.type(max_dim)
+
+
+def _scatter_add(out, indices, values):
+    # out[indices] += values, 重复的索引先在块内合并, 只读写涉及的行
+    order = np.argsort(indices, kind='stable')
+    indices = indices[order]
+    starts = np.flatnonzero(np.concatenate(([True], indices[1:] != indices[:-1])))
+    out[indices[starts]] += np.add.reduceat(values[order], starts, axis=0).astype(out.dtype)
+
+
+def _normalize_rows(array, out=None):
+    """ 按块把 array 的每一行归一化后写入 out(默认原地写入) """
+    out = array if out is None else out
+    for start, stop in chunks(len(array)):
+        block = np.asarray(array[start:stop])
+        norms = np.linalg.norm(block, axis=1)
+        norms[norms == 0] = 1.0
+        out[start:stop] = block / norms[:, np.newaxis]
+
+
+def _face_corners(face_offsets, face_indices, start, stop):
+    """
+    第 start..stop 个面的角点
+    :return: (顶点索引, 下一个角点的位置, 各面在块内的起点)
+    """
+    first, last = int(face_offsets[start]), int(face_offsets[stop])
+    indices = np.asarray(face_indices[first:last], dtype=np.int64)
+    offsets = np.asarray(face_offsets[start:stop + 1], dtype=np.int64) - first
+    next_corner = np.arange(1, len(indices) + 1)
+    nonempty = offsets[1:] > offsets[:-1]
+    next_corner[offsets[1:][nonempty] - 1] = offsets[:-1][nonempty]
+    return indices, next_corner, offsets
+
+
+def vertex_normals(vertices, face_offsets, face_indices, normals, storage, mode='uniform'):
+    """
+    按面分块计算顶点法向量并写入 normals(float32)
+    与 Mesh.calculate_normals 一样在float64中累加(累加数组是 storage 中的临时映射文件), 共享顶点的面再多,
+    结果与内存中的计算也只相差float32的舍入误差
+    """
+    sums = storage.scratch('normal_sums', normals.shape, np.float64)
+    for start, stop in chunks(len(sums)):
+        sums[start:stop] = 0
+    for start, stop in chunks(len(face_offsets) - 1):
+        indices, next_corner, offsets = _face_corners(face_offsets, face_indices, start, stop)
+        if len(indices) == 0:
+            continue
+        counts = np.diff(offsets)
+        corner_faces = np.repeat(np.arange(len(counts)), counts)
+        positions = np.asarray(vertices[indices], dtype=np.float64)
+        prev_corner = np.empty_like(next_corner)
+        prev_corner[next_corner] = np.arange(len(indices))
+
+        # Newell法向量: 以面的第一个顶点为原点, 各边叉积之和等于扇形三角形叉积之和
+        relative = positions - positions[offsets[:-1][corner_faces]]
+        crosses = np.cross(relative, relative[next_corner])
+        nonempty = counts > 0
+        face_normals = np.zeros((len(counts), 3))
+        face_normals[nonempty] = np.add.reduceat(crosses, offsets[:-1][nonempty], axis=0)
+        if mode == 'area':
+            face_weights = 0.5 * face_normals
+        else:
+            lengths = np.linalg.norm(face_normals, axis=1)
+            lengths[lengths == 0] = 1.0
+            face_weights = face_normals / lengths[:, np.newaxis]
+        weights = face_weights[corner_faces]
+        if mode == 'angle':
+            to_prev = positions[prev_corner] - positions
+            to_next = positions[next_corner] - positions
+            angle = np.arctan2(np.linalg.norm(np.cross(to_prev, to_next), axis=1),
+                               np.einsum('ij,ij->i', to_prev, to_next))
+            weights = weights * angle[:, np.newaxis]
+        _scatter_add(sums, indices, weights)
+    _normalize_rows(sums, normals)
+
+
+def _sorted_unique(keys):
+    # 排序后去掉相邻的重复值(比 np.unique 的哈希实现快得多)
+    keys = np.sort(keys)
+    return keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+
+
+def unique_edges(face_offsets, face_indices, num_vertices, storage):
+    """
+    去重后的无向边, 与 MeshTopology.edges 相同(不含首尾相同的退化边), 按 (较小索引, 较大索引) 排序
+    按面分块计算边的键后, 按较小端点所在的顶点范围分桶写入磁盘, 再逐桶排序去重, 每次只有一个桶在内存中
+    :return: 边的键 lo * num_vertices + hi (E,) int64, 保存在映射文件中
+    """
+    bucket_rows = max(CHUNK_ROWS, -(-num_vertices // _MAX_BUCKETS))
+    buckets = {}
+    for start, stop in chunks(len(face_offsets) - 1):
+        indices, next_corner, _ = _face_corners(face_offsets, face_indices, start, stop)
+        lo, hi = np.minimum(indices, indices[next_corner]), np.maximum(indices, indices[next_corner])
+        valid = lo != hi
+        keys = _sorted_unique(lo[valid] * num_vertices + hi[valid])
+        if len(keys) == 0:
+            continue
+        bucket = keys // num_vertices // bucket_rows
+        bounds = np.concatenate(([0], np.flatnonzero(bucket[1:] != bucket[:-1]) + 1, [len(keys)]))
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            number = int(bucket[first])
+            if number not in buckets:
+                buckets[number] = storage.writer('edges_%d' % number, np.int64)
+            buckets[number].append(keys[first:last])
+
+    edges = storage.writer('edges', np.int64)
+    for number in sorted(buckets):
+        writer = buckets[number]
+        edges.append(_sorted_unique(np.asarray(writer.finish())))
+        os.remove(writer.path)
+    return edges.finish()
+
+
+def _laplacian_step(vertices, edges, accumulator, factor):
+    """
+    x += factor * (邻居平均 - x), 按去重后的边分块把邻居和累加到 accumulator (N,4) 中,
+    与均匀权重的 LaplacianOperator 相同(每个邻居只计一次, 与相邻的面数无关)
+    :param edges: unique_edges 得到的边的键
+    :return: 最大位移和位移平方和
+    """
+    num_vertices = len(vertices)
+    for start, stop in chunks(len(accumulator)):
+        accumulator[start:stop] = 0
+    for start, stop in chunks(len(edges)):
+        keys = np.asarray(edges[start:stop])
+        a, b = keys // num_vertices, keys % num_vertices
+        ones = np.ones((len(a), 1))
+        _scatter_add(accumulator, a, np.hstack([np.asarray(vertices[b], dtype=np.float64), ones]))
+        _scatter_add(accumulator, b, np.hstack([np.asarray(vertices[a], dtype=np.float64), ones]))
+
+    max_displacement, squared = 0.0, 0.0
+    for start, stop in chunks(len(vertices)):
+        block = accumulator[start:stop]
+        degree = block[:, 3:4]
+        x = np.asarray(vertices[start:stop], dtype=np.float64)
+        displacement = np.where(degree > 0, block[:, :3] / np.where(degree > 0, degree, 1.0) - x, 0.0) * factor
+        vertices[start:stop] = x + displacement
+        lengths = np.linalg.norm(displacement, axis=1)
+        if len(lengths):
+            max_displacement = max(max_displacement, float(lengths.max()))
+        squared += float(np.dot(lengths, lengths))
+    return max_displacement, squared
+
+
+def laplacian_smoothing(vertices, edges, storage, iterations=1, lambda_factor=0.5, mu=None, tol=None,
+                        tol_norm='max'):
+    """
+    原地显式(mu为None)或Taubin(lambda收缩后mu膨胀)光顺, 参数与 Mesh.laplacian_smoothing 相同
+    :param edges: unique_edges 得到的边的键
+    :param storage: 用于存放邻居和的临时映射文件
+    :return: 统计信息
+    """
+    stats = {'iterations': 0, 'converged': False, 'displacement': 0.0, 'cg_iterations': 0, 'residual': 0.0}
+    accumulator = storage.scratch('laplacian', (len(vertices), 4), np.float64)
+    # Taubin每次迭代包含两步, 位移按迭代前后的坐标计算
+    previous = storage.scratch('previous', vertices.shape, vertices.dtype) if mu is not None else None
+    for _ in range(iterations):
+        if previous is not None:
+            for start, stop in chunks(len(vertices)):
+                previous[start:stop] = vertices[start:stop]
+        max_displacement, squared = _laplacian_step(vertices, edges, accumulator, lambda_factor)
+        if previous is not None:
+            _laplacian_step(vertices, edges, accumulator, mu)
+            max_displacement, squared = 0.0, 0.0
+            for start, stop in chunks(len(vertices)):
+                lengths = np.linalg.norm(np.asarray(vertices[start:stop], dtype=np.float64) - previous[start:stop],
+                                         axis=1)
+                if len(lengths):
+                    max_displacement = max(max_displacement, float(lengths.max()))
+                squared += float(np.dot(lengths, lengths))
+        stats['iterations'] += 1
+        if tol_norm == 'max':
+            stats['displacement'] = max_displacement
+        else:
+            stats['displacement'] = float(np.sqrt(squared / max(len(vertices), 1)))
+        if tol is not None and stats['displacement'] <= tol:
+            stats['converged'] = True
+            break
+    return stats
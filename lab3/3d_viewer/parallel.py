@@ -0,0 +1,97 @@
+"""
+多线程分块执行: 把顶点(或面、三角形、角点)的索引范围划分为连续的块, 交给线程池中的线程处理
+
+各块只调用处理大数组时释放GIL的NumPy运算(take、bincount、reduceat、逐元素运算等), 多个线程可以同时运行;
+每块写入结果数组中属于自己的范围, 不需要加锁
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+MIN_CHUNK = 1 << 15  # 每块的最少元素数, 块太小时线程调度的开销超过并行的收益
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def resolve_workers(workers):
+    """ :param workers: 线程数, None表示CPU核数 """
+    if workers is None:
+        return os.cpu_count() or 1
+    workers = int(workers)
+    if workers < 1:
+        raise ValueError(f"Invalid number of workers: {workers}")
+    return workers
+
+
+def _executor(workers):
+    # 同一线程数的线程池在进程内共用, 避免每次计算都创建线程
+    with _lock:
+        if workers not in _executors:
+            _executors[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mesh-worker')
+        return _executors[workers]
+
+
+def chunk_bounds(count, workers, min_chunk=None):
+    """ 把 [0, count) 划分为不超过 workers 个大小相近的连续块 :return: 块的边界 (块数+1,) """
+    min_chunk = MIN_CHUNK if min_chunk is None else min_chunk
+    chunks = max(1, min(workers, count // max(min_chunk, 1)))
+    return np.arange(chunks + 1, dtype=np.int64) * count // chunks
+
+
+def for_chunks(function, count, workers, min_chunk=None):
+    """
+    对每个块调用 function(start, stop); 只有一块时在当前线程中直接调用
+    :return: 各块的返回值, 按块的顺序排列
+    """
+    bounds = chunk_bounds(count, workers, min_chunk).tolist()
+    ranges = list(zip(bounds[:-1], bounds[1:]))
+    if len(ranges) == 1:
+        return [function(*ranges[0])]
+    return list(_executor(workers).map(lambda bound: function(*bound), ranges))
+
+
+class ScatterGroups:
+    """
+    按目标分组的散射累加, 用于并行计算 np.bincount(indices, weights, size):
+    构建时按目标稳定排序一次, 之后每块只累加目标在自己范围内的元素;
+    同一目标的元素仍按原来的顺序相加, 结果与串行的 np.bincount 逐位相同
+    """
+    def __init__(self, indices, size):
+        indices = np.asarray(indices)
+        self.size = size
+        self.order = np.argsort(indices, kind='stable')
+        if len(indices) < np.iinfo(np.int32).max:
+            self.order = self.order.astype(np.int32)
+        self.offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=size), out=self.offsets[1:])
+
+    def bincount(self, indices, weights, workers, scale=None):
+        """
+        :param indices: 构建时的目标索引
+        :param scale: 可选, 与 weights 逐元素相乘后再累加
+        :return: (size,) float64
+        """
+        result = np.empty(self.size)
+
+        def accumulate(start, stop):
+            selected = self.order[self.offsets[start]:self.offsets[stop]]
+            values = weights[selected] if scale is None else weights[selected] * scale[selected]
+            result[start:stop] = np.bincount(indices[selected] - start, weights=values, minlength=stop - start)
+
+        for_chunks(accumulate, self.size, workers)
+        return result
+
+
+def bincount(indices, weights, size, workers, scale=None):
+    """
+    非确定性的并行 np.bincount: 按元素分块分别累加后求和, 不需要预先排序,
+    但同一目标的加法顺序与串行不同, 结果可能在最后几位有差别
+    """
+    def accumulate(start, stop):
+        values = weights[start:stop] if scale is None else weights[start:stop] * scale[start:stop]
+        return np.bincount(indices[start:stop], weights=values, minlength=size)
+
+    partial = for_chunks(accumulate, len(indices), workers)
+    return np.sum(partial, axis=0) if len(partial) > 1 else partial[0]
@@ -0,0 +1,145 @@
+"""
+GLSL逐像素光照(Blinn-Phong), 光源与材质参数放在一个uniform缓冲(UBO)中
+"""
+from OpenGL.GL import *
+import numpy as np
+
+# 顶点属性仍来自 glVertexPointer/glNormalPointer, 变换矩阵沿用固定管线的矩阵栈
+VERTEX_SHADER = """
+#version 120
+varying vec3 position;
+varying vec3 normal;
+
+void main()
+{
+    position = vec3(gl_ModelViewMatrix * gl_Vertex);
+    normal = gl_NormalMatrix * gl_Normal;
+    gl_Position = ftransform();
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 120
+#extension GL_ARB_uniform_buffer_object : require
+
+layout(std140) uniform Lighting {
+    vec4 light_position;      // 视坐标系, w=0为方向光
+    vec4 light_ambient;
+    vec4 light_diffuse;
+    vec4 light_specular;
+    vec4 material_ambient;
+    vec4 material_diffuse;
+    vec4 material_specular;
+    vec4 material_emission;
+    vec4 scene_ambient;       // 与固定管线 GL_LIGHT_MODEL_AMBIENT 的默认值一致
+    float shininess;
+};
+
+varying vec3 position;
+varying vec3 normal;
+
+void main()
+{
+    vec3 n = normalize(normal);
+    vec3 l = light_position.w == 0.0 ? normalize(light_position.xyz)
+                                     : normalize(light_position.xyz - position);
+    vec3 v = normalize(-position);
+    float diffuse = max(dot(n, l), 0.0);
+    float specular = diffuse > 0.0 ? pow(max(dot(n, normalize(l + v)), 0.0), shininess) : 0.0;
+
+    vec3 color = material_emission.rgb
+               + scene_ambient.rgb * material_ambient.rgb
+               + light_ambient.rgb * material_ambient.rgb
+               + light_diffuse.rgb * material_diffuse.rgb * diffuse
+               + light_specular.rgb * material_specular.rgb * specular;
+    gl_FragColor = vec4(color, material_diffuse.a);
+}
+"""
+
+_BLOCK_BINDING = 0
+_SCENE_AMBIENT = [0.2, 0.2, 0.2, 1.0]
+
+
+def _compile(source, kind):
+    shader = glCreateShader(kind)
+    glShaderSource(shader, source)
+    glCompileShader(shader)
+    if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+        log = glGetShaderInfoLog(shader)
+        glDeleteShader(shader)
+        raise RuntimeError(f"Shader compile error: {log.decode(errors='replace') if isinstance(log, bytes) else log}")
+    return shader
+
+
+def supported():
+    """ 当前上下文是否支持着色器与uniform缓冲(需在OpenGL上下文中调用) """
+    return bool(glCreateShader) and bool(glGetUniformBlockIndex) and bool(glBindBufferBase)
+
+
+class PhongProgram:
+    """
+    着色器程序及其uniform缓冲; 修改光照参数只需一次 glBufferSubData
+    创建失败(驱动过旧、编译错误)时抛出 RuntimeError, 调用方回退到固定管线
+    """
+    def __init__(self):
+        if not supported():
+            raise RuntimeError("GLSL uniform buffers are not supported")
+        vertex = _compile(VERTEX_SHADER, GL_VERTEX_SHADER)
+        fragment = _compile(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        self.program = glCreateProgram()
+        glAttachShader(self.program, vertex)
+        glAttachShader(self.program, fragment)
+        glLinkProgram(self.program)
+        glDeleteShader(vertex)
+        glDeleteShader(fragment)
+        if not glGetProgramiv(self.program, GL_LINK_STATUS):
+            log = glGetProgramInfoLog(self.program)
+            glDeleteProgram(self.program)
+            raise RuntimeError(f"Shader link error: {log.decode(errors='replace') if isinstance(log, bytes) else log}")
+
+        block = glGetUniformBlockIndex(self.program, "Lighting")
+        if block == GL_INVALID_INDEX:
+            glDeleteProgram(self.program)
+            raise RuntimeError("Uniform block 'Lighting' not found")
+        glUniformBlockBinding(self.program, block, _BLOCK_BINDING)
+        size = np.zeros(1, dtype=np.int32)
+        glGetActiveUniformBlockiv(self.program, block, GL_UNIFORM_BLOCK_DATA_SIZE, size)
+        self.block_size = int(size[0])
+        self.uniform_buffer = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, self.uniform_buffer)
+        glBufferData(GL_UNIFORM_BUFFER, self.block_size, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+        self._uploaded = None
+
+    @staticmethod
+    def pack(light_params, material):
+        """ 按std140布局打包: 9个vec4后接一个float """
+        data = np.zeros(40, dtype=np.float32)
+        data[:36] = np.concatenate([
+            light_params['position'], light_params['ambient'], light_params['diffuse'], light_params['specular'],
+            material['ambient'], material['diffuse'], material['specular'], material['emission'],
+            _SCENE_AMBIENT])
+        data[36] = light_params['shininess']
+        return data
+
+    def update(self, light_params, material):
+        """ 参数与已上传的相同时不做任何GL调用 """
+        data = self.pack(light_params, material)
+        if self._uploaded is not None and np.array_equal(data, self._uploaded):
+            return
+        glBindBuffer(GL_UNIFORM_BUFFER, self.uniform_buffer)
+        glBufferSubData(GL_UNIFORM_BUFFER, 0, min(data.nbytes, self.block_size), data)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+        self._uploaded = data
+
+    def bind(self):
+        glUseProgram(self.program)
+        glBindBufferBase(GL_UNIFORM_BUFFER, _BLOCK_BINDING, self.uniform_buffer)
+
+    @staticmethod
+    def unbind():
+        glUseProgram(0)
+
+    def release(self):
+        glDeleteBuffers(1, [self.uniform_buffer])
+        glDeleteProgram(self.program)
@@ -0,0 +1,90 @@
+"""
+在后台线程中执行网格光顺, 避免阻塞界面
+"""
+import threading
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+import out_of_core
+
+
+class SmoothingThread(QThread):
+    """
+    后台线程在网格的副本(后台缓冲)上迭代光顺, 每次迭代都生成新的顶点/法向量数组,
+    通过 frame_ready 信号交给界面线程替换前台网格的数组(只交换引用), 渲染期间数据不会被修改;
+    外存网格原地修改映射数组, 在两组映射文件之间交替, 界面通过 frame_consumed 告知已取走上一帧;
+    界面还没有取走上一帧时, 本次迭代的结果不会被显示, 只迭代不计算法向量
+    """
+    frame_ready = pyqtSignal(object, object)   # (vertices, normals)
+    progress = pyqtSignal(int, dict)            # (已完成的迭代次数, 本次迭代的统计信息)
+    failed = pyqtSignal(str)
+
+    def __init__(self, mesh, max_iterations, interval=0.2, parent=None, **smoothing_args):
+        """
+        :param mesh: 前台网格, 线程只读取其拓扑, 顶点在副本上修改
+        :param interval: 相邻两次迭代的最短时间间隔(秒), 用于观察光顺过程
+        :param smoothing_args: 传给 Mesh.laplacian_smoothing 的参数
+        """
+        super().__init__(parent)
+        self.back = mesh.shallow_copy()
+        self.max_iterations = max_iterations
+        self.interval = interval
+        self.smoothing_args = smoothing_args
+        self.iterations = 0
+        self._cancel = threading.Event()
+        self._consumed = threading.Event()
+        self._consumed.set()    # 还没有发出过帧
+        self._emitted = False   # 后台网格当前的数组是否已经发给界面
+        self._spare = None
+
+    def cancel(self):
+        # 当前迭代结束后立即停止
+        self._cancel.set()
+        self._consumed.set()
+
+    def frame_consumed(self):
+        """ 界面线程已用 frame_ready 发出的数组替换前台网格的数组(不再显示更早的一帧) """
+        self._consumed.set()
+
+    def _swap_mapped_buffers(self):
+        """
+        外存网格的光顺原地修改映射数组, 不能直接写入已发出的数组: 在两组映射文件之间交替,
+        等界面取走上一帧(前台改为显示上一帧的数组, 不再显示另一组)之后, 把上一帧复制到另一组中继续光顺
+        :return: False表示等待期间被取消
+        """
+        self._consumed.wait()  # cancel 也会唤醒等待
+        if self._cancel.is_set():
+            return False
+        back, storage = self.back, self.back.storage
+        if self._spare is None:
+            self._spare = (storage.create('vertices', back.vertices.shape, back.vertices.dtype),
+                           storage.create('normals', back.normals.shape, back.normals.dtype))
+        vertices, normals = self._spare
+        self._spare = (back.vertices, back.normals)
+        out_of_core.copy_rows(back.vertices, vertices)
+        back.vertices, back.normals = vertices, normals
+        return True
+
+    def run(self):
+        try:
+            while self.iterations < self.max_iterations and not self._cancel.is_set():
+                if self.back.storage is not None and self._emitted and not self._swap_mapped_buffers():
+                    break
+                self._emitted = False
+                start = time.perf_counter()
+                stats = self.back.laplacian_smoothing(iterations=1, update_normals=False, **self.smoothing_args)
+                if self._cancel.is_set():
+                    break
+                self.iterations += 1
+                last = stats['converged'] or self.iterations >= self.max_iterations
+                if last or self._consumed.is_set():
+                    # 只为会发给界面的帧计算法向量
+                    self.back.calculate_normals()
+                    self._consumed.clear()
+                    self._emitted = True
+                    self.frame_ready.emit(self.back.vertices, self.back.normals)
+                self.progress.emit(self.iterations, stats)
+                if stats['converged']:
+                    break
+                self._cancel.wait(max(0.0, self.interval - (time.perf_counter() - start)))
+        except Exception as e:
+            self.failed.emit(str(e))
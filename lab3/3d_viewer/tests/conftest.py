@@ -0,0 +1,7 @@
+"""
+测试直接导入 3d_viewer 中的模块(与程序相同的平铺方式): 在 3d_viewer 目录下运行 python -m pytest -q tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,24 @@
+import pytest
+
+from batch import find_files
+
+TRIANGLE_OBJ = "v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n"
+
+
+def test_output_names_keep_source_extension(tmp_path):
+    models = tmp_path / 'models'
+    (models / 'sub').mkdir(parents=True)
+    for name in ('a.obj', 'a.off', 'sub/b.ply'):
+        (models / name).write_text(TRIANGLE_OBJ)
+    output = tmp_path / 'out'
+    tasks = find_files([str(models)], str(output), '.npz')
+    assert [target for _, target in tasks] == [str(output / 'a.obj.npz'), str(output / 'a.off.npz'),
+                                               str(output / 'sub' / 'b.ply.npz')]
+
+
+def test_duplicate_targets_fail_before_processing(tmp_path):
+    for directory in ('x', 'y'):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / 'a.obj').write_text(TRIANGLE_OBJ)
+    with pytest.raises(ValueError, match='a.obj.ply'):
+        find_files([str(tmp_path / 'x' / 'a.obj'), str(tmp_path / 'y' / 'a.obj')], str(tmp_path / 'out'), '.ply')
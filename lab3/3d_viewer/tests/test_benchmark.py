@@ -0,0 +1,19 @@
+import ctypes.util
+import os
+import subprocess
+import sys
+import pytest
+
+VIEWER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.skipif(ctypes.util.find_library('OSMesa') is not None, reason="libOSMesa is installed")
+def test_missing_osmesa_reports_readable_error():
+    # PYOPENGL_PLATFORM 要在导入PyOpenGL之前设置, 所以在子进程中运行
+    result = subprocess.run([sys.executable, os.path.join(VIEWER_DIR, 'benchmark.py'), '--backend', 'osmesa',
+                             '--sizes', '2', '--frames', '1'],
+                            cwd=VIEWER_DIR, capture_output=True, text=True, timeout=120,
+                            env=dict(os.environ, QT_QPA_PLATFORM='offscreen'))
+    assert result.returncode == 1
+    assert 'libOSMesa' in result.stderr
+    assert 'Traceback' not in result.stderr
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from bvh import TriangleBVH, frustum_planes
+from mesh import Mesh
+
+
+def triangle_soup(count, seed):
+    """ 单位立方体中随机位置、大小不一的三角形 """
+    rng = np.random.default_rng(seed)
+    centers = rng.random((count, 1, 3))
+    vertices = (centers + 0.08 * rng.standard_normal((count, 3, 3))).reshape(-1, 3)
+    return vertices, np.arange(3 * count).reshape(count, 3)
+
+
+def brute_force_hit(vertices, triangles, origin, direction):
+    """ 逐个三角形求交(重心坐标解线性方程组), :return: (三角形编号, t) 或 None """
+    best = None
+    for index, (a, b, c) in enumerate(vertices[triangles]):
+        matrix = np.column_stack([b - a, c - a, -direction])
+        if abs(np.linalg.det(matrix)) < 1e-12:
+            continue
+        u, v, t = np.linalg.solve(matrix, origin - a)
+        if u >= 0 and v >= 0 and u + v <= 1 and t > 1e-9 and (best is None or t < best[1]):
+            best = (index, t)
+    return best
+
+
+def random_rays(count, seed):
+    # 从立方体外射向立方体内的随机点
+    rng = np.random.default_rng(seed)
+    origins = rng.standard_normal((count, 3))
+    origins = 0.5 + 2.0 * origins / np.linalg.norm(origins, axis=1)[:, np.newaxis]
+    return origins, rng.random((count, 3)) - origins
+
+
+@pytest.mark.parametrize('leaf_size', [1, 8])
+def test_intersect_matches_brute_force(leaf_size):
+    vertices, triangles = triangle_soup(300, seed=1)
+    tree = TriangleBVH(vertices, triangles, leaf_size)
+    hits = 0
+    for origin, direction in zip(*random_rays(60, seed=2)):
+        expected = brute_force_hit(vertices, triangles, origin, direction)
+        result = tree.intersect(vertices, origin, direction)
+        if expected is None:
+            assert result is None
+            continue
+        hits += 1
+        triangle, t, point = result
+        assert triangle == expected[0]
+        assert t == pytest.approx(expected[1])
+        assert np.allclose(point, origin + expected[1] * direction)
+    assert hits > 20
+
+
+def test_refit_matches_rebuilt_boxes():
+    vertices, triangles = triangle_soup(200, seed=3)
+    tree = TriangleBVH(vertices, triangles)
+    moved = vertices + 0.2 * np.random.default_rng(4).standard_normal(vertices.shape)
+    tree.refit(moved)
+    for node in range(len(tree.start)):
+        corners = moved[tree.sorted_triangles[tree.start[node]:tree.end[node]].ravel()]
+        assert np.array_equal(tree.lower[node], corners.min(axis=0))
+        assert np.array_equal(tree.upper[node], corners.max(axis=0))
+    for origin, direction in zip(*random_rays(20, seed=5)):
+        expected = brute_force_hit(moved, triangles, origin, direction)
+        result = tree.intersect(moved, origin, direction)
+        assert (result is None) == (expected is None)
+        if expected is not None:
+            assert result[0] == expected[0]
+
+
+def test_visible_ranges_only_cull_triangles_outside_the_frustum():
+    vertices, triangles = triangle_soup(2000, seed=6)
+    tree = TriangleBVH(vertices, triangles)
+    # 正交投影, 只看立方体的一角 [0, 0.4]^3 (列主序, 与 glGetDoublev 返回的相同)
+    scale, shift = 2 / 0.4, -1.0
+    projection = np.array([[scale, 0, 0, 0], [0, scale, 0, 0], [0, 0, -scale, 0], [shift, shift, -shift, 1]])
+    planes = frustum_planes(np.eye(4), projection)
+
+    ranges = tree.visible_ranges(planes, chunk_size=16)
+    visible = np.zeros(len(triangles), dtype=bool)
+    for start, end in ranges:
+        visible[tree.order[start:end]] = True
+    distances = np.einsum('tkj,pj->tpk', vertices[triangles], planes[:, :3]) + planes[:, 3][:, np.newaxis]
+    outside = np.any(np.all(distances < 0, axis=2), axis=1)  # 三个角点都在某个平面外侧
+    inside = np.all(distances >= 0, axis=(1, 2))
+    assert np.all(visible[inside]) and np.all(outside[~visible])
+    assert np.count_nonzero(visible) < len(triangles) // 2
+    assert all(a[1] < b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_pick_reports_face_and_nearest_vertex():
+    # 2x2个四边形组成的平面 z=0, 顶点 (x, y) 的编号为 3*y + x
+    x, y = np.meshgrid(np.arange(3.0), np.arange(3.0))
+    vertices = np.stack([x.ravel(), y.ravel(), np.zeros(9)], axis=1).astype(np.float32)
+    mesh = Mesh()
+    quads = [[3 * j + i, 3 * j + i + 1, 3 * j + i + 4, 3 * j + i + 3] for j in range(2) for i in range(2)]
+    mesh._set_arrays(vertices, np.full(4, 4), np.array(quads).ravel())
+
+    hit = mesh.pick([1.8, 0.4, 5.0], [0.0, 0.0, -1.0])
+    assert hit['face'] == 1 and hit['vertex'] == 2
+    assert hit['distance'] == pytest.approx(5.0)
+    assert np.allclose(hit['point'], [1.8, 0.4, 0.0])
+    assert mesh.pick([1.0, 1.0, 5.0], [0.0, 0.0, 1.0]) is None
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from benchmark import synthetic_mesh
+from decimate import decimate
+from mesh import Mesh
+from topology import MeshTopology
+
+
+def torus(n, m, major=1.0, minor=0.35):
+    """ 闭合的环面, n x m 个顶点, 每格两个三角形 """
+    u, v = np.meshgrid(np.arange(n) * 2 * np.pi / n, np.arange(m) * 2 * np.pi / m, indexing='ij')
+    vertices = np.stack([(major + minor * np.cos(v)) * np.cos(u), (major + minor * np.cos(v)) * np.sin(u),
+                         minor * np.sin(v)], axis=-1).reshape(-1, 3)
+    a = np.arange(n * m).reshape(n, m)
+    b = np.roll(a, -1, axis=0)
+    c, d = np.roll(b, -1, axis=1), np.roll(a, -1, axis=1)
+    return vertices, np.concatenate([np.stack([a, b, c], axis=-1), np.stack([a, c, d], axis=-1)]).reshape(-1, 3)
+
+
+def euler_characteristic(vertices, triangles):
+    return len(vertices) - len(MeshTopology.from_triangles(triangles, len(vertices)).edges) + len(triangles)
+
+
+@pytest.mark.parametrize('ratio', [0.25, 0.05])
+def test_closed_mesh_reaches_target_and_stays_manifold(ratio):
+    vertices, triangles = torus(60, 30)
+    target = int(len(triangles) * ratio)
+    result_vertices, result_triangles = decimate(vertices, triangles, target)
+
+    # 每次折叠删除两个三角形
+    assert target - 1 <= len(result_triangles) <= target
+    topology = MeshTopology.from_triangles(result_triangles, len(result_vertices))
+    assert topology.is_manifold() and topology.is_closed() and topology.is_oriented()
+    assert euler_characteristic(result_vertices, result_triangles) == 0
+    assert np.all(np.bincount(result_triangles.ravel(), minlength=len(result_vertices)) > 0)
+    # 折叠后的顶点仍在环面附近
+    distance = np.hypot(np.hypot(result_vertices[:, 0], result_vertices[:, 1]) - 1.0, result_vertices[:, 2])
+    assert np.abs(distance - 0.35).max() < 0.05
+
+
+def test_open_mesh_keeps_its_boundary():
+    vertices, triangles = synthetic_mesh(40)
+    target = len(triangles) // 5
+    result_vertices, result_triangles = decimate(vertices, triangles, target)
+
+    assert target - 1 <= len(result_triangles) <= target
+    topology = MeshTopology.from_triangles(result_triangles, len(result_vertices))
+    assert topology.is_manifold() and topology.is_oriented()
+    assert len(topology.boundary_loops()) == 1
+    assert euler_characteristic(result_vertices, result_triangles) == 1
+    # 边界约束平面让边界顶点留在正方形 [-1, 1]^2 的边上
+    boundary = result_vertices[topology.boundary_vertices()]
+    assert np.allclose(np.abs(boundary[:, :2]).max(axis=1), 1.0, atol=0.01)
+
+
+def test_cancelled_stops_before_first_round():
+    vertices, triangles = torus(20, 10)
+    result_vertices, result_triangles = decimate(vertices, triangles, 10, cancelled=lambda: True)
+    assert len(result_triangles) == len(triangles)
+    assert np.array_equal(result_vertices, vertices.astype(np.float32))
+
+
+def test_build_lod_levels_shrink_and_keep_the_source_mesh():
+    vertices, triangles = torus(40, 20)
+    mesh = Mesh()
+    mesh._set_arrays(vertices.astype(np.float32), np.full(len(triangles), 3), triangles.ravel())
+    original = mesh.triangles.copy()
+
+    levels = mesh.build_lod(ratios=(0.25, 0.0625))
+    assert levels[0] is mesh and np.array_equal(mesh.triangles, original)
+    assert [len(level.triangles) for level in levels[1:]] == [len(original) // 4, len(original) // 16]
+    for level in levels[1:]:
+        assert level.normals.shape == level.vertices.shape
+        assert MeshTopology.from_triangles(level.triangles, len(level.vertices)).is_manifold()
@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+VIEWER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子进程中创建8x8的EGL离屏上下文(PYOPENGL_PLATFORM 需要在导入PyOpenGL之前设置)
+CONTEXT = """
+import json, os, sys
+os.environ['PYOPENGL_PLATFORM'] = 'egl'
+import numpy as np
+import benchmark
+benchmark.load_platform('egl')
+handles = benchmark.create_context('egl', 8, 8)
+from OpenGL.GL import *
+from gl_buffers import MeshBuffers
+
+def read(buffer, target, count, dtype):
+    glBindBuffer(target, buffer)
+    data = glGetBufferSubData(target, 0, count * np.dtype(dtype).itemsize)
+    glBindBuffer(target, 0)
+    return np.frombuffer(bytes(data), dtype=dtype).tolist()
+
+def covered_pixels(buffers, ranges):
+    glViewport(0, 0, 8, 8)
+    glClearColor(0, 0, 0, 1)
+    glClear(GL_COLOR_BUFFER_BIT)
+    glColor3f(1, 1, 1)
+    buffers.draw(ranges)
+    return int(np.count_nonzero(np.frombuffer(bytes(glReadPixels(0, 0, 8, 8, GL_RED, GL_UNSIGNED_BYTE)), np.uint8)))
+
+# 第一个三角形覆盖整个视口, 第二个只覆盖右上角
+vertices = np.array([[-1, -1, 0], [3, -1, 0], [-1, 3, 0], [0.5, 0.5, 0]], dtype=np.float64)
+normals = np.tile([0.0, 0.0, 1.0], (4, 1))
+buffers = MeshBuffers()
+buffers.upload(vertices, normals, np.array([[0, 1, 2], [3, 1, 2]], dtype=np.int64))
+"""
+
+
+def run_with_egl(script):
+    result = subprocess.run([sys.executable, '-c', CONTEXT + script], cwd=VIEWER_DIR, capture_output=True,
+                            text=True, timeout=120)
+    if result.returncode != 0:
+        pytest.skip("no EGL OpenGL context: " + result.stderr.strip()[-200:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_upload_and_draw_ranges():
+    report = run_with_egl("""
+print(json.dumps({
+    'vao': buffers.vao is not None, 'index_count': buffers.index_count, 'vertex_count': buffers.vertex_count,
+    'indices': read(buffers.index_buffer, GL_ELEMENT_ARRAY_BUFFER, 6, np.uint32),
+    'positions': read(buffers.position_buffer, GL_ARRAY_BUFFER, 12, np.float32),
+    'normals': read(buffers.normal_buffer, GL_ARRAY_BUFFER, 12, np.float32),
+    'all': covered_pixels(buffers, None), 'first': covered_pixels(buffers, [(0, 1)]),
+    'second': covered_pixels(buffers, [(1, 2)]), 'errors': int(glGetError())}))
+buffers.release()
+""")
+    assert report['vao']
+    assert report['index_count'] == 6 and report['vertex_count'] == 4
+    assert report['indices'] == [0, 1, 2, 3, 1, 2]
+    assert report['positions'] == [-1, -1, 0, 3, -1, 0, -1, 3, 0, 0.5, 0.5, 0]
+    assert report['normals'] == [0, 0, 1] * 4
+    assert report['all'] == report['first'] == 64
+    assert 0 < report['second'] < 64
+    assert report['errors'] == 0
+
+
+def test_update_geometry_writes_only_the_dirty_range():
+    report = run_with_egl("""
+buffers.update_geometry(vertices + 10, -normals, 1, 3)
+partial = (read(buffers.position_buffer, GL_ARRAY_BUFFER, 12, np.float32),
+           read(buffers.normal_buffer, GL_ARRAY_BUFFER, 12, np.float32))
+buffers.update_geometry(vertices + 20, normals, 2, 100)  # 超出顶点数的部分被忽略
+clipped = read(buffers.position_buffer, GL_ARRAY_BUFFER, 12, np.float32)
+buffers.update_geometry(vertices, normals)
+whole = read(buffers.position_buffer, GL_ARRAY_BUFFER, 12, np.float32)
+print(json.dumps({'partial': partial, 'clipped': clipped, 'whole': whole,
+                  'indices': read(buffers.index_buffer, GL_ELEMENT_ARRAY_BUFFER, 6, np.uint32),
+                  'errors': int(glGetError())}))
+""")
+    positions, normals = report['partial']
+    assert positions == [-1, -1, 0, 13, 9, 10, 9, 13, 10, 0.5, 0.5, 0]
+    assert normals == [0, 0, 1, 0, 0, -1, 0, 0, -1, 0, 0, 1]
+    assert report['clipped'] == [-1, -1, 0, 13, 9, 10, 19, 23, 20, 20.5, 20.5, 20]
+    assert report['whole'] == [-1, -1, 0, 3, -1, 0, -1, 3, 0, 0.5, 0.5, 0]
+    assert report['indices'] == [0, 1, 2, 3, 1, 2]
+    assert report['errors'] == 0
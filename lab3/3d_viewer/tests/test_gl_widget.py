@@ -0,0 +1,69 @@
+import time
+import pytest
+
+pytest.importorskip('PyQt5')
+from PyQt5.QtCore import QEventLoop, QTimer  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+import gl_widget  # noqa: E402
+from gl_widget import GLWidget  # noqa: E402
+
+
+@pytest.fixture
+def widget():
+    # 只测试重绘调度和状态记录, 不显示窗口, 不需要OpenGL上下文
+    app = QApplication.instance() or QApplication([])
+    widget = GLWidget()
+    widget.dirty_state.clear()
+    yield widget
+    widget.deleteLater()
+    app.processEvents()
+
+
+def process_events(milliseconds):
+    loop = QEventLoop()
+    QTimer.singleShot(milliseconds, loop.quit)
+    loop.exec_()
+
+
+def test_requests_within_a_frame_coalesce(widget):
+    redraws = []
+    widget.redraw_timer.timeout.connect(lambda: redraws.append(1))
+    widget.request_redraw('transform')
+    widget.request_redraw('geometry')
+    widget.toggle_wireframe()
+    widget.request_redraw()
+    process_events(100)
+    assert redraws == [1]
+    assert widget.dirty_state == {'transform', 'geometry', 'polygon_mode'}
+
+
+def test_redraws_are_paced_by_the_refresh_interval(widget):
+    widget._last_frame = time.perf_counter()
+    widget.request_redraw('transform')
+    assert widget.redraw_timer.interval() >= int(widget.frame_interval() * 1000) - 1
+    widget.redraw_timer.stop()
+
+    widget._last_frame = time.perf_counter() - 1.0
+    widget.request_redraw('transform')
+    assert widget.redraw_timer.interval() == 0
+
+
+def test_apply_render_state_skips_unchanged_state(widget, monkeypatch):
+    calls = []
+    for name in ('glEnable', 'glDisable', 'glPolygonMode'):
+        monkeypatch.setattr(gl_widget, name, lambda *args, name=name: calls.append(name))
+    widget.apply_render_state()
+    assert calls == ['glEnable', 'glPolygonMode']
+    widget.apply_render_state()
+    assert calls == ['glEnable', 'glPolygonMode']
+    widget.wireframe = True
+    widget.apply_render_state()
+    assert calls[2:] == ['glDisable', 'glPolygonMode']
+
+
+def test_interaction_marks_only_the_changed_state(widget):
+    widget.set_shader_lighting(False)
+    assert widget.dirty_state == {'lighting'}
+    widget.dirty_state.clear()
+    widget.end_interaction()
+    assert widget.dirty_state == {'geometry'}
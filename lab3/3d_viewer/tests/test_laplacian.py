@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+from benchmark import synthetic_mesh
+from laplacian import LaplacianOperator
+from mesh import Mesh
+from topology import MeshTopology
+
+
+def grid_operator(n=8, seed=0):
+    vertices, triangles = synthetic_mesh(n)
+    noisy = vertices + 0.05 * np.random.default_rng(seed).standard_normal(vertices.shape)
+    return LaplacianOperator.uniform(len(vertices), MeshTopology.from_triangles(triangles, len(vertices)).edges), noisy
+
+
+def dense_laplacian(operator):
+    return operator.apply(np.eye(operator.num_vertices))
+
+
+def triangle_mesh(vertices, triangles):
+    mesh = Mesh()
+    mesh._set_arrays(np.asarray(vertices, dtype=np.float32), np.full(len(triangles), 3), np.ravel(triangles))
+    mesh.calculate_normals()
+    return mesh
+
+
+@pytest.mark.parametrize('lambda_factor', [0.5, 10.0])
+def test_implicit_step_solves_backward_euler_system(lambda_factor):
+    operator, x = grid_operator()
+    solution, info = operator.solve_implicit(x, lambda_factor, tol=1e-10, maxiter=500)
+    expected = np.linalg.solve(np.eye(operator.num_vertices) - lambda_factor * dense_laplacian(operator), x)
+    assert info['residual'] <= 1e-10
+    assert np.allclose(solution, expected, atol=1e-8)
+
+
+def test_implicit_warm_start_and_isolated_vertices():
+    vertices, triangles = synthetic_mesh(8)
+    edges = MeshTopology.from_triangles(triangles, len(vertices)).edges
+    # 最后一个顶点不属于任何边, 应保持不动
+    operator = LaplacianOperator.uniform(len(vertices) + 1, edges)
+    x = np.vstack([vertices, [[5.0, 5.0, 5.0]]])
+    solution, cold = operator.solve_implicit(x, 1.0, tol=1e-8)
+    assert np.array_equal(solution[-1], x[-1])
+    _, warm = operator.solve_implicit(x, 1.0, x0=solution, tol=1e-8)
+    assert warm['iterations'] < cold['iterations']
+
+
+def test_implicit_smoothing_is_stable_for_large_steps():
+    vertices, triangles = synthetic_mesh(16)
+    noisy = vertices + 0.02 * np.random.default_rng(1).standard_normal(vertices.shape)
+    mesh = triangle_mesh(noisy, triangles)
+    stats = mesh.laplacian_smoothing(iterations=3, lambda_factor=50.0, method='implicit')
+    assert stats['iterations'] == 3 and stats['cg_iterations'] > 0 and stats['residual'] <= 1e-6
+    assert np.all(np.isfinite(mesh.vertices))
+    # 噪声被抑制, 网格仍在原来的范围内
+    assert np.abs(mesh.vertices[:, 2]).max() < np.abs(noisy[:, 2]).max()
+    assert np.abs(mesh.vertices).max() <= np.abs(noisy).max()
+
+
+def sphere(n=24):
+    """ 经纬网格的单位球面(两极为三角形扇) """
+    theta, phi = np.meshgrid(np.linspace(0, np.pi, n + 1)[1:-1], np.arange(2 * n) * np.pi / n, indexing='ij')
+    rings = np.stack([np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)], axis=-1)
+    vertices = np.vstack([[[0, 0, 1]], rings.reshape(-1, 3), [[0, 0, -1]]])
+    grid = 1 + np.arange((n - 1) * 2 * n).reshape(n - 1, 2 * n)
+    right = np.roll(grid, -1, axis=1)
+    triangles = [np.stack([np.zeros(2 * n, dtype=np.int64), grid[0], right[0]], axis=1),
+                 np.stack([grid[:-1], grid[1:], right[1:]], axis=-1).reshape(-1, 3),
+                 np.stack([grid[:-1], right[1:], right[:-1]], axis=-1).reshape(-1, 3),
+                 np.stack([np.full(2 * n, len(vertices) - 1), right[-1], grid[-1]], axis=1)]
+    return vertices, np.concatenate(triangles)
+
+
+def test_cotangent_weights_of_a_right_triangle():
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float64)
+    operator = LaplacianOperator.cotangent(3, np.array([[0, 1, 2]]), vertices)
+    weights = {(i, int(j)): w for i in range(3)
+               for j, w in zip(operator.indices[operator.indptr[i]:operator.indptr[i + 1]],
+                               operator.weights[operator.indptr[i]:operator.indptr[i + 1]])}
+    # 直角所对的斜边权重为0(不保存), 两条直角边所对的角为45度, 权重为 cot(45)/2
+    assert weights == pytest.approx({(0, 1): 0.5, (1, 0): 0.5, (0, 2): 0.5, (2, 0): 0.5})
+
+
+def triangular_lattice(n):
+    """ 平面上的正三角形网格(n x n 个顶点, 奇数行右移半格), 所有角都是锐角 """
+    j, i = np.meshgrid(np.arange(n), np.arange(n), indexing='ij')
+    vertices = np.stack([i + 0.5 * (j % 2), j * np.sqrt(0.75), np.zeros_like(i)], axis=-1).reshape(-1, 3)
+    grid = np.arange(n * n).reshape(n, n)
+    triangles = []
+    for row in range(n - 1):
+        a, b, c, d = grid[row, :-1], grid[row, 1:], grid[row + 1, 1:], grid[row + 1, :-1]
+        if row % 2:
+            triangles += [np.stack([a, b, c], axis=1), np.stack([a, c, d], axis=1)]
+        else:
+            triangles += [np.stack([a, b, d], axis=1), np.stack([b, c, d], axis=1)]
+    return vertices.astype(np.float64), np.concatenate(triangles)
+
+
+def test_cotangent_laplacian_vanishes_on_irregular_planar_mesh():
+    vertices, triangles = triangular_lattice(10)
+    topology = MeshTopology.from_triangles(triangles, len(vertices))
+    edges, boundary = topology.edges, topology.boundary_vertices()
+    vertices[:, :2] += 0.1 * np.random.default_rng(2).standard_normal((len(vertices), 2))
+
+    cotangent = LaplacianOperator.cotangent(len(vertices), triangles, vertices).apply(vertices)
+    uniform = LaplacianOperator.uniform(len(vertices), edges).apply(vertices)
+    # 余切权重有线性精度: 平面上内部顶点的Laplacian为0, 均匀权重则不然
+    assert np.abs(cotangent[~boundary]).max() < 1e-12
+    assert np.abs(uniform[~boundary]).max() > 1e-2
+
+
+def mean_radius(mesh):
+    return float(np.linalg.norm(mesh.vertices, axis=1).mean())
+
+
+def test_taubin_shrinks_less_than_explicit():
+    vertices, triangles = sphere()
+    explicit = triangle_mesh(vertices, triangles)
+    explicit.laplacian_smoothing(iterations=20, lambda_factor=0.5, method='explicit')
+    taubin = triangle_mesh(vertices, triangles)
+    taubin.laplacian_smoothing(iterations=20, lambda_factor=0.5, method='taubin')
+    assert mean_radius(explicit) < 0.95
+    assert abs(mean_radius(taubin) - 1.0) < 0.25 * abs(mean_radius(explicit) - 1.0)
+
+
+@pytest.mark.parametrize('weights', ['uniform', 'cotangent'])
+@pytest.mark.parametrize('tol_norm', ['max', 'rms'])
+def test_tolerance_stops_smoothing_early(weights, tol_norm):
+    vertices, triangles = synthetic_mesh(12)
+    mesh = triangle_mesh(vertices, triangles)
+    stats = mesh.laplacian_smoothing(iterations=500, lambda_factor=0.5, weights=weights, tol=1e-3,
+                                     tol_norm=tol_norm)
+    assert stats['converged'] and stats['iterations'] < 500
+    assert stats['displacement'] <= 1e-3
+
+    no_tolerance = triangle_mesh(vertices, triangles)
+    stats = no_tolerance.laplacian_smoothing(iterations=5, weights=weights)
+    assert stats['iterations'] == 5 and not stats['converged']
+
+
+def test_invalid_smoothing_arguments():
+    vertices, triangles = synthetic_mesh(4)
+    mesh = triangle_mesh(vertices, triangles)
+    with pytest.raises(ValueError):
+        mesh.laplacian_smoothing(tol_norm='mean')
+    with pytest.raises(ValueError):
+        mesh.laplacian_smoothing(weights='mean-value')
+
+
+def test_uniform_operator_matches_dense_umbrella():
+    vertices, triangles = synthetic_mesh(6)
+    topology = MeshTopology.from_triangles(triangles, len(vertices))
+    operator = LaplacianOperator.uniform(len(vertices), topology.edges)
+    adjacency = np.zeros((len(vertices), len(vertices)))
+    adjacency[topology.edges[:, 0], topology.edges[:, 1]] = adjacency[topology.edges[:, 1], topology.edges[:, 0]] = 1
+    expected = adjacency / adjacency.sum(axis=1)[:, np.newaxis] - np.eye(len(vertices))
+    assert np.allclose(dense_laplacian(operator), expected)
+    assert np.allclose(operator.step(vertices, 0.5), vertices + 0.5 * expected @ vertices)
+
+
+def test_operator_is_cached_until_topology_changes():
+    vertices, triangles = synthetic_mesh(6)
+    mesh = triangle_mesh(vertices, triangles)
+    operator = mesh.laplacian_operator()
+    mesh.laplacian_smoothing(iterations=3)
+    assert mesh.laplacian_operator() is operator
+    assert mesh.laplacian_operator('cotangent') is not operator
+    mesh.set_faces(np.full(len(triangles) - 1, 3), triangles[1:].ravel())
+    assert mesh.laplacian_operator() is not operator
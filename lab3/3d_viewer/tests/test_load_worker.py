@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt5')
+from load_worker import load_mesh_file  # noqa: E402
+from mesh_cache import MeshCache  # noqa: E402
+
+OBJ = b"v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\nv 1 0 0\nf 1 2 3\nf 5 4 3\n"
+
+
+def test_cancel_stops_before_weld_store_and_reorder(tmp_path):
+    filename = tmp_path / 'quad.obj'
+    filename.write_bytes(OBJ)
+    cache = MeshCache(str(tmp_path / 'cache'))
+    stages = []
+
+    def cancelled():
+        stages.append(len(stages))
+        return len(stages) > 1  # 读取完成后取消
+
+    assert load_mesh_file(str(filename), cache, 'morton', weld_tolerance=1e-6, cancelled=cancelled) is None
+    assert len(stages) == 2
+    assert cache.stats()['entries'] == 0
+
+
+def test_load_without_cancel(tmp_path):
+    filename = tmp_path / 'quad.obj'
+    filename.write_bytes(OBJ)
+    cache = MeshCache(str(tmp_path / 'cache'))
+    mesh, cache_hit, order_stats, weld_stats = load_mesh_file(str(filename), cache, 'morton', weld_tolerance=1e-6,
+                                                              cancelled=lambda: False)
+    assert not cache_hit and order_stats is not None
+    assert weld_stats['vertices_removed'] == 1
+    assert cache.stats()['entries'] == 1
+    cached = load_mesh_file(str(filename), cache, 'morton', weld_tolerance=1e-6)
+    assert cached[1] and np.array_equal(cached[0].face_indices, mesh.face_indices)
+
+
+def test_cache_hit_keeps_reordered_triangles(tmp_path, monkeypatch):
+    from benchmark import synthetic_mesh, write_obj
+    from mesh import Mesh
+    vertices, triangles = synthetic_mesh(20)
+    filename = str(tmp_path / 'grid.obj')
+    write_obj(filename, vertices, triangles)
+    cache = MeshCache(str(tmp_path / 'cache'))
+    mesh, cache_hit, order_stats, _ = load_mesh_file(filename, cache, 'tipsify')
+    assert not cache_hit and order_stats['acmr_after'] < order_stats['acmr_before']
+
+    def reorder(*args, **kwargs):
+        raise AssertionError("cache hit must not reorder again")
+
+    monkeypatch.setattr(Mesh, 'reorder_triangles', reorder)
+    cached, cache_hit, order_stats, _ = load_mesh_file(filename, cache, 'tipsify')
+    assert cache_hit and order_stats is None
+    assert np.array_equal(cached.triangles, mesh.triangles)
+    assert np.array_equal(cached.triangle_faces, mesh.triangle_faces)
+    # 不同的重排方式使用不同的缓存项
+    plain, cache_hit, _, _ = load_mesh_file(filename, cache)
+    assert not cache_hit and np.array_equal(plain.triangles, triangles)
@@ -0,0 +1,167 @@
+import numpy as np
+import pytest
+from mesh import Mesh
+
+# 三角形、四边形和五边形混合, 另有一个不足三个顶点的退化面
+POLYGONS = [[0, 1, 2], [1, 3, 4, 2], [3, 5, 6, 7, 4], [6, 7]]
+POLYGON_OBJ = """v 0 0 0
+v 1 0 0
+v 0 1 0
+v 2 0 0
+v 2 1 0
+v 3 0 0
+v 4 0.5 0
+v 3 1 0
+f 1 2 3
+f 2/1 4/2 5/3 3/4
+f 4//1 6//1 7//1 8//1 5//1
+f 7 8
+"""
+
+
+def polygon_mesh():
+    mesh = Mesh()
+    mesh.vertices = np.zeros((8, 3), dtype=np.float32)
+    mesh.faces = POLYGONS
+    return mesh
+
+
+def test_faces_are_stored_as_offsets_and_indices():
+    mesh = polygon_mesh()
+    assert mesh.face_offsets.tolist() == [0, 3, 7, 12, 14]
+    assert mesh.face_indices.tolist() == [i for face in POLYGONS for i in face]
+    assert mesh.face_counts().tolist() == [3, 4, 5, 2]
+
+
+def test_polygons_are_fan_triangulated():
+    mesh = polygon_mesh()
+    assert mesh.triangles.tolist() == [[0, 1, 2], [1, 3, 4], [1, 4, 2], [3, 5, 6], [3, 6, 7], [3, 7, 4]]
+    assert mesh.triangle_faces.tolist() == [0, 1, 1, 2, 2, 2]
+
+
+def test_face_list_view():
+    mesh = polygon_mesh()
+    faces = mesh.faces
+    assert len(faces) == 4
+    assert [face.tolist() for face in faces] == POLYGONS
+    assert faces[-2].tolist() == POLYGONS[2]
+    with pytest.raises(IndexError):
+        faces[4]
+    with pytest.raises(ValueError):
+        faces[0][0] = 5
+
+
+def test_set_faces_invalidates_topology():
+    mesh = polygon_mesh()
+    version = mesh.topology_version
+    assert len(mesh.topology().edges) == 10
+    mesh.set_faces([3], [0, 1, 2])
+    assert mesh.topology_version > version
+    assert len(mesh.topology().edges) == 3
+    assert mesh.triangles.tolist() == [[0, 1, 2]]
+
+
+@pytest.mark.parametrize('fast', [True, False])
+def test_load_obj_polygons(tmp_path, fast):
+    (tmp_path / 'polygons.obj').write_text(POLYGON_OBJ)
+    mesh = Mesh()
+    mesh.load_obj(str(tmp_path / 'polygons.obj'), fast=fast)
+    assert [face.tolist() for face in mesh.faces] == POLYGONS
+    assert np.array_equal(mesh.triangles, polygon_mesh().triangles)
+
+
+def reference_normals(vertices, faces, mode):
+    """ 逐面逐角点计算的顶点法向量: Newell面法向量, 按面积/单位法向量/内角加权 """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    sums = np.zeros_like(vertices)
+    for face in faces:
+        points = vertices[face]
+        newell = sum(np.cross(points[i], points[(i + 1) % len(face)]) for i in range(len(face)))
+        length = np.linalg.norm(newell)
+        if mode == 'area':
+            weight = 0.5 * newell
+        else:
+            weight = newell / length if length > 0 else newell
+        for i, vertex in enumerate(face):
+            if mode == 'angle':
+                a, b = points[i - 1] - points[i], points[(i + 1) % len(face)] - points[i]
+                sums[vertex] += weight * np.arctan2(np.linalg.norm(np.cross(a, b)), np.dot(a, b))
+            else:
+                sums[vertex] += weight
+    lengths = np.linalg.norm(sums, axis=1)
+    lengths[lengths == 0] = 1.0
+    return sums / lengths[:, np.newaxis]
+
+
+def bumpy_grid(n, quads):
+    """ 起伏的网格, 四边形不共面(检验Newell法向量); quads=False 时每格拆成两个三角形 """
+    rng = np.random.default_rng(11)
+    u, v = np.meshgrid(np.linspace(0, 1, n), np.linspace(0, 1, n))
+    vertices = np.stack([u.ravel() + 0.02 * rng.random(n * n), v.ravel(), 0.2 * rng.random(n * n)], axis=1)
+    grid = np.arange(n * n).reshape(n, n)
+    faces = []
+    for i in range(n - 1):
+        for j in range(n - 1):
+            a, b, c, d = grid[i, j], grid[i, j + 1], grid[i + 1, j + 1], grid[i + 1, j]
+            faces += [[a, b, c, d]] if quads else [[a, b, c], [a, c, d]]
+    return vertices.astype(np.float32), faces
+
+
+@pytest.mark.parametrize('mode', ['uniform', 'area', 'angle'])
+@pytest.mark.parametrize('quads', [False, True])
+def test_normals_match_per_face_reference(mode, quads):
+    vertices, faces = bumpy_grid(9, quads)
+    mesh = Mesh()
+    mesh.vertices = vertices
+    mesh.faces = faces
+    mesh.calculate_normals(mode)
+    assert mesh.normals.dtype == np.float32
+    assert np.allclose(mesh.normals, reference_normals(vertices, faces, mode), atol=1e-5)
+
+
+@pytest.mark.parametrize('mode', ['uniform', 'area', 'angle'])
+def test_cube_corner_normals(mode):
+    mesh = Mesh()
+    mesh.vertices = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                              [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]], dtype=np.float32)
+    mesh.faces = [[0, 3, 2, 1], [4, 5, 6, 7], [0, 1, 5, 4], [1, 2, 6, 5], [2, 3, 7, 6], [3, 0, 4, 7]]
+    mesh.calculate_normals(mode)
+    outward = mesh.vertices - 0.5
+    assert np.allclose(mesh.normals, outward / np.linalg.norm(outward, axis=1)[:, np.newaxis], atol=1e-6)
+
+
+def test_degenerate_faces_and_unused_vertices_get_finite_normals():
+    mesh = Mesh()
+    mesh.vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [2, 0, 0], [5, 5, 5]], dtype=np.float32)
+    mesh.faces = [[0, 1, 2], [0, 1, 3]]  # 第二个面的顶点共线
+    mesh.calculate_normals('uniform')
+    assert np.all(np.isfinite(mesh.normals))
+    assert np.allclose(mesh.normals[:3], [0, 0, 1])
+    assert np.array_equal(mesh.normals[4], [0, 0, 0])
+
+
+def test_unknown_normal_mode():
+    with pytest.raises(ValueError, match='Unknown normal mode'):
+        polygon_mesh().calculate_normals('cotangent')
+
+
+def test_dirty_ranges_accumulate_until_consumed():
+    mesh = polygon_mesh()
+    assert mesh.consume_dirty_range() == (0, 8)
+    assert mesh.consume_dirty_range() is None
+    version = mesh.geometry_version
+    mesh.mark_dirty(5, 6)
+    mesh.mark_dirty(2, 3)
+    assert mesh.geometry_version == version + 2
+    assert mesh.consume_dirty_range() == (2, 6)
+
+
+def test_smoothing_marks_all_vertices_dirty():
+    vertices, faces = bumpy_grid(5, quads=True)
+    mesh = Mesh()
+    mesh.vertices = vertices
+    mesh.faces = faces
+    mesh.calculate_normals()
+    mesh.consume_dirty_range()
+    mesh.laplacian_smoothing(iterations=2)
+    assert mesh.consume_dirty_range() == (0, len(vertices))
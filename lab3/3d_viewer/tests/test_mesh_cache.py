@@ -0,0 +1,104 @@
+import hashlib
+import multiprocessing
+import threading
+import numpy as np
+import pytest
+from mesh import Mesh
+from mesh_cache import MeshCache
+
+
+def make_mesh(offset):
+    mesh = Mesh()
+    mesh._set_arrays(np.random.default_rng(offset).random((50, 3)).astype(np.float32), np.full(20, 3),
+                     np.arange(60) % 50)
+    mesh.calculate_normals()
+    return mesh
+
+
+def test_concurrent_store_load_and_stats(tmp_path):
+    sources = []
+    for i in range(4):
+        source = tmp_path / f'model_{i}.obj'
+        source.write_bytes(b'v 0 0 0\n' * (i + 1))
+        sources.append(str(source))
+    # 上限只能容纳部分条目, 同时触发淘汰
+    cache = MeshCache(str(tmp_path / 'cache'), max_bytes=3 * 1400)
+    errors = []
+
+    def worker(index):
+        try:
+            for round_ in range(20):
+                source = sources[(index + round_) % len(sources)]
+                mesh = make_mesh(round_)
+                cache.store(source, mesh, {'round': round_ % 3})
+                loaded = Mesh()
+                if cache.load(source, loaded, {'round': round_ % 3}):
+                    assert loaded.vertices.shape == (50, 3)
+                cache.stats()
+                if round_ % 7 == 0:
+                    cache.invalidate(source)
+        except Exception as e:  # 线程中的异常在主线程中检查
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    # 索引与目录中的条目一致
+    reopened = MeshCache(str(tmp_path / 'cache'))
+    entries = reopened._load_index()['entries']
+    assert reopened.stats()['bytes'] <= 3 * 1400
+    for digest in entries:
+        assert (tmp_path / 'cache' / digest / 'vertices.npy').exists()
+    assert not list((tmp_path / 'cache').glob('*.tmp'))
+
+
+def store_models(directory, sources, offset):
+    cache = MeshCache(directory)
+    for round_, source in enumerate(sources):
+        cache.store(source, make_mesh(offset + round_))
+        loaded = Mesh()
+        assert cache.load(source, loaded)
+
+
+def test_processes_sharing_a_cache_keep_all_entries(tmp_path):
+    directory = str(tmp_path / 'cache')
+    groups = []
+    for p in range(4):
+        sources = []
+        for i in range(8):
+            source = tmp_path / f'model_{p}_{i}.obj'
+            source.write_bytes(b'v %d %d 0\n' % (p, i))
+            sources.append(str(source))
+        groups.append(sources)
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=store_models, args=(directory, sources, 100 * p))
+                 for p, sources in enumerate(groups)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+    cache = MeshCache(directory)
+    assert cache.stats()['entries'] == 32
+    for sources in groups:
+        for source in sources:
+            assert cache.load(source, Mesh())
+
+
+def test_miss_hashes_the_file_while_parsing(tmp_path, monkeypatch):
+    pytest.importorskip('PyQt5')
+    from load_worker import load_mesh_file
+    source = tmp_path / 'quad.obj'
+    source.write_bytes(b"v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\nf 1 2 4 3\n")
+    cache = MeshCache(str(tmp_path / 'cache'))
+    calls = []
+    store = MeshCache.store
+    monkeypatch.setattr(MeshCache, 'store', lambda self, *args: calls.append(args) or store(self, *args))
+    assert not load_mesh_file(str(source), cache, chunk_size=8)[1]
+    content = calls[0][3]
+    assert content.hexdigest() == hashlib.blake2b(source.read_bytes(), digest_size=20).hexdigest()
+    assert load_mesh_file(str(source), cache)[1]
@@ -0,0 +1,200 @@
+import io
+import numpy as np
+import pytest
+import mesh_io
+from mesh import Mesh
+
+
+def legacy_obj(tmp_path, text):
+    filename = tmp_path / 'legacy.obj'
+    filename.write_bytes(text)
+    mesh = Mesh()
+    mesh._load_obj_lines(str(filename))
+    return np.asarray(mesh.vertices, dtype=np.float32), mesh.face_counts(), mesh.face_indices
+
+
+@pytest.mark.parametrize('text', [
+    b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n",
+    b"# header\nv 0 0 0 # origin\nv 1 0 0\nv 0 1 0   # trailing\n\nf 1 2 3\n",
+    b"v 0 0 0 1.0\nv 1 0 0 1.0\nv 0 1 0 0.5 0.5 0.5\nv 1 1 0\nf 1 2 4 3\n",
+    b"v 0 0 0\r\nv 1 0 0\r\nv 0 1 0\r\nf 1/1/1 2/2/2 3/3/3\r\n",
+    b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf -3 -2 -1\nv 1 1 0\nf -3//1 -1//1 -2//1\n",
+    b"v 0 0 0\nvn 0 0 1\nvt 0 0\nv 1 0 0\nv 0 1 0\nf 1//1 2//1 3//1",
+    b"v 1e-3 -2.5E+2 .5\nv 1 0 0\nv 0 1 0\nv 1 1 1\nf 1 2 3\nf 2 4 3\n",
+])
+def test_fast_obj_parser_matches_legacy(tmp_path, text):
+    vertices, counts, indices = mesh_io.parse_obj(text)
+    legacy_vertices, legacy_counts, legacy_indices = legacy_obj(tmp_path, text)
+    assert np.array_equal(vertices, legacy_vertices)
+    assert np.array_equal(counts, legacy_counts)
+    assert np.array_equal(indices, legacy_indices)
+
+
+def test_chunked_obj_parser_matches_whole_file(tmp_path):
+    text = b"".join(b"v %d 0 0 # vertex %d\n" % (i, i) for i in range(200))
+    text += b"".join(b"f %d %d -1 # face\n" % (i + 1, i + 2) for i in range(100))
+    whole = mesh_io.parse_obj(text)
+    chunks = list(mesh_io.iter_obj_chunks(io.BytesIO(text), chunk_size=97))
+    for expected, part in zip(whole, zip(*chunks)):
+        assert np.array_equal(expected, np.concatenate(part))
+
+
+PLY_TYPES = {'uchar': 'u1', 'ushort': 'u2', 'short': 'i2', 'int': 'i4', 'uint': 'u4'}
+
+
+def write_ply(filename, counts, big_endian=False, count_type='uchar', index_type='int', extra=False):
+    """ 写入面的顶点数各不相同的二进制PLY, extra 时列表前后各有一个定长属性 """
+    rng = np.random.default_rng(len(counts))
+    order = '>' if big_endian else '<'
+    vertices = rng.random((50, 3)).astype(np.float32)
+    indices = rng.integers(0, len(vertices), int(np.sum(counts)))
+    header = "ply\nformat %s 1.0\nelement vertex %d\nproperty float x\nproperty float y\nproperty float z\n" \
+             "element face %d\n" % ('binary_big_endian' if big_endian else 'binary_little_endian',
+                                    len(vertices), len(counts))
+    header += "property short tag\n" if extra else ""
+    header += "property list %s %s vertex_indices\n" % (count_type, index_type)
+    header += "property uchar flag\n" if extra else ""
+    parts = [(header + "end_header\n").encode(), vertices.astype(order + 'f4').tobytes()]
+    start = 0
+    for count in counts:
+        parts.append(np.int16(-1).astype(order + 'i2').tobytes() if extra else b'')
+        parts.append(np.array(count).astype(order + PLY_TYPES[count_type]).tobytes())
+        parts.append(indices[start:start + count].astype(order + PLY_TYPES[index_type]).tobytes())
+        parts.append(b'\x01' if extra else b'')
+        start += count
+    filename.write_bytes(b''.join(parts))
+    return vertices, np.asarray(counts), indices
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'big_endian': True, 'count_type': 'ushort', 'index_type': 'uint'},
+    {'extra': True, 'index_type': 'short'},
+])
+@pytest.mark.parametrize('counts', [
+    [3] * 40,
+    [3, 4] * 300,
+    [3, 3, 4, 5, 3, 8, 4, 4, 4, 3] * 50 + [0, 12],
+])
+def test_ply_polygons_with_different_sizes(tmp_path, monkeypatch, options, counts):
+    monkeypatch.setattr(mesh_io, '_PLY_BLOCK', 256)  # 跨越多个块
+    vertices, expected_counts, expected_indices = write_ply(tmp_path / 'mixed.ply', counts, **options)
+    read_vertices, read_counts, read_indices = mesh_io.read_ply(str(tmp_path / 'mixed.ply'))
+    assert np.array_equal(read_vertices, vertices)
+    assert np.array_equal(read_counts, expected_counts)
+    assert np.array_equal(read_indices, expected_indices)
+
+
+def test_ply_mixed_polygons_round_trip(tmp_path):
+    write_ply(tmp_path / 'mixed.ply', [3, 4, 5, 4, 3] * 20)
+    mesh = Mesh()
+    mesh.load(str(tmp_path / 'mixed.ply'))
+    mesh.save(str(tmp_path / 'saved.ply'))
+    loaded = Mesh()
+    loaded.load(str(tmp_path / 'saved.ply'))
+    assert np.array_equal(loaded.face_counts(), mesh.face_counts())
+    assert np.array_equal(loaded.face_indices, mesh.face_indices)
+    assert np.allclose(loaded.vertices, mesh.vertices)
+
+
+def test_truncated_mixed_ply(tmp_path):
+    write_ply(tmp_path / 'mixed.ply', [3, 4] * 30)
+    data = (tmp_path / 'mixed.ply').read_bytes()
+    (tmp_path / 'mixed.ply').write_bytes(data[:-3])
+    with pytest.raises(ValueError, match='Unexpected end'):
+        mesh_io.read_ply(str(tmp_path / 'mixed.ply'))
+
+
+def legacy_off(tmp_path, text):
+    filename = tmp_path / 'legacy.off'
+    filename.write_bytes(text)
+    mesh = Mesh()
+    mesh._load_off_lines(str(filename))
+    return np.asarray(mesh.vertices, dtype=np.float32), mesh.face_counts(), mesh.face_indices
+
+
+@pytest.mark.parametrize('text', [
+    b"OFF\n4 2 0\n0 0 0\n1 0 0\n0 1 0\n1 1 0\n3 0 1 2\n3 1 3 2\n",
+    b"OFF\n# comment\n4 1 0\n0 0 0\n1 0 0\n\n0 1 0\n1 1 0\n4 0 1 3 2 255 0 0\n",
+    b"OFF\n3 1 0\n0 0 0\n1 0 0\n0 1 0\n3 0 1 2\nGenerated by an exporter, version 2\n",
+    b"OFF\n3 1 3\n0 0 0\n1 0 0\n0 1 0\n3 0 1 2\n\n0 1\n1 2\nend of file\n",
+])
+def test_fast_off_parser_matches_legacy(tmp_path, text):
+    expected = legacy_off(tmp_path, text)
+    for parsed in (mesh_io.parse_off(text),
+                   [np.concatenate(part) for part in list(zip(*mesh_io.iter_off_chunks(io.BytesIO(text), chunk_size=5)))[:3]]):
+        for expected_array, array in zip(expected, parsed):
+            assert np.array_equal(expected_array, array)
+
+
+def test_off_missing_records():
+    with pytest.raises(ValueError, match='Unexpected end'):
+        mesh_io.parse_off(b"OFF\n4 2 0\n0 0 0\n1 0 0\n0 1 0\n1 1 0\n3 0 1 2\n")
+
+
+def polygon_soup(counts, seed=0):
+    rng = np.random.default_rng(seed)
+    vertices = (rng.standard_normal((60, 3)) * 1e3).astype(np.float32)
+    indices = rng.integers(0, len(vertices), int(np.sum(counts)))
+    mesh = Mesh()
+    mesh.vertices = vertices
+    mesh.set_faces(counts, indices)
+    mesh.calculate_normals()
+    return mesh
+
+
+@pytest.mark.parametrize('extension', ['.obj', '.off', '.ply'])
+@pytest.mark.parametrize('counts', [
+    [3] * 50,                               # 每块的面顶点数相同
+    [3, 4, 5, 3, 6] * 10,                   # 块内顶点数不同
+    [3] * 20 + [300] + [4] * 20,            # 超过255个顶点的面(PLY中顶点数用uint)
+])
+def test_writers_round_trip(tmp_path, monkeypatch, extension, counts):
+    monkeypatch.setattr(mesh_io, 'WRITE_ROWS', 16)  # 跨越多个块
+    mesh = polygon_soup(counts)
+    filename = str(tmp_path / ('saved' + extension))
+    mesh.save(filename)
+    # Mesh.load 会居中缩放, 这里直接用解析函数读回
+    if extension == '.ply':
+        vertices, read_counts, indices = mesh_io.read_ply(filename)
+    else:
+        parse = mesh_io.parse_obj if extension == '.obj' else mesh_io.parse_off
+        vertices, read_counts, indices = parse((tmp_path / ('saved' + extension)).read_bytes())
+    # 9位有效数字足以让float32坐标原样读回
+    assert np.array_equal(vertices, mesh.vertices)
+    assert np.array_equal(read_counts, mesh.face_counts())
+    assert np.array_equal(indices, mesh.face_indices)
+
+
+def test_obj_and_ply_writers_include_normals(tmp_path):
+    mesh = polygon_soup([3, 4] * 5)
+    mesh.save(str(tmp_path / 'saved.obj'))
+    lines = (tmp_path / 'saved.obj').read_text().splitlines()
+    normals = np.array([line.split()[1:] for line in lines if line.startswith('vn ')], dtype=np.float32)
+    assert np.array_equal(normals, mesh.normals)
+    faces = [line for line in lines if line.startswith('f ')]
+    assert faces[1] == 'f ' + ' '.join('%d//%d' % (i + 1, i + 1) for i in mesh.faces[1])
+
+    mesh.save(str(tmp_path / 'saved.ply'))
+    data = (tmp_path / 'saved.ply').read_bytes()
+    header, body = data.split(b'end_header\n', 1)
+    assert b'property float nx' in header and b'property list uchar int vertex_indices' in header
+    records = np.frombuffer(body[:len(mesh.vertices) * 24], dtype='<f4').reshape(-1, 6)
+    assert np.array_equal(records[:, :3], mesh.vertices) and np.array_equal(records[:, 3:], mesh.normals)
+
+
+def test_failed_save_keeps_existing_file(tmp_path, monkeypatch):
+    filename = tmp_path / 'model.obj'
+    filename.write_bytes(b'original')
+
+    def fail(f, *args):
+        f.write(b'partial')
+        raise OSError("disk full")
+
+    monkeypatch.setattr(mesh_io, 'write_obj', fail)
+    with pytest.raises(OSError):
+        polygon_soup([3] * 4).save(str(filename))
+    assert filename.read_bytes() == b'original'
+    assert [path.name for path in tmp_path.iterdir()] == ['model.obj']
+    with pytest.raises(ValueError, match='Unsupported'):
+        polygon_soup([3] * 4).save(str(tmp_path / 'model.stl'))
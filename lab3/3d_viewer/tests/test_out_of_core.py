@@ -0,0 +1,85 @@
+import io
+import numpy as np
+import pytest
+import mesh_io
+import out_of_core
+from mesh import Mesh
+
+
+def open_scan_obj(path):
+    """ 带边界的起伏网格, 混合三角形和四边形, 另加一个共享内部边的第三个面(非流形边) """
+    n = 12
+    u, v = np.meshgrid(np.linspace(0, 1, n), np.linspace(0, 1, n))
+    rng = np.random.default_rng(3)
+    vertices = np.stack([u.ravel(), v.ravel(), 0.1 * np.sin(4 * u.ravel()) + 0.01 * rng.random(n * n)], axis=1)
+    grid = np.arange(n * n).reshape(n, n)
+    faces = []
+    for i in range(n - 1):
+        for j in range(n - 1):
+            a, b, c, d = grid[i, j], grid[i, j + 1], grid[i + 1, j + 1], grid[i + 1, j]
+            faces += [[a, b, c, d]] if (i + j) % 2 else [[a, b, c], [a, c, d]]
+    vertices = np.vstack([vertices, [[0.5, 0.5, 1.0]]])
+    faces.append([grid[5, 5], grid[5, 6], len(vertices) - 1])
+    buffer = io.BytesIO()
+    counts = np.array([len(face) for face in faces])
+    mesh_io.write_obj(buffer, vertices, np.concatenate(([0], np.cumsum(counts))), np.concatenate(faces))
+    path.write_bytes(buffer.getvalue())
+    return str(path)
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # 让分块和分桶都生效
+    monkeypatch.setattr(out_of_core, 'CHUNK_ROWS', 17)
+    monkeypatch.setattr(out_of_core, '_MAX_BUCKETS', 4)
+
+
+def test_unique_edges_match_topology(tmp_path, small_chunks):
+    filename = open_scan_obj(tmp_path / 'scan.obj')
+    mesh = Mesh()
+    mesh.load_out_of_core(filename, str(tmp_path / 'storage'), chunk_size=256)
+    keys = out_of_core.unique_edges(mesh.face_offsets, mesh.face_indices, len(mesh.vertices), mesh.storage)
+    reference = Mesh()
+    reference.load_obj(filename)
+    assert np.array_equal(np.asarray(keys), reference.topology().edge_keys)
+
+
+@pytest.mark.parametrize('method', ['explicit', 'taubin'])
+def test_out_of_core_smoothing_matches_in_memory(tmp_path, small_chunks, method):
+    filename = open_scan_obj(tmp_path / 'scan.obj')
+    in_memory = Mesh()
+    in_memory.load_obj(filename)
+    mapped = Mesh()
+    mapped.load_out_of_core(filename, str(tmp_path / 'storage'), chunk_size=256)
+    assert mapped.storage is not None
+    assert np.allclose(np.asarray(mapped.vertices), in_memory.vertices, atol=1e-6)
+
+    expected = in_memory.laplacian_smoothing(5, 0.5, method)
+    stats = mapped.laplacian_smoothing(5, 0.5, method)
+    assert np.allclose(np.asarray(mapped.vertices), in_memory.vertices, atol=1e-5)
+    assert np.allclose(np.asarray(mapped.normals), in_memory.normals, atol=1e-4)
+    assert stats['displacement'] == pytest.approx(expected['displacement'], rel=1e-3)
+
+
+@pytest.mark.parametrize('mode', ['uniform', 'area', 'angle'])
+def test_high_valence_normals_match_in_memory(tmp_path, small_chunks, mode):
+    # 原点被 20000 个三角形共享, 它的法向量分上千个块累加: 在float32中累加时误差会逐块积累
+    count = 20000
+    rng = np.random.default_rng(7)
+    vertices = np.vstack([[[0.0, 0.0, 0.0]],
+                          [1.0, 0.0, 0.5] + 0.3 * rng.random((count, 3)),
+                          [0.0, 1.0, 0.3] + 0.3 * rng.random((count, 3))])
+    triangles = np.stack([np.zeros(count, dtype=np.int64), 1 + np.arange(count), 1 + count + np.arange(count)], axis=1)
+    buffer = io.BytesIO()
+    mesh_io.write_obj(buffer, vertices, np.arange(0, 3 * count + 1, 3), triangles.ravel())
+    (tmp_path / 'fan.obj').write_bytes(buffer.getvalue())
+
+    in_memory = Mesh()
+    in_memory.load(str(tmp_path / 'fan.obj'))
+    in_memory.calculate_normals(mode)
+    mapped = Mesh()
+    mapped.load_out_of_core(str(tmp_path / 'fan.obj'), str(tmp_path / 'storage'))
+    mapped.calculate_normals(mode)
+    assert mapped.normals.dtype == np.float32
+    assert np.allclose(mapped.normals[0], in_memory.normals[0], rtol=0, atol=1e-7)
+    assert np.allclose(np.asarray(mapped.normals), in_memory.normals, rtol=0, atol=2e-7)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import parallel
+from benchmark import synthetic_mesh
+from mesh import Mesh
+
+
+def grid_mesh(resolution, quads=False):
+    """ 起伏的网格; quads 时一半的格子是四边形, 另一半是两个三角形 """
+    vertices, triangles = synthetic_mesh(resolution)
+    mesh = Mesh()
+    if quads:
+        half = len(triangles) // 2
+        squares = np.stack([triangles[:half, 0], triangles[:half, 1], triangles[:half, 2],
+                            triangles[half:, 2]], axis=1)
+        kept = np.arange(half) % 2 == 0
+        faces = [squares[kept].ravel(), triangles[:half][~kept].ravel(), triangles[half:][~kept].ravel()]
+        counts = np.concatenate([np.full(np.count_nonzero(kept), 4), np.full(2 * np.count_nonzero(~kept), 3)])
+        mesh._set_arrays(vertices.astype(np.float32), counts, np.concatenate(faces))
+    else:
+        mesh._set_arrays(vertices.astype(np.float32), np.full(len(triangles), 3), triangles.ravel())
+    return mesh
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # 小网格也分成多块, 让线程池真正参与计算
+    monkeypatch.setattr(parallel, 'MIN_CHUNK', 64)
+    calls = []
+    executor = parallel._executor
+    monkeypatch.setattr(parallel, '_executor', lambda workers: calls.append(workers) or executor(workers))
+    return calls
+
+
+def results(mesh, workers):
+    mesh = mesh.shallow_copy()
+    mesh.workers = workers
+    outputs = []
+    for mode in ('uniform', 'area', 'angle'):
+        mesh.calculate_normals(mode)
+        outputs.append(mesh.normals)
+    for method, weights in (('explicit', 'uniform'), ('taubin', 'cotangent'), ('implicit', 'uniform')):
+        smoothed = mesh.shallow_copy()
+        smoothed.laplacian_smoothing(3, 0.3, method=method, weights=weights)
+        outputs += [smoothed.vertices, smoothed.normals]
+    return outputs
+
+
+@pytest.mark.parametrize('quads', [False, True])
+@pytest.mark.parametrize('workers', [2, 3, 8])
+def test_parallel_results_identical_to_serial(small_chunks, quads, workers):
+    mesh = grid_mesh(40, quads)
+    serial = results(mesh, 1)
+    assert not small_chunks
+    for expected, actual in zip(serial, results(mesh, workers)):
+        assert np.array_equal(expected, actual)
+    assert small_chunks and set(small_chunks) == {workers}
+
+
+def test_nondeterministic_normals_close_to_serial(small_chunks):
+    mesh = grid_mesh(40, quads=True)
+    mesh.calculate_normals('area')
+    expected = mesh.normals
+    mesh.workers, mesh.deterministic = 4, False
+    mesh.calculate_normals('area')
+    assert np.allclose(mesh.normals, expected, atol=1e-6)
+
+
+def test_chunk_bounds_cover_range():
+    bounds = parallel.chunk_bounds(1000, 7, min_chunk=10)
+    assert bounds[0] == 0 and bounds[-1] == 1000 and len(bounds) == 8
+    assert np.all(np.diff(bounds) > 0)
+    assert parallel.chunk_bounds(5, 8, min_chunk=10).tolist() == [0, 5]
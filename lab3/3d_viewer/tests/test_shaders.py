@@ -0,0 +1,74 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import numpy as np
+import pytest
+import shaders
+
+VIEWER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LIGHT = {'position': [1, 2, 3, 0], 'ambient': [4, 5, 6, 7], 'diffuse': [8, 9, 10, 11], 'specular': [12, 13, 14, 15],
+         'shininess': 42}
+MATERIAL = {'ambient': [16, 17, 18, 19], 'diffuse': [20, 21, 22, 23], 'specular': [24, 25, 26, 27],
+            'emission': [28, 29, 30, 31]}
+# uniform块中的成员 -> 打包时的取值
+MEMBERS = {
+    'light_position': LIGHT['position'], 'light_ambient': LIGHT['ambient'], 'light_diffuse': LIGHT['diffuse'],
+    'light_specular': LIGHT['specular'], 'material_ambient': MATERIAL['ambient'],
+    'material_diffuse': MATERIAL['diffuse'], 'material_specular': MATERIAL['specular'],
+    'material_emission': MATERIAL['emission'], 'scene_ambient': shaders._SCENE_AMBIENT,
+    'shininess': [LIGHT['shininess']],
+}
+
+# 在子进程中创建EGL上下文(PYOPENGL_PLATFORM 需要在导入PyOpenGL之前设置), 输出驱动给出的各成员偏移
+DRIVER_OFFSETS = """
+import json, os, sys
+os.environ['PYOPENGL_PLATFORM'] = 'egl'
+import numpy as np
+import benchmark
+benchmark.load_platform('egl')
+handles = benchmark.create_context('egl', 16, 16)
+from OpenGL.GL import *
+import shaders
+program = shaders.PhongProgram()
+offsets = {}
+for i in range(glGetProgramiv(program.program, GL_ACTIVE_UNIFORMS)):
+    name = glGetActiveUniform(program.program, i)[0]
+    offset = np.zeros(1, dtype=np.int32)
+    glGetActiveUniformsiv(program.program, 1, np.array([i], dtype=np.uint32), GL_UNIFORM_OFFSET, offset)
+    if offset[0] >= 0:
+        offsets[name.decode() if isinstance(name, bytes) else name] = int(offset[0])
+print(json.dumps({'offsets': offsets, 'block_size': program.block_size}))
+"""
+
+
+def check_layout(offsets):
+    data = shaders.PhongProgram.pack(LIGHT, MATERIAL)
+    assert set(offsets) == set(MEMBERS)
+    for name, value in MEMBERS.items():
+        start = offsets[name] // 4
+        assert np.array_equal(data[start:start + len(value)], np.asarray(value, dtype=np.float32)), name
+
+
+def test_pack_follows_std140_layout_of_declaration():
+    # std140: vec4 按16字节对齐, float 按4字节对齐
+    block = re.search(r'uniform Lighting \{(.*?)\};', shaders.FRAGMENT_SHADER, re.S).group(1)
+    offsets, offset = {}, 0
+    for kind, name in re.findall(r'(vec4|float)\s+(\w+);', block):
+        size = 16 if kind == 'vec4' else 4
+        offset = -(-offset // size) * size
+        offsets[name] = offset
+        offset += size
+    check_layout(offsets)
+    assert shaders.PhongProgram.pack(LIGHT, MATERIAL).nbytes >= offset
+
+
+def test_pack_matches_driver_offsets():
+    result = subprocess.run([sys.executable, '-c', DRIVER_OFFSETS], cwd=VIEWER_DIR, capture_output=True, text=True,
+                            timeout=120)
+    if result.returncode != 0:
+        pytest.skip("no EGL OpenGL context: " + result.stderr.strip()[-200:])
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    check_layout(report['offsets'])
+    assert shaders.PhongProgram.pack(LIGHT, MATERIAL).nbytes == report['block_size']
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt5')
+from PyQt5.QtCore import QCoreApplication, QEventLoop, QTimer  # noqa: E402
+from mesh import Mesh  # noqa: E402
+from smoothing_worker import SmoothingThread  # noqa: E402
+
+from test_out_of_core import open_scan_obj  # noqa: E402
+
+
+def test_out_of_core_frames_are_not_modified_after_emit(tmp_path):
+    app = QCoreApplication.instance() or QCoreApplication([])
+    mesh = Mesh()
+    mesh.load_out_of_core(open_scan_obj(tmp_path / 'scan.obj'), str(tmp_path / 'storage'))
+    thread = SmoothingThread(mesh, 6, interval=0.0, lambda_factor=0.5)
+    frames = []
+    problems = []
+
+    def on_frame(vertices, normals):
+        # 界面线程: 上一帧在被替换之前必须保持不变
+        if frames:
+            shown_vertices, shown_normals, vertices_copy, normals_copy = frames[-1]
+            if not (np.array_equal(shown_vertices, vertices_copy) and np.array_equal(shown_normals, normals_copy)):
+                problems.append(len(frames))
+            if vertices is shown_vertices or normals is shown_normals:
+                problems.append('same arrays')
+        frames.append((vertices, normals, np.array(vertices), np.array(normals)))
+        assert np.any(np.asarray(normals) != 0)
+        thread.frame_consumed()
+
+    thread.frame_ready.connect(on_frame)
+    loop = QEventLoop()
+    thread.finished.connect(loop.quit)
+    QTimer.singleShot(30000, loop.quit)
+    thread.start()
+    loop.exec_()
+    thread.wait()
+    app.processEvents()
+    assert len(frames) == 6
+    assert problems == []
+    # 只使用两组映射数组
+    assert len({id(vertices) for vertices, _, _, _ in frames}) == 2
+
+
+def test_normals_only_for_frames_handed_to_the_gui(tmp_path, monkeypatch):
+    app = QCoreApplication.instance() or QCoreApplication([])
+    mesh = Mesh()
+    mesh.load(open_scan_obj(tmp_path / 'scan.obj'))
+    thread = SmoothingThread(mesh, 8, interval=0.0, lambda_factor=0.5)
+    normal_updates = []
+    calculate_normals = Mesh.calculate_normals
+    monkeypatch.setattr(Mesh, 'calculate_normals',
+                        lambda self, *args: normal_updates.append(1) or calculate_normals(self, *args))
+    frames, progress = [], []
+    # 界面一直没有取走第一帧(不调用 frame_consumed): 中间的迭代不计算法向量, 最后一帧仍然发出
+    thread.frame_ready.connect(lambda vertices, normals: frames.append((vertices, normals)))
+    thread.progress.connect(lambda iterations, stats: progress.append(iterations))
+    loop = QEventLoop()
+    thread.finished.connect(loop.quit)
+    QTimer.singleShot(30000, loop.quit)
+    thread.start()
+    loop.exec_()
+    thread.wait()
+    app.processEvents()
+    assert progress == list(range(1, 9))
+    assert len(frames) == 2 and len(normal_updates) == 2
+
+    expected = mesh.shallow_copy()
+    expected.laplacian_smoothing(8, 0.5)
+    assert np.array_equal(frames[-1][0], expected.vertices)
+    assert np.array_equal(frames[-1][1], expected.normals)
+
+
+def run_to_end(thread):
+    app = QCoreApplication.instance() or QCoreApplication([])
+    loop = QEventLoop()
+    thread.finished.connect(loop.quit)
+    QTimer.singleShot(30000, loop.quit)
+    thread.start()
+    loop.exec_()
+    thread.wait()
+    app.processEvents()
+
+
+def test_front_mesh_is_untouched_and_frames_are_fresh_arrays(tmp_path):
+    mesh = Mesh()
+    mesh.load(open_scan_obj(tmp_path / 'scan.obj'))
+    original_vertices, original_normals = mesh.vertices, mesh.normals.copy()
+    vertices_before = original_vertices.copy()
+    thread = SmoothingThread(mesh, 4, interval=0.0, method='taubin', lambda_factor=0.5)
+    frames = []
+
+    def on_frame(vertices, normals):
+        frames.append((vertices, normals))
+        thread.frame_consumed()
+
+    thread.frame_ready.connect(on_frame)
+    run_to_end(thread)
+    assert len(frames) == 4
+    assert mesh.vertices is original_vertices
+    assert np.array_equal(mesh.vertices, vertices_before) and np.array_equal(mesh.normals, original_normals)
+    assert len({id(vertices) for vertices, _ in frames}) == 4
+    assert not np.array_equal(frames[0][0], frames[-1][0])
+
+
+def test_converged_smoothing_stops_early(tmp_path):
+    mesh = Mesh()
+    mesh.load(open_scan_obj(tmp_path / 'scan.obj'))
+    thread = SmoothingThread(mesh, 1000, interval=0.0, lambda_factor=0.5, tol=1.0)
+    progress = []
+    thread.progress.connect(lambda iterations, stats: progress.append(stats['converged']))
+    run_to_end(thread)
+    assert progress == [True]
+
+
+def test_cancel_and_failure(tmp_path):
+    mesh = Mesh()
+    mesh.load(open_scan_obj(tmp_path / 'scan.obj'))
+    thread = SmoothingThread(mesh, 1000, interval=10.0, lambda_factor=0.5)
+    # 第一次迭代后在等待间隔时取消
+    thread.progress.connect(lambda iterations, stats: thread.cancel())
+    run_to_end(thread)
+    assert thread.iterations == 1
+
+    thread = SmoothingThread(mesh, 3, interval=0.0, method='unknown')
+    errors = []
+    thread.failed.connect(errors.append)
+    run_to_end(thread)
+    assert errors == ['Unknown smoothing method: unknown']
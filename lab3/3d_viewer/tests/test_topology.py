@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from topology import MeshTopology, connected_components
+
+# 单位立方体, 六个四边形面均朝外
+CUBE_VERTICES = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                          [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]], dtype=np.float32)
+CUBE_FACES = [[0, 3, 2, 1], [4, 5, 6, 7], [0, 1, 5, 4], [1, 2, 6, 5], [2, 3, 7, 6], [3, 0, 4, 7]]
+
+
+def polygons(faces, num_vertices):
+    offsets = np.concatenate(([0], np.cumsum([len(face) for face in faces])))
+    return MeshTopology(offsets, np.concatenate(faces), num_vertices)
+
+
+def grid_faces(n):
+    """ n x n 个顶点的平面网格, 每格两个三角形 """
+    grid = np.arange(n * n).reshape(n, n)
+    faces = []
+    for i in range(n - 1):
+        for j in range(n - 1):
+            a, b, c, d = grid[i, j], grid[i, j + 1], grid[i + 1, j + 1], grid[i + 1, j]
+            faces += [[a, b, c], [a, c, d]]
+    return faces
+
+
+def test_closed_cube():
+    topology = polygons(CUBE_FACES, 8)
+    assert len(topology.edges) == 12
+    assert topology.is_closed() and topology.is_manifold() and topology.is_oriented()
+    assert np.all(topology.vertex_degrees() == 3)
+
+    halfedges = np.arange(24)
+    assert np.array_equal(topology.prev[topology.next], halfedges)
+    assert np.array_equal(topology.face[topology.next], topology.face)
+    assert np.all(topology.twin >= 0)
+    assert np.array_equal(topology.twin[topology.twin], halfedges)
+    assert np.array_equal(topology.origin[topology.twin], topology.target)
+    assert np.array_equal(topology.halfedge_edge[topology.twin], topology.halfedge_edge)
+
+
+def test_one_ring_and_vertex_faces_match_brute_force():
+    faces = grid_faces(5)
+    topology = polygons(faces, 25)
+    for vertex in range(25):
+        expected = {w for face in faces if vertex in face for w in face} - {vertex}
+        neighbors = topology.neighbors(vertex)
+        assert len(neighbors) == len(expected) and set(neighbors.tolist()) == expected
+        offsets, vertex_faces = topology.vertex_faces()
+        assert sorted(vertex_faces[offsets[vertex]:offsets[vertex + 1]].tolist()) == \
+            [f for f, face in enumerate(faces) if vertex in face]
+
+
+def test_open_grid_boundary():
+    n = 5
+    topology = polygons(grid_faces(n), n * n)
+    assert not topology.is_closed() and topology.is_manifold() and topology.is_oriented()
+    grid = np.arange(n * n).reshape(n, n)
+    perimeter = np.concatenate([grid[0, :-1], grid[:-1, -1], grid[-1, :0:-1], grid[:0:-1, 0]])
+    assert np.array_equal(np.flatnonzero(topology.boundary_vertices()), np.sort(perimeter))
+
+    loops = topology.boundary_loops()
+    assert len(loops) == 1
+    loop = loops[0].tolist()
+    assert sorted(loop) == sorted(perimeter.tolist())
+    # 环上相邻的顶点都由边界边相连
+    boundary = {tuple(edge) for edge in topology.edges[topology.edge_face_counts == 1].tolist()}
+    assert len(boundary) == len(loop)
+    assert all(tuple(sorted((a, b))) in boundary for a, b in zip(loop, loop[1:] + loop[:1]))
+
+
+@pytest.mark.parametrize('faces, edges, vertices', [
+    # 三个面共享边 (0, 1)
+    ([[0, 1, 2], [1, 0, 3], [0, 1, 4]], [(0, 1)], [0, 1]),
+    # 两个锥尖在顶点0相接(蝴蝶结)
+    ([[0, 1, 2], [0, 3, 4]], [], [0]),
+])
+def test_non_manifold(faces, edges, vertices):
+    topology = polygons(faces, 5)
+    assert not topology.is_manifold()
+    assert [tuple(topology.edges[e]) for e in topology.non_manifold_edges()] == edges
+    assert topology.non_manifold_vertices().tolist() == vertices
+
+
+def test_flipped_face_is_not_oriented():
+    faces = [list(face) for face in CUBE_FACES]
+    faces[0].reverse()
+    topology = polygons(faces, 8)
+    assert topology.is_closed() and topology.is_manifold() and not topology.is_oriented()
+    assert np.count_nonzero(topology.twin < 0) == 8
+
+
+def test_connected_components_match_union_find():
+    rng = np.random.default_rng(5)
+    count = 200
+    a, b = rng.integers(0, count, 150), rng.integers(0, count, 150)
+    parent = list(range(count))
+
+    def find(x):
+        while parent[x] != x:
+            x = parent[x]
+        return x
+
+    for x, y in zip(a.tolist(), b.tolist()):
+        rx, ry = find(x), find(y)
+        parent[max(rx, ry)] = min(rx, ry)
+    assert connected_components(count, a, b).tolist() == [find(x) for x in range(count)]
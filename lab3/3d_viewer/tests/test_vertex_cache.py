@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+import vertex_cache
+from benchmark import synthetic_mesh
+from mesh import Mesh
+
+
+def test_acmr_counts_fifo_misses():
+    # 一个三角形带: 每个新三角形只引入一个新顶点
+    strip = np.array([[i, i + 1, i + 2] for i in range(10)])
+    assert vertex_cache.acmr(strip) == pytest.approx(12 / 10)
+    # 缓存只有3个顶点时, 第二个三角形的0号顶点已被挤出
+    assert vertex_cache.acmr(np.array([[0, 1, 2], [3, 4, 0]]), cache_size=3) == 3.0
+    assert vertex_cache.acmr(np.zeros((0, 3), dtype=int)) == 0.0
+
+
+@pytest.mark.parametrize('order', ['file', 'tipsify', 'random'])
+def test_sampled_acmr_close_to_exact(order):
+    vertices, triangles = synthetic_mesh(160)
+    if order == 'tipsify':
+        triangles = triangles[vertex_cache.tipsify_order(triangles, len(vertices))]
+    elif order == 'random':
+        triangles = triangles[np.random.default_rng(0).permutation(len(triangles))]
+    exact = vertex_cache.acmr(triangles)
+    assert vertex_cache.acmr(triangles, sample=len(triangles)) == exact
+    assert vertex_cache.acmr(triangles, sample=4 * vertex_cache.ACMR_WINDOW) == pytest.approx(exact, abs=0.02)
+
+
+@pytest.mark.parametrize('method', vertex_cache.ORDER_METHODS)
+def test_reorder_triangles_is_a_permutation(method):
+    vertices, triangles = synthetic_mesh(60)
+    mesh = Mesh()
+    mesh._set_arrays(vertices.astype(np.float32), np.full(len(triangles), 3), triangles.ravel())
+    stats = mesh.reorder_triangles(method, acmr_sample=None)
+    assert sorted(map(tuple, mesh.triangles.tolist())) == sorted(map(tuple, triangles.tolist()))
+    assert np.array_equal(mesh.triangles, triangles[mesh.triangle_faces])
+    if method == 'tipsify':
+        assert stats['acmr_after'] < 0.75 < stats['acmr_before']
@@ -0,0 +1,32 @@
+import numpy as np
+
+from mesh import Mesh
+from weld import remap_faces
+
+
+def offsets(counts):
+    return np.concatenate(([0], np.cumsum(counts)))
+
+
+def test_remap_faces_drops_faces_with_fewer_than_three_distinct_vertices():
+    counts = [4, 4, 3, 5, 3]
+    indices = np.array([0, 1, 2, 3,      # 焊接后为 [a, b, a, b]
+                        0, 1, 4, 5,      # 保留
+                        0, 2, 6,         # 相邻角点合并后只剩两个
+                        0, 1, 2, 3, 4,   # [a, b, a, b, c] 仍有三个不同的顶点
+                        4, 5, 6])        # 保留
+    remap = np.array([0, 1, 0, 1, 2, 3, 0])
+    new_counts, new_indices, removed = remap_faces(offsets(counts), indices, remap)
+    assert removed == 2
+    assert new_counts.tolist() == [4, 5, 3]
+    assert new_indices.tolist() == [0, 1, 2, 3, 0, 1, 0, 1, 2, 2, 3, 0]
+
+
+def test_weld_removes_folded_quad():
+    mesh = Mesh()
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float32)
+    mesh._set_arrays(vertices, np.array([4, 3]), np.array([0, 1, 2, 3, 0, 1, 4]))
+    stats = mesh.weld_vertices(0.0)
+    assert stats['faces_removed'] == 1
+    assert stats['faces'] == 1
+    assert mesh.face_indices.tolist() == [0, 1, 2]
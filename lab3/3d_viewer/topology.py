@@ -0,0 +1,192 @@
+"""
+数组形式的半边网格拓扑, 由 Mesh 的面数组一次性批量构建, 供法向量、Laplacian光顺和网格简化等算法共用
+
+第 h 条半边对应面数组中的第 h 个角点 face_indices[h], 从该角点指向同一面中的下一个角点
+"""
+import numpy as np
+
+
+def connected_components(count, a, b):
+    """
+    无向图 (a[i], b[i]) 的连通分量: 最小编号的结点挂到一起, 再压缩路径, 直到所有边的两端属于同一个根
+    :return: 每个结点所在分量中的最小结点编号
+    """
+    labels = np.arange(count)
+    while len(a):
+        low = np.minimum(labels[a], labels[b])
+        np.minimum.at(labels, labels[a], low)
+        np.minimum.at(labels, labels[b], low)
+        while True:
+            parent = labels[labels]
+            if np.array_equal(parent, labels):
+                break
+            labels = parent
+        if np.array_equal(labels[a], labels[b]):
+            break
+    return labels
+
+
+class MeshTopology:
+    def __init__(self, face_offsets, face_indices, num_vertices):
+        """
+        :param face_offsets: 第i个面的角点为 face_indices[face_offsets[i]:face_offsets[i+1]]
+        :param face_indices: 所有面的顶点索引依次拼接
+        :param num_vertices: 顶点数(包括不属于任何面的孤立顶点)
+        """
+        self.num_vertices = int(num_vertices)
+        self.face_offsets = np.asarray(face_offsets, dtype=np.int64)
+        self.num_faces = len(self.face_offsets) - 1
+        counts = np.diff(self.face_offsets)
+        num_halfedges = int(self.face_offsets[-1])
+
+        # 半边: 起点、终点、所属的面、同一面中的下一条和上一条半边
+        self.origin = np.asarray(face_indices, dtype=np.int32)
+        self.face = np.repeat(np.arange(self.num_faces, dtype=np.int32), counts)
+        self.next = np.arange(1, num_halfedges + 1, dtype=np.int32)
+        nonempty = counts > 0
+        self.next[self.face_offsets[1:][nonempty] - 1] = self.face_offsets[:-1][nonempty]
+        self.prev = np.empty(num_halfedges, dtype=np.int32)
+        self.prev[self.next] = np.arange(num_halfedges, dtype=np.int32)
+        self.target = self.origin[self.next]
+
+        # 无向边: 两端相同的半边按 (较小索引, 较大索引) 排序后相邻; 首尾相同的退化半边不属于任何边
+        lo = np.minimum(self.origin, self.target).astype(np.int64)
+        hi = np.maximum(self.origin, self.target).astype(np.int64)
+        valid = np.flatnonzero(lo != hi)
+        keys = lo[valid] * self.num_vertices + hi[valid]
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        # edge_halfedges[edge_offsets[e]:edge_offsets[e+1]] 为第e条边上的所有半边
+        self.edge_halfedges = valid[order].astype(np.int32)
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1]))) if len(keys) else keys
+        self.edge_offsets = np.append(starts, len(keys)).astype(np.int64)
+        self.edge_keys = keys[starts]
+        self.edges = np.stack([self.edge_keys // self.num_vertices, self.edge_keys % self.num_vertices], axis=1)
+        self.edge_face_counts = np.diff(self.edge_offsets)  # 1为边界边, 2为内部边, 大于2为非流形边
+        self.halfedge_edge = np.full(num_halfedges, -1, dtype=np.int32)
+        self.halfedge_edge[self.edge_halfedges] = np.repeat(np.arange(len(self.edges), dtype=np.int32),
+                                                            self.edge_face_counts)
+
+        # 对边: 只有两条方向相反的半边的边, 其余(边界、非流形、方向不一致)为-1
+        self.twin = np.full(num_halfedges, -1, dtype=np.int32)
+        pairs = self.edge_offsets[:-1][self.edge_face_counts == 2]
+        h1, h2 = self.edge_halfedges[pairs], self.edge_halfedges[pairs + 1]
+        opposite = self.origin[h1] == self.target[h2]
+        self.twin[h1[opposite]] = h2[opposite]
+        self.twin[h2[opposite]] = h1[opposite]
+
+        self._vertex_faces = None
+        self._one_ring = None
+
+    @classmethod
+    def from_triangles(cls, triangles, num_vertices):
+        triangles = np.asarray(triangles).reshape(-1, 3)
+        return cls(np.arange(0, 3 * len(triangles) + 1, 3), triangles.ravel(), num_vertices)
+
+    @staticmethod
+    def _csr(rows, values, num_rows):
+        order = np.argsort(rows, kind='stable')
+        offsets = np.zeros(num_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_rows), out=offsets[1:])
+        return offsets, values[order]
+
+    def vertex_faces(self):
+        """ 顶点 -> 相邻的面(CSR), 一个面在多边形中多次出现同一顶点时重复列出 :return: (offsets, faces) """
+        if self._vertex_faces is None:
+            self._vertex_faces = self._csr(self.origin, self.face, self.num_vertices)
+        return self._vertex_faces
+
+    def one_ring(self):
+        """
+        顶点 -> 一环邻居(CSR), 每个邻居只出现一次
+        :return: (offsets, neighbors), 第v个顶点的邻居为 neighbors[offsets[v]:offsets[v+1]]
+        """
+        if self._one_ring is None:
+            owners = np.concatenate([self.edges[:, 0], self.edges[:, 1]])
+            self._one_ring = self._csr(owners, np.concatenate([self.edges[:, 1], self.edges[:, 0]]),
+                                       self.num_vertices)
+        return self._one_ring
+
+    def neighbors(self, vertex):
+        offsets, neighbors = self.one_ring()
+        return neighbors[offsets[vertex]:offsets[vertex + 1]]
+
+    def vertex_degrees(self):
+        return np.diff(self.one_ring()[0])
+
+    def boundary_halfedges(self):
+        return self.edge_halfedges[self.edge_offsets[:-1][self.edge_face_counts == 1]]
+
+    def boundary_vertices(self):
+        """ :return: 位于边界边上的顶点(布尔掩码) """
+        mask = np.zeros(self.num_vertices, dtype=bool)
+        mask[self.edges[self.edge_face_counts == 1].ravel()] = True
+        return mask
+
+    def boundary_loops(self):
+        """
+        边界环, 每个环的起始方向与第一条边界边所在面的方向一致;
+        非流形顶点处可能无法闭合, 此时返回开放的链
+        :return: 顶点索引数组的列表
+        """
+        halfedges = self.boundary_halfedges()
+        a, b = self.origin[halfedges].astype(np.int64), self.target[halfedges].astype(np.int64)
+        # 顶点 -> 相邻的边界边
+        offsets, incident = self._csr(np.concatenate([a, b]), np.tile(np.arange(len(halfedges)), 2),
+                                      self.num_vertices)
+        offsets, incident, a, b = offsets.tolist(), incident.tolist(), a.tolist(), b.tolist()
+        used = bytearray(len(halfedges))
+        loops = []
+        for start in range(len(halfedges)):
+            if used[start]:
+                continue
+            used[start] = 1
+            loop, current = [a[start]], b[start]
+            while current != loop[0]:
+                loop.append(current)
+                for edge in incident[offsets[current]:offsets[current + 1]]:
+                    if not used[edge]:
+                        used[edge] = 1
+                        current = b[edge] if a[edge] == current else a[edge]
+                        break
+                else:
+                    break
+            loops.append(np.array(loop, dtype=np.int64))
+        return loops
+
+    def non_manifold_edges(self):
+        """ 相邻面多于两个的边 """
+        return np.flatnonzero(self.edge_face_counts > 2)
+
+    def non_manifold_vertices(self):
+        """
+        相邻的面不构成单个扇形(或半个扇形)的顶点, 包括非流形边的端点和两个锥尖相接处的顶点
+        :return: 顶点索引
+        """
+        # 同一个顶点在两个面中的角点, 若两个面共享过该顶点的内部边则相连
+        pairs = self.edge_offsets[:-1][self.edge_face_counts == 2]
+        h1, h2 = self.edge_halfedges[pairs], self.edge_halfedges[pairs + 1]
+        links_a, links_b = [], []
+        for end in (self.origin, self.target):
+            vertex = end[h1]
+            links_a.append(np.where(self.origin[h1] == vertex, h1, self.next[h1]))
+            links_b.append(np.where(self.origin[h2] == vertex, h2, self.next[h2]))
+        labels = connected_components(len(self.origin), np.concatenate(links_a), np.concatenate(links_b))
+
+        # 每个顶点周围的角点应属于同一个分量
+        keys = np.unique(self.origin.astype(np.int64) * max(len(self.origin), 1) + labels)
+        fans = np.bincount(keys // max(len(self.origin), 1), minlength=self.num_vertices)
+        mask = fans > 1
+        mask[self.edges[self.edge_face_counts > 2].ravel()] = True
+        return np.flatnonzero(mask)
+
+    def is_closed(self):
+        return not np.any(self.edge_face_counts == 1)
+
+    def is_manifold(self):
+        return len(self.non_manifold_edges()) == 0 and len(self.non_manifold_vertices()) == 0
+
+    def is_oriented(self):
+        """ 每条内部边两侧的面方向一致(两条半边方向相反) """
+        pairs = self.edge_offsets[:-1][self.edge_face_counts == 2]
+        return bool(np.all(self.twin[self.edge_halfedges[pairs]] >= 0))
@@ -0,0 +1,151 @@
+"""
+顶点焊接: 用均匀网格找出距离不超过容差的顶点并合并, 重新映射面的索引并删除退化的面
+
+先按坐标的位模式哈希合并完全重合的顶点, 再把其余顶点放入边长为容差数倍的格子,
+只有靠近格子边界的顶点才需要检查相邻的格子; 所有步骤都是排序和批量运算, 总开销接近线性
+"""
+import numpy as np
+from topology import connected_components
+
+# 半个3x3x3邻域(不含自身), 每对相邻格子只检查一次
+_HALF_NEIGHBORHOOD = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+                      if (dx, dy, dz) > (0, 0, 0)]
+_CELL_FACTOR = 4       # 格子边长与容差之比, 越大需要检查相邻格子的顶点越少, 但每个格子中的顶点越多
+_MAX_CELLS = 1 << 20   # 每个坐标轴上的最大格子数, 保证格子编号能用一个int64表示
+
+
+def _exact_groups(vertices):
+    """
+    坐标完全相同的顶点分组
+    :return: (每个顶点所在的组 (N,), 每组中最先出现的顶点 (M,)), 组按坐标的位模式哈希排列
+    """
+    vertices = np.ascontiguousarray(vertices)
+    rows = vertices + vertices.dtype.type(0)  # -0.0 与 0.0 视为相同
+    bits = rows.view(np.dtype('u%d' % vertices.dtype.itemsize)).astype(np.uint64)
+    key = ((bits[:, 0] * np.uint64(0x9E3779B97F4A7C15)) ^ bits[:, 1]) * np.uint64(0xC2B2AE3D27D4EB4F) ^ bits[:, 2]
+    order = np.argsort(key)
+    sorted_key, sorted_rows = key[order], rows[order]
+    same_row = np.all(sorted_rows[1:] == sorted_rows[:-1], axis=1)
+    if np.any((sorted_key[1:] == sorted_key[:-1]) & ~same_row):
+        # 哈希冲突(极少见)时, 相同的坐标不一定相邻, 改为按三个坐标排序
+        order = np.lexsort((bits[:, 2], bits[:, 1], bits[:, 0]))
+        sorted_rows = rows[order]
+        same_row = np.all(sorted_rows[1:] == sorted_rows[:-1], axis=1)
+    starts = np.flatnonzero(np.concatenate(([True], ~same_row)))
+    groups = np.empty(len(vertices), dtype=np.int64)
+    groups[order] = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(order))))
+    return groups, np.minimum.reduceat(order, starts)
+
+
+def _expand(starts, counts):
+    """ 把若干区间 [starts[i], starts[i]+counts[i]) 展开, 返回 (位置, 所属区间) """
+    which = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) - offsets[which] + starts[which], which
+
+
+def close_pairs(points, tolerance):
+    """
+    距离不超过 tolerance 的点对
+    :return: (a, b), 每对只出现一次且 a != b
+    """
+    points = np.asarray(points, dtype=np.float64)
+    lower = points.min(axis=0)
+    cell = max(_CELL_FACTOR * tolerance, float(np.max(points.max(axis=0) - lower)) / (_MAX_CELLS - 3))
+    scaled = (points - lower) / cell
+    cells = np.floor(scaled).astype(np.int64) + 1  # 留出一格, 相邻格子的编号不会越界
+    fraction = scaled - (cells - 1)
+    dims = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    cell_keys, cell_counts = sorted_keys[starts], np.diff(np.append(starts, len(order)))
+
+    pairs_a, pairs_b = [], []
+    # 同一格子中的点两两配对
+    crowded = cell_counts > 1
+    position, which = _expand(starts[crowded], cell_counts[crowded])
+    later = (starts[crowded] + cell_counts[crowded])[which] - position - 1
+    partner, owner = _expand(position + 1, later)
+    pairs_a.append(order[position[owner]])
+    pairs_b.append(order[partner])
+
+    # 相邻格子: 只有在该方向上离格子边界不超过容差的点才可能与其中的点相距不超过容差
+    margin = tolerance / cell
+    sorted_fraction = fraction[order]
+    for offset in _HALF_NEIGHBORHOOD:
+        near = np.ones(len(order), dtype=bool)
+        for axis, step in enumerate(offset):
+            if step > 0:
+                near &= sorted_fraction[:, axis] >= 1.0 - margin
+            elif step < 0:
+                near &= sorted_fraction[:, axis] <= margin
+        source = np.flatnonzero(near)
+        if len(source) == 0:
+            continue
+        # 按格子编号排好序的点加上同一个常数后仍然有序, 查找时的访存是连续的
+        query = sorted_keys[source] + (offset[0] * dims[1] + offset[1]) * dims[2] + offset[2]
+        found = np.minimum(np.searchsorted(cell_keys, query), len(cell_keys) - 1)
+        hit = cell_keys[found] == query
+        source, found = source[hit], found[hit]
+        target, which = _expand(starts[found], cell_counts[found])
+        pairs_a.append(order[source[which]])
+        pairs_b.append(order[target])
+
+    a, b = np.concatenate(pairs_a), np.concatenate(pairs_b)
+    close = np.einsum('ij,ij->i', points[a] - points[b], points[a] - points[b]) <= tolerance * tolerance
+    return a[close], b[close]
+
+
+def weld_vertices(vertices, tolerance=0.0):
+    """
+    合并相距不超过 tolerance 的顶点; 彼此靠近的顶点链整体合并为一个顶点
+    :param tolerance: 0只合并完全重合的顶点
+    :return: (remap (N,) 每个原顶点的新索引, keep (M,) 保留的原顶点索引),
+             每组保留最先出现的顶点, 保留的顶点维持原来的相对顺序
+    """
+    vertices = np.asarray(vertices)
+    if len(vertices) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    groups, first = _exact_groups(vertices)
+    labels = np.arange(len(first))
+    if tolerance > 0 and len(first) > 1:
+        a, b = close_pairs(vertices[first], tolerance)
+        labels = connected_components(len(first), a, b)
+    representative = np.full(len(first), len(vertices), dtype=np.int64)
+    np.minimum.at(representative, labels, first)
+    owner = representative[labels][groups]
+    keep = np.flatnonzero(owner == np.arange(len(vertices)))
+    new_index = np.empty(len(vertices), dtype=np.int64)
+    new_index[keep] = np.arange(len(keep))
+    return new_index[owner], keep
+
+
+def remap_faces(face_offsets, face_indices, remap):
+    """
+    按 remap 替换面的顶点索引, 合并到同一顶点的相邻角点只保留一个, 剩余的不同顶点少于3个的面删除
+    :return: (每个面的顶点数, 展平的顶点索引, 删除的面数)
+    """
+    face_offsets = np.asarray(face_offsets, dtype=np.int64)
+    counts = np.diff(face_offsets)
+    indices = np.asarray(remap)[face_indices]
+    next_corner = np.arange(1, len(indices) + 1)
+    nonempty = counts > 0
+    next_corner[face_offsets[1:][nonempty] - 1] = face_offsets[:-1][nonempty]
+    corner_faces = np.repeat(np.arange(len(counts)), counts)
+    keep = indices != indices[next_corner]
+    new_counts = np.bincount(corner_faces[keep], minlength=len(counts))
+    valid = new_counts >= 3
+    # 不相邻的角点也可能合并(如 [a, b, a, b]): 只有剩余角点不少于4个的面需要统计不同的顶点数
+    polygons = new_counts >= 4
+    checked = keep & polygons[corner_faces]
+    if np.any(checked):
+        stride = int(indices.max()) + 1
+        keys = np.sort(corner_faces[checked] * stride + indices[checked])
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        distinct = np.bincount(keys[first] // stride, minlength=len(counts))
+        valid &= ~polygons | (distinct >= 3)
+    keep &= valid[corner_faces]
+    return new_counts[valid], indices[keep], int(len(counts) - np.count_nonzero(valid))